@@ -5,6 +5,8 @@ from app.db.session import get_db
 from app.db import schemas
 from app.db import PG_queries
 from app.services.aws_client import AWSClient
+from app.services.aws_session_cache import aws_session_cache
+from app.services.executors import run_aws, run_db
 
 router = APIRouter()
 
@@ -12,41 +14,44 @@ router = APIRouter()
 async def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
     """Create or update AWS account credentials"""
     # Check if account already exists
-    existing_account = PG_queries.get_account_by_id(db, account.account_id)
+    existing_account = await run_db(PG_queries.get_account_by_id, db, account.account_id)
     
     # Test AWS credentials before saving
     try:
-        aws_client = AWSClient(
+        aws_client = await run_aws(
+            AWSClient,
             service_name='sts',
             region_name=account.region,
             access_key=account.accesskey,
             secret_key=account.secretkey,
             session_token=getattr(account, 'session_token', None)  # Get session_token if it exists
         )
-        aws_client.test_connection()
+        await run_aws(aws_client.test_connection)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid AWS credentials: {str(e)}")
     
     if existing_account:
         # Update existing account
-        updated_account = PG_queries.update_account(
-            db, account.account_id, account
+        updated_account = await run_db(
+            PG_queries.update_account, db, account.account_id, account
         )
+        # Credentials may have changed, drop any cached sessions/clients for this account
+        aws_session_cache.invalidate(account.account_id)
         return updated_account
     else:
         # Create new account
-        return PG_queries.create_account(db, account)
+        return await run_db(PG_queries.create_account, db, account)
 
 @router.get("/account-management", response_model=List[schemas.AccountListResponse])
 async def get_accounts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all configured AWS accounts"""
-    accounts = PG_queries.get_all_accounts(db, skip, limit)
+    accounts = await run_db(PG_queries.get_all_accounts, db, skip, limit)
     return accounts
 
 @router.get("/account-management/{account_id}", response_model=schemas.AccountResponse)
 async def get_account(account_id: str, db: Session = Depends(get_db)):
     """Get AWS account by ID"""
-    account = PG_queries.get_account_by_id(db, account_id)
+    account = await run_db(PG_queries.get_account_by_id, db, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     return account
@@ -54,23 +59,25 @@ async def get_account(account_id: str, db: Session = Depends(get_db)):
 @router.delete("/account-management/{account_id}")
 async def delete_account(account_id: str, db: Session = Depends(get_db)):
     """Delete AWS account configuration"""
-    success = PG_queries.delete_account(db, account_id)
+    success = await run_db(PG_queries.delete_account, db, account_id)
     if not success:
         raise HTTPException(status_code=404, detail="Account not found")
+    aws_session_cache.invalidate(account_id)
     return {"status": "success", "message": "Account deleted successfully"}
 
 @router.post("/account-management/test-connection")
 async def test_connection(account: schemas.AccountBase):
     """Test AWS credentials without saving them"""
     try:
-        aws_client = AWSClient(
+        aws_client = await run_aws(
+            AWSClient,
             service_name='sts',
             region_name=account.region,
             access_key=account.accesskey,
             secret_key=account.secretkey,
             session_token=getattr(account, 'session_token', None)  # Get session_token if it exists
         )
-        aws_client.test_connection()
+        await run_aws(aws_client.test_connection)
         return {"status": "success", "message": "AWS credentials are valid"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid AWS credentials: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from app.services.aws_session_cache import aws_session_cache
+from app.services.executors import executor_stats
+from app.services.rate_governor import rate_governor
+
+router = APIRouter()
+
+@router.get("/metrics/aws-session-cache")
+async def get_aws_session_cache_stats():
+    """
+    Hit/miss/eviction counters for the process-wide boto3 session and client cache
+    """
+    return aws_session_cache.stats()
+
+@router.get("/metrics/executors")
+async def get_executor_stats():
+    """
+    Saturation of the AWS and DB executors that run the blocking work of the API handlers
+    """
+    return executor_stats()
+
+@router.get("/metrics/rate-governor")
+async def get_rate_governor_stats():
+    """
+    Current rate, requests and throttled responses of every (account, service, region) token bucket
+    """
+    return rate_governor.stats()
@@ -1,47 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.services.aws_services import check_ram_shared_resources, check_delegated_admins, check_cost_explorer_data, check_ri_and_savings_plans, check_policy_references, check_stacksets_for_org_integration, create_fallback_admin_user
-from app.db.schemas import StepResponse, StepExecutionCreate
-from fastapi import APIRouter, HTTPException, Depends, Query
-from app.db.PG import AutomationType, StepStatus, PhaseType
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from app.services.step_registry import STEP_IDS, PHASE_STEPS, get_step_definition, parse_options, execution_logs, execution_status, seed_steps, steps_seeded
+from app.db.schemas import StepResponse, StepExecutionCreate, StepJobResponse
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.db import PG_queries
-from enum import Enum
+from app.services.executors import aws_executor, run_aws, run_db
+from app.services.aws_async import async_aws_available
+from app.services.rate_governor import rate_governor
+from app.services.step_jobs import StepJobNotCancellable, submit_step_job, cancel_step_job, job_state
 import time
 import json
 import datetime
+import queue
 
 router = APIRouter()
 
-# Step ID mapping
-STEP_IDS = {
-    "check_ram": 1,
-    "check_admin_services": 2,
-    "cost_explorer_data": 3,
-    "check_savings": 4,
-    "check_policies": 5,
-    "check_stacksets": 6,
-    "create_iam_admin": 8
-}
-
-# Phase type to step IDs mapping
-PHASE_STEPS = {
-    "assess-existing": [1, 2, 3, 4, 5, 6, 8],
-    "prepare-new": [],
-    "migrate": [],
-    "verify": [],
-    "post-migration": []
-}
-
-# Map URL path to PhaseType enum
-PHASE_TYPE_MAP = {
-    "assess-existing": PhaseType.ASSESS_EXISTING,
-    "prepare-new": PhaseType.PREPARE_NEW,
-    "migrate": PhaseType.MIGRATION,
-    "verify": PhaseType.VERIFY_NEW,
-    "post-migration": PhaseType.POST_MIGRATION
-}
-
 
 def convert_datetime(obj):
     if isinstance(obj, dict):
@@ -52,394 +26,257 @@ def convert_datetime(obj):
         return obj.isoformat()
     else:
         return obj
-    
 
-@router.get("/assess-existing/check_ram", response_model=StepResponse)
-async def execute_check_ram(account_id: str = Query(None), db: Session = Depends(get_db)):
-    """
-    Execute the RAM shared resources check step
-    """
-    step_id = STEP_IDS["check_ram"]
-    
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check for resources shared via RAM",
-        description="Check for resources shared via RAM with the rest of the Org or OUs",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically scan for shared resources",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
-    
-    start_time = time.time()
-    
-    # Step 1: Check for resources shared via RAM
-    result = check_ram_shared_resources(db, account_id)
-    
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking for resources shared via RAM...",
-        f"Analysis complete: {result ['message'] if 'message' in result else 'No message provided.'}"
-    ]
-    
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
-    execution_time = int(time.time() - start_time)
-    
-    # Save result to database
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
-    PG_queries.create_step_execution(db, step_execution)
-    
-    # Format the response for the frontend
-    return {
-        "step_id": step_id,
-        "title": "Check for resources shared via RAM",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
-    }
 
-@router.get("/assess-existing/check_admin_services", response_model=StepResponse)
-async def execute_check_admin_services(account_id: str = Query(None), db: Session = Depends(get_db)):
-    """
-    Execute the delegated admin services check step
-    """
-    step_id = STEP_IDS["check_admin_services"]
-    
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check for delegated admin services",
-        description="Check if services like AWS Backups, GuardDuty, Inspector have delegated admin in old org",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=8,
-        requires_confirmation=False,
-        notes="Agent will identify all delegated admin services",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
+# Seconds without events after which a stream sends a heartbeat, so proxies keep it open
+STREAM_HEARTBEAT_SECONDS = 15
 
-    # Step 2: Check for delegated admin accounts
-    start_time = time.time()
-    result = check_delegated_admins(db, account_id)
-    # Placeholder for delegated admin check logic
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking for delegated admin accounts...",
-        f"Analysis complete: {result ['message'] if 'message' in result else 'Delegated Admins Found'}"
-    ]
 
-    # Convert datetime objects to strings before saving
-    result = convert_datetime(result)
-    logs = convert_datetime(logs)
-    
-
-    status = StepStatus.COMPLETED
-    execution_time = int(time.time() - start_time)
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
+async def ensure_steps_seeded(db: Session):
+    """Seed the step table when startup could not; a flag check once it is seeded"""
+    if not steps_seeded():
+        await run_db(seed_steps, db)
 
-    PG_queries.create_step_execution(db, step_execution)
-    return {
-        "step_id": step_id,
-        "title": "Check for delegated admin services",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
-    }
 
-@router.get("/assess-existing/cost_explorer_data", response_model=StepResponse)
-async def execute_cost_explorer_data(account_id: str = Query(None), db: Session = Depends(get_db)):
+def run_tracked(check, db, account_id, *args):
     """
-    Execute the cost explorer data check step
+    Run a check and add the AWS requests and throttled responses of that run (its own
+    calls only, also those made from the pools it fans out to) to the result
     """
-    step_id = STEP_IDS["cost_explorer_data"]
-    
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check Cost Explorer Data",
-        description="Cost explorer data in Payer2 will NOT have historical data from Payer1.",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically check Cost Explorer data",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
-
-    
-    # Placeholder for cost explorer data check logic
-    start_time = time.time()
-    result = check_cost_explorer_data(db, account_id)
-    
-    # Create more informative logs with actual cost data
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking Cost Explorer data...",
-        f"Analysis complete: Found {len(result.get('billing_periods', []))} billing periods and {len(result.get('cur_reports', []))} Cost and Usage Reports"
-    ]
-    
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
-    execution_time = int(time.time() - start_time)
-    
-    # Save result to database
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
-    PG_queries.create_step_execution(db, step_execution)
-    
-    return {
-        "step_id": step_id,
-        "title": "Check Cost Explorer Data",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
-    }
+    with rate_governor.track() as tracker:
+        result = check(db, account_id, *args)
+    result["throttling"] = tracker.report()
+    return result
 
-# Check RI and Saving Plans
-@router.get("/assess-existing/check_savings", response_model=StepResponse)
-async def check_savings(account_id: str = Query(None), db: Session = Depends(get_db)):
-    """
-    Execute the RI and Savings Plans check step
-    """
-    step_id = STEP_IDS["check_savings"]
-
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check RI and Savings Plans",
-        description="Check RI and Savings Plans",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically check RI and Savings Plans",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
 
-    # Placeholder for RI and Savings Plans check logic
-    start_time = time.time()
-    result = check_ri_and_savings_plans(db, account_id)
-
-    # Create more informative logs with actual cost data
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking RI and Savings Plans...",
-        f"Analysis complete: {result ['message'] if 'message' in result else 'No message provided.'}"
-    ]
+async def run_tracked_async(check, db, account_id, *args):
+    """run_tracked for a coroutine check"""
+    with rate_governor.track() as tracker:
+        result = await check(db, account_id, *args)
+    result["throttling"] = tracker.report()
+    return result
 
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
-    execution_time = int(time.time() - start_time)
 
-    # Save result to database
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
-    PG_queries.create_step_execution(db, step_execution)
+def format_stream_event(event: dict, stream_format: str):
+    """
+    Serialize one event as an NDJSON line or a Server-Sent Events message
+    """
+    data = json.dumps(convert_datetime(event), default=str)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
 
-    return {
-        "step_id": step_id,
-        "title": "Check RI and Savings Plans",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
-    }
 
+def stream_step_execution(step: dict, run, stream_format: str = "ndjson"):
+    """
+    Run a registered step on the AWS executor and stream its events as they happen.
 
-@router.get("/assess-existing/check_policies", response_model=StepResponse)
-async def check_policies(account_id: str = Query(None), db: Session = Depends(get_db)):
+    run(db, on_event) performs the check and returns its result dict; on_event may be
+    called from any thread. Steps without events only send "started" and "result".
+    The worker saves the step execution with its own DB session and then sends a final
+    "result" event shaped like StepResponse, so the execution is recorded even when the
+    client disconnects before the end.
     """
-    Execute the policy references check step
+    events = queue.Queue()
+    done = object()
+    step_id = step["id"]
+    title = step["title"]
+
+    def worker():
+        db = SessionLocal()
+        service_logs = []
+        start_time = time.time()
+
+        def on_event(event):
+            if event["type"] == "checkpoint":
+                return
+            if event["type"] == "service_complete":
+                line = f"{event['service']}: {event['checked']} checked, {event['with_references']} with references ({event['duration']}s)"
+                if event.get("error"):
+                    line += f", error: {event['error']}"
+                service_logs.append(line)
+            events.put(event)
+
+        try:
+            events.put({"type": "started", "step_id": step_id, "title": title})
+            result = convert_datetime(run(db, on_event))
+            logs = execution_logs(step, result)
+            # Per-service lines go before the closing "Analysis complete" line
+            logs[-1:-1] = service_logs
+            status = execution_status(result)
+            execution_time = int(time.time() - start_time)
+
+            # Save result to database
+            step_execution = StepExecutionCreate(
+                step_id=step_id,
+                status=status,
+                result_data=result,
+                logs=logs,
+                execution_time=execution_time
+            )
+            PG_queries.create_step_execution(db, step_execution)
+
+            events.put({
+                "type": "result",
+                "step_id": step_id,
+                "title": title,
+                "status": status.value,
+                "result": result,
+                "logs": logs,
+                "execution_time": execution_time
+            })
+        except Exception as e:
+            print(f"Error in streamed step {step_id}: {str(e)}")
+            events.put({"type": "error", "step_id": step_id, "message": str(e)})
+        finally:
+            db.close()
+            events.put(done)
+
+    aws_executor.submit(worker)
+
+    def generate():
+        while True:
+            try:
+                event = events.get(timeout=STREAM_HEARTBEAT_SECONDS)
+            except queue.Empty:
+                event = {"type": "heartbeat"}
+            if event is done:
+                return
+            yield format_stream_event(event, stream_format)
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/{phase_type}/{step_slug}/stream")
+async def stream_step(
+    phase_type: str,
+    step_slug: str,
+    request: Request,
+    account_id: str = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    db: Session = Depends(get_db)
+):
     """
-    step_id = STEP_IDS["check_policies"]
-
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check for policy references",
-        description="Check for policy documents across various AWS services for Organization/OU references",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically check for policy references",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
+    Execute any registered step, streaming its events as NDJSON lines (or Server-Sent
+    Events with format=sse) while it runs. Steps declared with events stream findings
+    and progress; the others send "started" and then the final "result".
+    """
+    step = get_step_definition(phase_type, step_slug)
+    if step is None:
+        raise HTTPException(status_code=404, detail=f"Step {step_slug} not found in phase {phase_type}")
+    options = parse_options(step, request.query_params)
+    await ensure_steps_seeded(db)
 
-    # Placeholder for policy references check logic
-    start_time = time.time()
-    result = check_policy_references(db, account_id)
-
-    # Create more informative logs with actual cost data
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking for policy references...",
-        f"Analysis complete: {result ['message'] if 'message' in result else 'No message provided.'}"
-    ]
+    def run(scan_db, on_event):
+        events = [on_event] if step.get("events") else []
+        return run_tracked(step["check"], scan_db, account_id, *options, *events)
 
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
-    execution_time = int(time.time() - start_time)
+    return stream_step_execution(step, run, format)
 
-    # Save result to database
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
-    PG_queries.create_step_execution(db, step_execution)
 
+def job_response(execution, title: str):
     return {
-        "step_id": step_id,
-        "title": "Check for policy references",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
+        "job_id": execution.id,
+        "step_id": execution.step_id,
+        "title": title,
+        "status": execution.status,
+        "state": job_state(execution.id),
+        "result": execution.result_data or {},
+        "logs": execution.logs or [],
+        "execution_time": execution.execution_time,
+        "created_at": execution.created_at,
+        "updated_at": execution.updated_at
     }
 
 
-@router.get("/assess-existing/check_stacksets", response_model=StepResponse)
-async def check_stacksets(account_id: str = Query(None), db: Session = Depends(get_db)):
+@router.get("/jobs/{job_id}", response_model=StepJobResponse)
+async def get_step_job(job_id: int, db: Session = Depends(get_db)):
     """
-    Execute the stacksets check step
+    Status of a background step job; while in progress, result holds the partial
+    result of checks that report progress
     """
-    step_id = STEP_IDS["check_stacksets"]
-
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Check for stacksets",
-        description="Check if CloudFormation StackSets use AWS Organizations",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically check for stacksets",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
+    execution = await run_db(PG_queries.get_step_execution, db, job_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    step = await run_db(PG_queries.get_step, db, execution.step_id)
+    return job_response(execution, step.title if step else "Unknown Step")
 
-    # Execute the stacksets check
-    start_time = time.time()
-    result = check_stacksets_for_org_integration(db, account_id)
-
-    # Create logs
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Checking for stacksets using Organizations...",
-        f"Analysis complete: {result['message'] if 'message' in result else 'No message provided.'}"
-    ]
 
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
-    execution_time = int(time.time() - start_time)
+@router.post("/jobs/{job_id}/cancel", response_model=StepJobResponse)
+async def cancel_step_job_route(job_id: int, db: Session = Depends(get_db)):
+    """
+    Cancel a background step job that is still in progress
+    """
+    execution = await run_db(PG_queries.get_step_execution, db, job_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    try:
+        cancelled = await run_db(cancel_step_job, db, job_id)
+    except StepJobNotCancellable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not cancelled:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is no longer in progress")
+    return await get_step_job(job_id, db)
+
+
+@router.post("/{phase_type}/{step_slug}", response_model=StepJobResponse, status_code=202)
+async def submit_step(phase_type: str, step_slug: str, request: Request, account_id: str = Query(None), db: Session = Depends(get_db)):
+    """
+    Start any registered step as a background job and return its job ID at once.
+    Poll GET /jobs/{job_id} for status and partial results.
+    """
+    step = get_step_definition(phase_type, step_slug)
+    if step is None:
+        raise HTTPException(status_code=404, detail=f"Step {step_slug} not found in phase {phase_type}")
+    options = parse_options(step, request.query_params)
+    await ensure_steps_seeded(db)
 
-    # Save result to database
-    step_execution = StepExecutionCreate(
-        step_id=step_id,
-        status=status,
-        result_data=result,
-        logs=logs,
-        execution_time=execution_time
-    )
-    PG_queries.create_step_execution(db, step_execution)
+    def run_check(job_db, on_event):
+        events = [on_event] if step.get("events") else []
+        return convert_datetime(run_tracked(step["check"], job_db, account_id, *options, *events))
 
-    return {
-        "step_id": step_id,
-        "title": "Check for stacksets",
-        "status": status,
-        "result": result,
-        "logs": logs,
-        "execution_time": execution_time
-    }
+    execution = await run_db(submit_step_job, db, step, run_check)
+    return job_response(execution, step["title"])
 
-@router.get("/assess-existing/create_iam_admin", response_model=StepResponse)
-async def create_iam_admin(account_id: str = Query(None), db: Session = Depends(get_db)):
+
+@router.get("/{phase_type}/{step_slug}", response_model=StepResponse)
+async def execute_step(phase_type: str, step_slug: str, request: Request, account_id: str = Query(None), db: Session = Depends(get_db)):
     """
-    fallback Iam Admin for sso, In case of sso fails
+    Execute any registered step. Step-specific options (refresh, linked_accounts,
+    full_rescan) are read from the query string as declared in STEP_REGISTRY.
     """
-    step_id = STEP_IDS["create_iam_admin"]
-
-    # Ensure step exists in database
-    PG_queries.create_or_update_step(
-        db=db,
-        step_id=step_id,
-        title="Create Fallback IAM Admin",
-        description="Create Admin for sso if fails",
-        automation_type=AutomationType.FULLY_AUTOMATED,
-        api_available=True,
-        estimated_time=5,
-        requires_confirmation=False,
-        notes="Agent will automatically create IAM Admin",
-        phase_type=PHASE_TYPE_MAP["assess-existing"]
-    )
+    step = get_step_definition(phase_type, step_slug)
+    if step is None:
+        raise HTTPException(status_code=404, detail=f"Step {step_slug} not found in phase {phase_type}")
+    options = parse_options(step, request.query_params)
+    await ensure_steps_seeded(db)
 
-    # Placeholder for IAM admin creation logic
     start_time = time.time()
-    result = create_fallback_admin_user(db, account_id)
-
-    # Create more informative logs with actual cost data
-    logs = [
-        "Initializing AWS SDK...",
-        "Connecting to AWS account...",
-        "Creating IAM Admin...",
-        f"Analysis complete: {result ['message'] if 'message' in result else 'No message provided.'}"
-    ]
-
-    status = StepStatus.COMPLETED if result["success"] else StepStatus.FAILED
+    if step.get("async_check") and async_aws_available():
+        result = await run_tracked_async(step["async_check"], db, account_id, *options)
+    else:
+        result = await run_aws(run_tracked, step["check"], db, account_id, *options)
+    # Convert datetime objects to strings before saving
+    result = convert_datetime(result)
+    logs = execution_logs(step, result)
+    status = execution_status(result)
     execution_time = int(time.time() - start_time)
 
     # Save result to database
     step_execution = StepExecutionCreate(
-        step_id=step_id,
+        step_id=step["id"],
         status=status,
         result_data=result,
         logs=logs,
         execution_time=execution_time
     )
-    PG_queries.create_step_execution(db, step_execution)
+    await run_db(PG_queries.create_step_execution, db, step_execution)
 
+    # Format the response for the frontend
     return {
-        "step_id": step_id,
-        "title": "Create Fallback IAM Admin",
+        "step_id": step["id"],
+        "title": step["title"],
         "status": status,
         "result": result,
         "logs": logs,
@@ -472,12 +309,12 @@ async def get_latest_step_execution_by_slug(phase_type: str, step_slug: str, db:
         raise HTTPException(status_code=404, detail=f"Step {step_slug} not found in phase {phase_type}")
     
     # Get the step information
-    step = PG_queries.get_step(db, step_id)
+    step = await run_db(PG_queries.get_step, db, step_id)
     if not step:
         raise HTTPException(status_code=404, detail=f"Step {step_id} not found")
     
     # Get the latest execution for this step
-    latest_execution = PG_queries.get_latest_step_execution(db, step_id)
+    latest_execution = await run_db(PG_queries.get_latest_step_execution, db, step_id)
     
     if not latest_execution:
         raise HTTPException(status_code=404, detail=f"No execution found for step {step_id}")
@@ -514,13 +351,13 @@ async def get_step_history_by_slug(phase_type: str, step_slug: str, db: Session
     if step_id not in PHASE_STEPS[phase_type]:
         raise HTTPException(status_code=404, detail=f"Step {step_slug} not found in phase {phase_type}")
     
-    executions = PG_queries.get_step_executions(db, step_id)
+    executions = await run_db(PG_queries.get_step_executions, db, step_id)
     
     if not executions:
         raise HTTPException(status_code=404, detail=f"No history found for step {step_id}")
     
     # Get step title
-    step = PG_queries.get_step(db, step_id)
+    step = await run_db(PG_queries.get_step, db, step_id)
     title = step.title if step else "Unknown Step"
     
     return [
@@ -15,4 +15,66 @@ class Settings:
     # Flag to use direct credentials instead of profile
     USE_DIRECT_CREDENTIALS = os.getenv("USE_DIRECT_CREDENTIALS", "false").lower() == "true"
 
+    # Process-wide boto3 session/client cache
+    AWS_SESSION_CACHE_MAX_SESSIONS = int(os.getenv("AWS_SESSION_CACHE_MAX_SESSIONS", "128"))
+    AWS_SESSION_CACHE_MAX_CLIENTS = int(os.getenv("AWS_SESSION_CACHE_MAX_CLIENTS", "1024"))
+    AWS_SESSION_CACHE_TTL_SECONDS = int(os.getenv("AWS_SESSION_CACHE_TTL_SECONDS", "900"))
+
+    # Number of services check_policy_references scans at the same time
+    POLICY_SCAN_MAX_WORKERS = int(os.getenv("POLICY_SCAN_MAX_WORKERS", "8"))
+
+    # "authorization_details" (bulk GetAccountAuthorizationDetails) or "per_policy" (GetPolicyVersion per policy)
+    IAM_SCAN_MODE = os.getenv("IAM_SCAN_MODE", "authorization_details")
+
+    # How long the shared AWS managed policy catalog is trusted before it is swept again
+    AWS_MANAGED_POLICY_CATALOG_TTL_HOURS = int(os.getenv("AWS_MANAGED_POLICY_CATALOG_TTL_HOURS", "24"))
+
+    # Shared pool for per-resource policy fetches, with per-service concurrency limits
+    RESOURCE_FETCH_MAX_WORKERS = int(os.getenv("RESOURCE_FETCH_MAX_WORKERS", "64"))
+    RESOURCE_FETCH_DEFAULT_LIMIT = int(os.getenv("RESOURCE_FETCH_DEFAULT_LIMIT", "8"))
+    RESOURCE_FETCH_LIMITS = os.getenv("RESOURCE_FETCH_LIMITS", "iam=4,s3=16,kms=8,sqs=8,sns=8,lambda=8,secretsmanager=8,organizations=4,ce=4")
+    AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+
+    # Regions scanned for regional resources: discovered per account with ec2:DescribeRegions
+    # and cached, unless SCAN_REGIONS pins a comma-separated list
+    SCAN_REGIONS = os.getenv("SCAN_REGIONS", "")
+    REGION_CACHE_TTL_SECONDS = int(os.getenv("REGION_CACHE_TTL_SECONDS", "21600"))
+    # Shared pool for per-region scans, caps how many regions are scanned at once across all checks
+    REGION_SCAN_MAX_WORKERS = int(os.getenv("REGION_SCAN_MAX_WORKERS", "16"))
+
+    # Executors that run the blocking boto3 and SQLAlchemy work of the API handlers off the event loop
+    AWS_EXECUTOR_MAX_WORKERS = int(os.getenv("AWS_EXECUTOR_MAX_WORKERS", "16"))
+    DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "8"))
+
+    # Background step jobs: how many run at once, and the minimum seconds between partial result writes
+    STEP_JOB_MAX_WORKERS = int(os.getenv("STEP_JOB_MAX_WORKERS", "4"))
+    STEP_JOB_PROGRESS_SECONDS = float(os.getenv("STEP_JOB_PROGRESS_SECONDS", "5"))
+    # Every process refreshes the executions of its jobs every STEP_JOB_PROGRESS_SECONDS; an
+    # in-progress execution not refreshed for this long belongs to a process that stopped
+    STEP_JOB_STALE_SECONDS = float(os.getenv("STEP_JOB_STALE_SECONDS", "30"))
+
+    # Run the checks that have an async version (only the RAM check so far) on the aiobotocore client layer
+    AWS_ASYNC_ENABLED = os.getenv("AWS_ASYNC_ENABLED", "false").lower() == "true"
+
+    # Resource share ARNs sent in one RAM association/resource listing call
+    RAM_SHARE_BATCH_SIZE = int(os.getenv("RAM_SHARE_BATCH_SIZE", "100"))
+
+    # How long an organization's delegated administrator sweep is reused
+    DELEGATED_ADMIN_CACHE_TTL_SECONDS = int(os.getenv("DELEGATED_ADMIN_CACHE_TTL_SECONDS", "3600"))
+
+    # Bucket name -> region cache of the S3 policy scanner
+    S3_BUCKET_REGION_CACHE_SIZE = int(os.getenv("S3_BUCKET_REGION_CACHE_SIZE", "100000"))
+    S3_BUCKET_REGION_CACHE_TTL_SECONDS = int(os.getenv("S3_BUCKET_REGION_CACHE_TTL_SECONDS", "86400"))
+
+    # Attempts (first one included) botocore's standard retry mode makes for a throttled or
+    # transiently failing call of a cached client, with jittered exponential backoff
+    THROTTLE_MAX_ATTEMPTS = int(os.getenv("THROTTLE_MAX_ATTEMPTS", "6"))
+
+    # Shared token bucket per (account, service, region) that every cached boto3 client waits on.
+    # Rates are requests per second: the ceiling a bucket climbs back to after throttling halved it.
+    RATE_GOVERNOR_ENABLED = os.getenv("RATE_GOVERNOR_ENABLED", "true").lower() == "true"
+    RATE_GOVERNOR_DEFAULT_RATE = float(os.getenv("RATE_GOVERNOR_DEFAULT_RATE", "50"))
+    RATE_GOVERNOR_RATES = os.getenv("RATE_GOVERNOR_RATES", "iam=15,organizations=8,ce=5,cloudformation=10,ram=10")
+    RATE_GOVERNOR_MIN_RATE = float(os.getenv("RATE_GOVERNOR_MIN_RATE", "0.5"))
+
 settings = Settings()
\ No newline at end of file
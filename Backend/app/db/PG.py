@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Numeric, Boolean, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy_utils import database_exists, create_database
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import create_engine, MetaData
@@ -44,6 +44,7 @@ class StepStatus(str, Enum):
     COMPLETED = 'completed'
     FAILED = 'failed'
     REQUIRES_ACTION = 'requires-action'
+    CANCELLED = 'cancelled'
 
 # Define models
 class MigrationProcess(Base):
@@ -114,6 +115,63 @@ class AccountManagement(Base):
     updated_by = Column(String(100), nullable=False)
     updated_at = Column(DateTime, nullable=False, default=datetime.now)
 
+class AwsManagedPolicyCatalog(Base):
+    __tablename__ = 'aws_managed_policy_catalog'
+    
+    # AWS managed policies are identical in every account, so one catalog is shared by all accounts
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    policy_arn = Column(String(2048), nullable=False, unique=True)
+    policy_name = Column(String(256), nullable=False)
+    version_id = Column(String(32), nullable=False)
+    document = Column(JSONB, nullable=True)
+    org_references = Column(JSONB, nullable=True)  # ORG_PATTERNS found in the document
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.now)  # last time the version was confirmed
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)  # last time the document was fetched
+
+class PolicyScanFingerprint(Base):
+    __tablename__ = 'policy_scan_fingerprint'
+    __table_args__ = (UniqueConstraint('account_id', 'service', 'resource_arn'),)
+    
+    # Last known state of each resource scanned by check_policy_references, used for incremental rescans
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(String(20), nullable=False)
+    service = Column(String(32), nullable=False)
+    resource_arn = Column(String(2048), nullable=False)
+    fingerprint = Column(String(256), nullable=False)  # list-level change token or content hash
+    result = Column(JSONB, nullable=True)  # finding returned for the resource, null when it had no org references
+    scanned_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class CostExplorerDaily(Base):
+    __tablename__ = 'cost_explorer_daily'
+    __table_args__ = (UniqueConstraint('account_id', 'usage_date'),)
+    
+    # Daily unblended cost from Cost Explorer, cached so that only estimated or missing days are fetched again
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(String(20), nullable=False)
+    usage_date = Column(Date, nullable=False)
+    amount = Column(Numeric(20, 10), nullable=False)
+    unit = Column(String(8), nullable=False, default='USD')
+    estimated = Column(Boolean, nullable=False, default=False)  # Cost Explorer may still revise the day
+    fetched_at = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class SavingsPlanUtilizationDaily(Base):
+    __tablename__ = 'savings_plan_utilization_daily'
+    __table_args__ = (UniqueConstraint('account_id', 'savings_plan_arn', 'usage_date'),)
+    
+    # Daily utilization of one Savings Plan, extended incrementally from get_savings_plans_utilization_details
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(String(20), nullable=False)
+    savings_plan_arn = Column(String(255), nullable=False)
+    usage_date = Column(Date, nullable=False)
+    total_commitment = Column(Numeric(20, 10), nullable=False)
+    used_commitment = Column(Numeric(20, 10), nullable=False)
+    unused_commitment = Column(Numeric(20, 10), nullable=False)
+    utilization_percentage = Column(Numeric(20, 10), nullable=False)
+    net_savings = Column(Numeric(20, 10), nullable=False)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.now)
+
 
 # Initialize database
 def init_db():
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
-from app.db.PG import StepExecution, MigrationProcess, Phase, Step, PhaseType, StepStatus, AutomationType, SessionLocal, AccountManagement
+from sqlalchemy import func
+from app.db.PG import StepExecution, MigrationProcess, Phase, Step, PhaseType, StepStatus, AutomationType, SessionLocal, AccountManagement, AwsManagedPolicyCatalog, PolicyScanFingerprint, CostExplorerDaily, SavingsPlanUtilizationDaily
+from sqlalchemy.dialects.postgresql import insert
 from app.db.schemas import StepExecutionCreate
 from datetime import datetime
 
@@ -71,12 +73,103 @@ def get_step_executions(db: Session, step_id: int, skip: int = 0, limit: int = 1
 
 def get_latest_step_execution(db: Session, step_id: int):
     """
-    Get the most recent execution for a specific step
+    Get the most recent finished (completed or failed) execution for a specific step;
+    in-progress and cancelled jobs have no result to show
     """
     return db.query(StepExecution).filter(
-        StepExecution.step_id == step_id
+        StepExecution.step_id == step_id,
+        StepExecution.status.in_([StepStatus.COMPLETED, StepStatus.FAILED])
     ).order_by(StepExecution.created_at.desc()).first()
 
+def get_step_execution(db: Session, execution_id: int):
+    """
+    Get a step execution by its ID
+    """
+    return db.query(StepExecution).filter(StepExecution.id == execution_id).first()
+
+def update_running_step_execution(db: Session, execution_id: int, status: str, result_data: dict = None,
+                                  logs: list = None, execution_time: int = None):
+    """
+    Update a step execution only while it is still in progress, so a cancelled or
+    finished execution is never overwritten. Step status follows status changes.
+    Returns True when the execution was updated.
+    """
+    values = {StepExecution.status: status, StepExecution.updated_at: datetime.now()}
+    if result_data is not None:
+        values[StepExecution.result_data] = result_data
+    if logs is not None:
+        values[StepExecution.logs] = logs
+    if execution_time is not None:
+        values[StepExecution.execution_time] = execution_time
+    updated = db.query(StepExecution).filter(
+        StepExecution.id == execution_id,
+        StepExecution.status == StepStatus.IN_PROGRESS
+    ).update(values, synchronize_session=False)
+    db.commit()
+    if updated and status != StepStatus.IN_PROGRESS:
+        step_id = db.query(StepExecution.step_id).filter(StepExecution.id == execution_id).scalar()
+        if status == StepStatus.CANCELLED:
+            restore_step_status(db, step_id)
+        else:
+            update_step_status(db, step_id, status)
+    return bool(updated)
+
+def restore_step_status(db: Session, step_id: int):
+    """
+    After an execution was cancelled, put its step back to the status of its latest
+    finished execution (pending without one), or in progress while another one runs
+    """
+    running = db.query(StepExecution.id).filter(
+        StepExecution.step_id == step_id,
+        StepExecution.status == StepStatus.IN_PROGRESS
+    ).first()
+    if running:
+        status = StepStatus.IN_PROGRESS
+    else:
+        latest = get_latest_step_execution(db, step_id)
+        status = latest.status if latest else StepStatus.PENDING
+    step = db.query(Step).filter(Step.id == step_id).first()
+    if step:
+        step.status = status
+        step.updated_at = datetime.utcnow()
+        db.commit()
+        update_phase_status(db, step.phase_id)
+
+def touch_step_executions(db: Session, execution_ids: list):
+    """
+    Heartbeat of the in-progress executions a process is running: bump their updated_at
+    """
+    if not execution_ids:
+        return 0
+    updated = db.query(StepExecution).filter(
+        StepExecution.id.in_(execution_ids),
+        StepExecution.status == StepStatus.IN_PROGRESS
+    ).update({StepExecution.updated_at: datetime.now()}, synchronize_session=False)
+    db.commit()
+    return updated
+
+def fail_interrupted_step_executions(db: Session, stale_before: datetime):
+    """
+    Mark the executions still in progress whose last heartbeat (updated_at, or created_at
+    before the first one) is older than stale_before as failed: the API process running
+    them has stopped. Jobs of live processes keep their rows fresh (touch_step_executions).
+    Returns the number of executions marked.
+    """
+    stale = (
+        StepExecution.status == StepStatus.IN_PROGRESS,
+        func.coalesce(StepExecution.updated_at, StepExecution.created_at) < stale_before
+    )
+    step_ids = [step_id for (step_id,) in db.query(StepExecution.step_id).filter(*stale).distinct()]
+    updated = db.query(StepExecution).filter(*stale).update({
+        StepExecution.status: StepStatus.FAILED,
+        StepExecution.logs: ["Interrupted: the API process running the job stopped"],
+        StepExecution.updated_at: datetime.now()
+    }, synchronize_session=False)
+    db.commit()
+    for step_id in step_ids:
+        update_step_status(db, step_id, StepStatus.FAILED)
+    return updated
+
 def get_step(db: Session, step_id: int):
     """
     Get a step by its ID
@@ -101,19 +194,11 @@ def update_step_execution(db: Session, execution_id: int, status: str, result_da
         
     return db_execution
 
-def create_or_update_step(db: Session, step_id: int, title: str, description: str, 
-                         automation_type: AutomationType, api_available: bool = True,
-                         estimated_time: int = 5, requires_confirmation: bool = False,
-                         notes: str = None, phase_type: PhaseType=None):
+def get_or_create_phase(db: Session, phase_type: PhaseType):
     """
-    Create a new step or update an existing one
+    Get the phase of a type, creating it (and the migration process) if it doesn't exist.
+    New rows are flushed, not committed.
     """
-    # Determine which phase this step belongs to
-    if phase_type is None:
-        # Default to ASSESS_EXISTING if not specified
-        phase_type = PhaseType.ASSESS_EXISTING
-    
-    # Get the phase (or create if it doesn't exist)
     phase = db.query(Phase).filter(Phase.type == phase_type).first()
     
     if not phase:
@@ -149,6 +234,23 @@ def create_or_update_step(db: Session, step_id: int, title: str, description: st
         db.add(phase)
         db.flush()
     
+    return phase
+
+def create_or_update_step(db: Session, step_id: int, title: str, description: str, 
+                         automation_type: AutomationType, api_available: bool = True,
+                         estimated_time: int = 5, requires_confirmation: bool = False,
+                         notes: str = None, phase_type: PhaseType=None):
+    """
+    Create a new step or update an existing one
+    """
+    # Determine which phase this step belongs to
+    if phase_type is None:
+        # Default to ASSESS_EXISTING if not specified
+        phase_type = PhaseType.ASSESS_EXISTING
+    
+    # Get the phase (or create if it doesn't exist)
+    phase = get_or_create_phase(db, phase_type)
+    
     # Check if step already exists
     existing_step = db.query(Step).filter(Step.id == step_id).first()
     
@@ -183,6 +285,52 @@ def create_or_update_step(db: Session, step_id: int, title: str, description: st
         db.refresh(new_step)
         return new_step
 
+def upsert_steps(db: Session, steps: list):
+    """
+    Insert or update the metadata of many steps in one statement, creating their phases
+    first if needed. Each entry is a dict with id, phase_type, title, description,
+    automation_type, api_available, estimated_time, requires_confirmation and notes.
+    The status of existing steps is left as it is.
+    """
+    if not steps:
+        return
+    phase_ids = {}
+    for step in steps:
+        if step["phase_type"] not in phase_ids:
+            phase_ids[step["phase_type"]] = get_or_create_phase(db, step["phase_type"]).id
+
+    statement = insert(Step).values([
+        {
+            "id": step["id"],
+            "phase_id": phase_ids[step["phase_type"]],
+            "title": step["title"],
+            "description": step["description"],
+            "status": StepStatus.PENDING,
+            "automation_type": step["automation_type"],
+            "api_available": step["api_available"],
+            "estimated_time": step["estimated_time"],
+            "requires_confirmation": step["requires_confirmation"],
+            "notes": step["notes"]
+        }
+        for step in steps
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[Step.id],
+        set_={
+            "phase_id": statement.excluded.phase_id,
+            "title": statement.excluded.title,
+            "description": statement.excluded.description,
+            "automation_type": statement.excluded.automation_type,
+            "api_available": statement.excluded.api_available,
+            "estimated_time": statement.excluded.estimated_time,
+            "requires_confirmation": statement.excluded.requires_confirmation,
+            "notes": statement.excluded.notes,
+            "updated_at": datetime.utcnow()
+        }
+    )
+    db.execute(statement)
+    db.commit()
+
 def update_step_status(db: Session, step_id: int, status: StepStatus):
     """
     Update a step's status and timestamps
@@ -366,3 +514,205 @@ def delete_account(db: Session, account_id: str):
         db.commit()
         return True
     return False
+
+def get_aws_managed_policy_catalog(db: Session):
+    """Get every cached AWS managed policy, ordered by name"""
+    return db.query(AwsManagedPolicyCatalog).order_by(AwsManagedPolicyCatalog.policy_name).all()
+
+def upsert_aws_managed_policies(db: Session, policies: list):
+    """
+    Insert or update AWS managed policy catalog entries in one statement.
+    Each entry is a dict with policy_arn, policy_name, version_id, document and org_references.
+    """
+    if not policies:
+        return
+    now = datetime.now()
+    statement = insert(AwsManagedPolicyCatalog).values([
+        dict(policy, refreshed_at=now, updated_at=now) for policy in policies
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[AwsManagedPolicyCatalog.policy_arn],
+        set_={
+            "policy_name": statement.excluded.policy_name,
+            "version_id": statement.excluded.version_id,
+            "document": statement.excluded.document,
+            "org_references": statement.excluded.org_references,
+            "refreshed_at": statement.excluded.refreshed_at,
+            "updated_at": statement.excluded.updated_at
+        }
+    )
+    db.execute(statement)
+    db.commit()
+
+def add_pending_aws_managed_policies(db: Session, policies: list):
+    """
+    Record catalog entries whose document could not be fetched yet, without a version or
+    document and with a refreshed_at in the past, so the catalog stays stale and the next
+    refresh retries them. Existing entries are left as they are.
+    Each entry is a dict with policy_arn and policy_name.
+    """
+    if not policies:
+        return
+    never = datetime(1970, 1, 1)
+    statement = insert(AwsManagedPolicyCatalog).values([
+        dict(policy, version_id='', document=None, org_references=[], refreshed_at=never, updated_at=never)
+        for policy in policies
+    ])
+    db.execute(statement.on_conflict_do_nothing(index_elements=[AwsManagedPolicyCatalog.policy_arn]))
+    db.commit()
+
+def mark_aws_managed_policies_refreshed(db: Session, keep_arns: list, refreshed_arns: list = None):
+    """
+    Stamp the confirmed catalog entries (refreshed_arns, default keep_arns) as refreshed
+    and drop the ones AWS no longer lists
+    """
+    if refreshed_arns is None:
+        refreshed_arns = keep_arns
+    db.query(AwsManagedPolicyCatalog).filter(
+        AwsManagedPolicyCatalog.policy_arn.notin_(keep_arns)
+    ).delete(synchronize_session=False)
+    db.query(AwsManagedPolicyCatalog).filter(
+        AwsManagedPolicyCatalog.policy_arn.in_(refreshed_arns)
+    ).update({AwsManagedPolicyCatalog.refreshed_at: datetime.now()}, synchronize_session=False)
+    db.commit()
+
+def get_policy_scan_fingerprints(db: Session, account_id: str):
+    """
+    Get the stored policy scan fingerprints of an account as {service: {resource_arn: {fingerprint, result}}}
+    """
+    fingerprints = {}
+    rows = db.query(
+        PolicyScanFingerprint.service,
+        PolicyScanFingerprint.resource_arn,
+        PolicyScanFingerprint.fingerprint,
+        PolicyScanFingerprint.result
+    ).filter(PolicyScanFingerprint.account_id == account_id).all()
+    for service, resource_arn, fingerprint, result in rows:
+        fingerprints.setdefault(service, {})[resource_arn] = {
+            "fingerprint": fingerprint,
+            "result": result
+        }
+    return fingerprints
+
+def replace_policy_scan_fingerprints(db: Session, account_id: str, fingerprints_by_service: dict):
+    """
+    Replace the stored fingerprints of the given services of an account in one transaction.
+    Resources that were not seen in this scan are dropped with the old rows.
+    """
+    if not fingerprints_by_service:
+        return
+    now = datetime.now()
+    db.query(PolicyScanFingerprint).filter(
+        PolicyScanFingerprint.account_id == account_id,
+        PolicyScanFingerprint.service.in_(list(fingerprints_by_service))
+    ).delete(synchronize_session=False)
+    rows = [
+        dict(fingerprint, account_id=account_id, service=service, scanned_at=now)
+        for service, fingerprints in fingerprints_by_service.items()
+        for fingerprint in fingerprints
+    ]
+    if rows:
+        db.execute(insert(PolicyScanFingerprint), rows)
+    db.commit()
+
+def get_cost_explorer_days(db: Session, account_id: str, start_date, end_date):
+    """
+    Get the cached daily costs of an account with start_date <= usage_date < end_date, ordered by day
+    """
+    return db.query(CostExplorerDaily).filter(
+        CostExplorerDaily.account_id == account_id,
+        CostExplorerDaily.usage_date >= start_date,
+        CostExplorerDaily.usage_date < end_date
+    ).order_by(CostExplorerDaily.usage_date).all()
+
+def upsert_cost_explorer_days(db: Session, account_id: str, days: list):
+    """
+    Insert or update daily costs of an account in one statement.
+    Each entry is a dict with usage_date, amount, unit and estimated.
+    """
+    if not days:
+        return
+    now = datetime.now()
+    statement = insert(CostExplorerDaily).values([
+        dict(day, account_id=account_id, fetched_at=now) for day in days
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[CostExplorerDaily.account_id, CostExplorerDaily.usage_date],
+        set_={
+            "amount": statement.excluded.amount,
+            "unit": statement.excluded.unit,
+            "estimated": statement.excluded.estimated,
+            "fetched_at": statement.excluded.fetched_at
+        }
+    )
+    db.execute(statement)
+    db.commit()
+
+# savings_plan_arn of the row that marks a day without any Savings Plan utilization, so the
+# day counts as cached; marker rows are left out of aggregate_savings_plan_utilization
+SAVINGS_PLAN_EMPTY_DAY = ''
+
+def get_savings_plan_utilization_days(db: Session, account_id: str, start_date, end_date):
+    """
+    Get the cached per-plan daily utilization of an account with start_date <= usage_date < end_date,
+    including SAVINGS_PLAN_EMPTY_DAY marker rows
+    """
+    return db.query(SavingsPlanUtilizationDaily).filter(
+        SavingsPlanUtilizationDaily.account_id == account_id,
+        SavingsPlanUtilizationDaily.usage_date >= start_date,
+        SavingsPlanUtilizationDaily.usage_date < end_date
+    ).order_by(SavingsPlanUtilizationDaily.usage_date, SavingsPlanUtilizationDaily.savings_plan_arn).all()
+
+def upsert_savings_plan_utilization_days(db: Session, account_id: str, days: list):
+    """
+    Insert or update per-plan daily utilization of an account in one statement.
+    Each entry is a dict with savings_plan_arn, usage_date and the commitment,
+    utilization and savings columns.
+    """
+    if not days:
+        return
+    now = datetime.now()
+    statement = insert(SavingsPlanUtilizationDaily).values([
+        dict(day, account_id=account_id, fetched_at=now) for day in days
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            SavingsPlanUtilizationDaily.account_id,
+            SavingsPlanUtilizationDaily.savings_plan_arn,
+            SavingsPlanUtilizationDaily.usage_date
+        ],
+        set_={
+            "total_commitment": statement.excluded.total_commitment,
+            "used_commitment": statement.excluded.used_commitment,
+            "unused_commitment": statement.excluded.unused_commitment,
+            "utilization_percentage": statement.excluded.utilization_percentage,
+            "net_savings": statement.excluded.net_savings,
+            "fetched_at": statement.excluded.fetched_at
+        }
+    )
+    db.execute(statement)
+    db.commit()
+
+def aggregate_savings_plan_utilization(db: Session, account_id: str, start_date, end_date):
+    """
+    Aggregate the cached daily utilization of [start_date, end_date) in one grouped query:
+    one row per plan plus a ROLLUP row with savings_plan_arn None covering all plans.
+    Each row has days, mean_utilization, p10_utilization, used_commitment,
+    total_commitment, unused_commitment and net_savings.
+    """
+    table = SavingsPlanUtilizationDaily
+    return db.query(
+        table.savings_plan_arn,
+        func.count().label("days"),
+        func.avg(table.utilization_percentage).label("mean_utilization"),
+        func.percentile_cont(0.1).within_group(table.utilization_percentage).label("p10_utilization"),
+        func.sum(table.used_commitment).label("used_commitment"),
+        func.sum(table.total_commitment).label("total_commitment"),
+        func.sum(table.unused_commitment).label("unused_commitment"),
+        func.sum(table.net_savings).label("net_savings")
+    ).filter(
+        table.account_id == account_id,
+        table.savings_plan_arn != SAVINGS_PLAN_EMPTY_DAY,
+        table.usage_date >= start_date,
+        table.usage_date < end_date
+    ).group_by(func.rollup(table.savings_plan_arn)).all()
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine, inspect, MetaData, Table, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, inspect, MetaData, Table, Column, Integer, String, DateTime, Date, Numeric, Boolean, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 import os
 from dotenv import load_dotenv
 from datetime import datetime
@@ -45,6 +46,93 @@ def run_migrations():
     else:
         print("account_management table already exists")
 
+    # Check if aws_managed_policy_catalog table exists
+    if not inspector.has_table('aws_managed_policy_catalog'):
+        print("Creating aws_managed_policy_catalog table...")
+        metadata = MetaData()
+        aws_managed_policy_catalog = Table(
+            'aws_managed_policy_catalog',
+            metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('policy_arn', String(2048), nullable=False, unique=True),
+            Column('policy_name', String(256), nullable=False),
+            Column('version_id', String(32), nullable=False),
+            Column('document', JSONB, nullable=True),
+            Column('org_references', JSONB, nullable=True),
+            Column('refreshed_at', DateTime, nullable=False, default=datetime.now),
+            Column('updated_at', DateTime, nullable=False, default=datetime.now)
+        )
+        metadata.create_all(engine, tables=[aws_managed_policy_catalog])
+        print("aws_managed_policy_catalog table created successfully")
+    else:
+        print("aws_managed_policy_catalog table already exists")
+
+    # Check if policy_scan_fingerprint table exists
+    if not inspector.has_table('policy_scan_fingerprint'):
+        print("Creating policy_scan_fingerprint table...")
+        metadata = MetaData()
+        policy_scan_fingerprint = Table(
+            'policy_scan_fingerprint',
+            metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('account_id', String(20), nullable=False),
+            Column('service', String(32), nullable=False),
+            Column('resource_arn', String(2048), nullable=False),
+            Column('fingerprint', String(256), nullable=False),
+            Column('result', JSONB, nullable=True),
+            Column('scanned_at', DateTime, nullable=False, default=datetime.now),
+            UniqueConstraint('account_id', 'service', 'resource_arn')
+        )
+        metadata.create_all(engine, tables=[policy_scan_fingerprint])
+        print("policy_scan_fingerprint table created successfully")
+    else:
+        print("policy_scan_fingerprint table already exists")
+
+    # Check if cost_explorer_daily table exists
+    if not inspector.has_table('cost_explorer_daily'):
+        print("Creating cost_explorer_daily table...")
+        metadata = MetaData()
+        cost_explorer_daily = Table(
+            'cost_explorer_daily',
+            metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('account_id', String(20), nullable=False),
+            Column('usage_date', Date, nullable=False),
+            Column('amount', Numeric(20, 10), nullable=False),
+            Column('unit', String(8), nullable=False, default='USD'),
+            Column('estimated', Boolean, nullable=False, default=False),
+            Column('fetched_at', DateTime, nullable=False, default=datetime.now),
+            UniqueConstraint('account_id', 'usage_date')
+        )
+        metadata.create_all(engine, tables=[cost_explorer_daily])
+        print("cost_explorer_daily table created successfully")
+    else:
+        print("cost_explorer_daily table already exists")
+
+    # Check if savings_plan_utilization_daily table exists
+    if not inspector.has_table('savings_plan_utilization_daily'):
+        print("Creating savings_plan_utilization_daily table...")
+        metadata = MetaData()
+        savings_plan_utilization_daily = Table(
+            'savings_plan_utilization_daily',
+            metadata,
+            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('account_id', String(20), nullable=False),
+            Column('savings_plan_arn', String(255), nullable=False),
+            Column('usage_date', Date, nullable=False),
+            Column('total_commitment', Numeric(20, 10), nullable=False),
+            Column('used_commitment', Numeric(20, 10), nullable=False),
+            Column('unused_commitment', Numeric(20, 10), nullable=False),
+            Column('utilization_percentage', Numeric(20, 10), nullable=False),
+            Column('net_savings', Numeric(20, 10), nullable=False),
+            Column('fetched_at', DateTime, nullable=False, default=datetime.now),
+            UniqueConstraint('account_id', 'savings_plan_arn', 'usage_date')
+        )
+        metadata.create_all(engine, tables=[savings_plan_utilization_daily])
+        print("savings_plan_utilization_daily table created successfully")
+    else:
+        print("savings_plan_utilization_daily table already exists")
+
 if __name__ == "__main__":
     print("Running database migrations...")
     run_migrations()
@@ -30,6 +30,19 @@ class StepResponse(BaseModel):
     logs: List[str]
     execution_time: Optional[int] = None
 
+# Background execution of a step; job_id is the id of its step execution
+class StepJobResponse(BaseModel):
+    job_id: int
+    step_id: int
+    title: str
+    status: str
+    state: Optional[str] = None
+    result: Dict[str, Any]
+    logs: List[str]
+    execution_time: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
 class AccountBase(BaseModel):
     account_name: str
     account_id: str
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import OrderedDict
+from app.core.config import settings
+from app.services.aws_session_cache import aws_session_cache
+from app.services.executors import run_aws
+from app.services.rate_governor import rate_governor
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:
+    # Optional dependency: without aiobotocore every check runs on the blocking boto3 layer
+    AioConfig = None
+    get_session = None
+
+
+def async_aws_available():
+    return get_session is not None and settings.AWS_ASYNC_ENABLED
+
+
+def _frozen_credentials(session):
+    """
+    Current credentials of a boto3 session, refreshing credentials that are about to
+    expire (STS, instance metadata, SSO); a no-op for static keys
+    """
+    return session.get_credentials().get_frozen_credentials()
+
+
+# Seconds a replaced client stays open for requests that are still using it
+RETIRED_CLIENT_GRACE_SECONDS = 120
+
+
+class AsyncClientPool:
+    """
+    aiobotocore clients shared per (account, credential fingerprint, service, region),
+    the asyncio counterpart of AWSSessionCache. Each client keeps its own connection
+    pool of AWS_MAX_POOL_CONNECTIONS, so one event loop can have hundreds of requests
+    in flight per account without a thread per call.
+
+    Like the boto3 clients, entries live at most AWS_SESSION_CACHE_TTL_SECONDS, at most
+    AWS_SESSION_CACHE_MAX_CLIENTS are kept (least recently used first out), and
+    aws_session_cache.invalidate() of their account drops them. A client is also rebuilt
+    when the session's credentials change, which happens for refreshable profile or STS
+    credentials without changing the fingerprint. Replaced clients are closed after
+    RETIRED_CLIENT_GRACE_SECONDS.
+
+    Requests go through the account's rate_governor buckets like those of boto3 clients.
+    Clients belong to the event loop that created them; the API process owns one pool
+    and closes it at shutdown.
+    """
+
+    def __init__(self, max_clients: int, ttl_seconds: int):
+        self.max_clients = max_clients
+        self.ttl_seconds = ttl_seconds
+        self._clients = OrderedDict()
+        self._retired = []
+        self._lock = None
+        self.created = 0
+        self.replaced = 0
+
+    def _retire(self, key):
+        entry = self._clients.pop(key)
+        self._retired.append((entry["client"], time.monotonic()))
+        self.replaced += 1
+
+    async def _close_retired(self, force: bool = False):
+        now = time.monotonic()
+        keep = []
+        for client, retired_at in self._retired:
+            if force or now - retired_at >= RETIRED_CLIENT_GRACE_SECONDS:
+                try:
+                    await client.close()
+                except Exception as e:
+                    print(f"Error closing async AWS client: {str(e)}")
+            else:
+                keep.append((client, retired_at))
+        self._retired = keep
+
+    async def client(self, session, service_name: str, region_name: str = None):
+        """
+        Return the shared async client for a boto3 session (usually a CachedSession from
+        get_aws_session), created with the session's current credentials
+        """
+        if get_session is None:
+            raise RuntimeError("aiobotocore is not installed")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        region = region_name or session.region_name
+        account_key = getattr(session, "account_key", None)
+        key = (account_key, getattr(session, "fingerprint", None), service_name, region)
+        # A refresh is blocking STS/IMDS I/O, so it runs on the AWS executor
+        credentials = await run_aws(_frozen_credentials, session)
+        generation = aws_session_cache.generation(account_key)
+
+        async with self._lock:
+            await self._close_retired()
+            entry = self._clients.get(key)
+            if entry is not None and (
+                entry["credentials"] != credentials
+                or entry["generation"] != generation
+                or time.monotonic() - entry["created_at"] > self.ttl_seconds
+            ):
+                self._retire(key)
+                entry = None
+            if entry is None:
+                # AWS_ENDPOINT_URL is honoured by botocore, which points the clients at a local moto server
+                client = await get_session().create_client(
+                    service_name,
+                    region_name=region,
+                    aws_access_key_id=credentials.access_key,
+                    aws_secret_access_key=credentials.secret_key,
+                    aws_session_token=credentials.token,
+                    config=AioConfig(
+                        max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+                        retries={"mode": "standard", "total_max_attempts": settings.THROTTLE_MAX_ATTEMPTS}
+                    )
+                ).__aenter__()
+                # Same (account, service, region) buckets as the boto3 clients
+                rate_governor.attach(client, account_key, asynchronous=True)
+                entry = {
+                    "client": client,
+                    "credentials": credentials,
+                    "generation": generation,
+                    "created_at": time.monotonic()
+                }
+                self._clients[key] = entry
+                self.created += 1
+                while len(self._clients) > self.max_clients:
+                    self._retire(next(iter(self._clients)))
+            self._clients.move_to_end(key)
+        return entry["client"]
+
+    async def close(self):
+        for key in list(self._clients):
+            self._retire(key)
+        await self._close_retired(force=True)
+        self._lock = None
+
+    def stats(self):
+        return {
+            "clients": len(self._clients),
+            "max_clients": self.max_clients,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self.created,
+            "replaced": self.replaced,
+            "retired_open": len(self._retired)
+        }
+
+
+async def paginate(client, operation: str, result_key: str, **kwargs):
+    """All items under result_key of every page of an async paginator"""
+    items = []
+    async for page in client.get_paginator(operation).paginate(**kwargs):
+        items.extend(page.get(result_key, []))
+    return items
+
+
+# Process-wide pool used by the async checks of the API
+async_client_pool = AsyncClientPool(
+    max_clients=settings.AWS_SESSION_CACHE_MAX_CLIENTS,
+    ttl_seconds=settings.AWS_SESSION_CACHE_TTL_SECONDS
+)
@@ -1,11 +1,12 @@
-import boto3
 from app.core.config import settings
 from app.db import PG_queries
+from app.services.aws_session_cache import aws_session_cache
 from sqlalchemy.orm import Session
 
 def get_aws_session(db: Session = None, account_id: str = None):
     """
-    Get AWS session based on account_id from frontend or fallback to settings
+    Get AWS session based on account_id from frontend or fallback to settings.
+    Sessions and their clients are served from the process-wide aws_session_cache.
     
     Args:
         db: Database session
@@ -18,7 +19,8 @@ def get_aws_session(db: Session = None, account_id: str = None):
     if db and account_id:
         account = PG_queries.get_account_by_id(db, account_id)
         if account:
-            return boto3.Session(
+            return aws_session_cache.get_session(
+                account_key=account.account_id,
                 aws_access_key_id=account.accesskey,
                 aws_secret_access_key=account.secretkey,
                 aws_session_token=account.session_token,
@@ -27,11 +29,16 @@ def get_aws_session(db: Session = None, account_id: str = None):
     
     # Fallback to settings
     if settings.USE_DIRECT_CREDENTIALS and settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
-        return boto3.Session(
+        return aws_session_cache.get_session(
+            account_key="default",
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             aws_session_token=settings.AWS_SESSION_TOKEN,
             region_name=settings.AWS_REGION
         )
     else:
-        return boto3.Session(profile_name=settings.AWS_PROFILE, region_name=settings.AWS_REGION)
\ No newline at end of file
+        return aws_session_cache.get_session(
+            account_key="default",
+            profile_name=settings.AWS_PROFILE,
+            region_name=settings.AWS_REGION
+        )
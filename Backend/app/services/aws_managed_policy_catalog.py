@@ -0,0 +1,112 @@
+import threading
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.db import PG_queries
+from app.db.session import SessionLocal
+from app.services.concurrency import fetch_all
+
+# Only one refresh sweep per process at a time; concurrent account scans wait and reuse it
+_refresh_lock = threading.Lock()
+
+
+def is_catalog_policy(policy: dict):
+    """AWS managed policies worth checking for org references"""
+    return 'organization' in policy['PolicyName'].lower()
+
+
+def _catalog_entry(row):
+    return {
+        "policy_arn": row.policy_arn,
+        "policy_name": row.policy_name,
+        "version_id": row.version_id,
+        "document": row.document,
+        "org_references": row.org_references or []
+    }
+
+
+def _is_stale(rows):
+    if not rows:
+        return True
+    oldest = min(row.refreshed_at for row in rows)
+    return datetime.now() - oldest > timedelta(hours=settings.AWS_MANAGED_POLICY_CATALOG_TTL_HOURS)
+
+
+def refresh_aws_managed_policy_catalog(session, db, find_references):
+    """
+    Sweep the AWS managed policies once and fetch documents only for new or changed versions.
+    Policies whose document could not be fetched are not stamped as refreshed (new ones are
+    recorded as pending), which keeps the catalog stale so the next scan retries them.
+    Returns counts of listed, fetched and failed policies.
+    """
+    iam_client = session.client('iam')
+    cached = {row.policy_arn: row for row in PG_queries.get_aws_managed_policy_catalog(db)}
+
+    listed = []
+    paginator = iam_client.get_paginator('list_policies')
+    for page in paginator.paginate(Scope='AWS'):
+        listed.extend(policy for policy in page['Policies'] if is_catalog_policy(policy))
+
+    changed = [
+        policy for policy in listed
+        if policy['Arn'] not in cached or cached[policy['Arn']].version_id != policy['DefaultVersionId']
+    ]
+
+    def fetch(policy):
+        return iam_client.get_policy_version(
+            PolicyArn=policy['Arn'],
+            VersionId=policy['DefaultVersionId']
+        )['PolicyVersion']['Document']
+
+    updates = []
+    failed = []
+    for policy, document, error in fetch_all('iam', fetch, changed):
+        if error:
+            # Keep the previous version, its version mismatch makes the next refresh retry it
+            print(f"Error processing AWS policy {policy['PolicyName']}: {str(error)}")
+            failed.append(policy)
+            continue
+        updates.append({
+            "policy_arn": policy['Arn'],
+            "policy_name": policy['PolicyName'],
+            "version_id": policy['DefaultVersionId'],
+            "document": document,
+            "org_references": find_references(document)
+        })
+
+    PG_queries.upsert_aws_managed_policies(db, updates)
+    PG_queries.add_pending_aws_managed_policies(db, [
+        {"policy_arn": policy['Arn'], "policy_name": policy['PolicyName']}
+        for policy in failed if policy['Arn'] not in cached
+    ])
+    failed_arns = {policy['Arn'] for policy in failed}
+    PG_queries.mark_aws_managed_policies_refreshed(
+        db,
+        [policy['Arn'] for policy in listed],
+        [policy['Arn'] for policy in listed if policy['Arn'] not in failed_arns]
+    )
+    return {"listed": len(listed), "fetched": len(updates), "failed": len(failed)}
+
+
+def get_aws_managed_policy_catalog(session, find_references):
+    """
+    Return the shared AWS managed policy catalog as a list of dicts, refreshing it
+    incrementally first when it is older than AWS_MANAGED_POLICY_CATALOG_TTL_HOURS.
+    The second value describes the refresh, or is None when the cache was used as is.
+    """
+    db = SessionLocal()
+    try:
+        rows = PG_queries.get_aws_managed_policy_catalog(db)
+        refresh = None
+        if _is_stale(rows):
+            with _refresh_lock:
+                db.expire_all()
+                rows = PG_queries.get_aws_managed_policy_catalog(db)
+                # Another scan may have refreshed it while this one waited for the lock
+                if _is_stale(rows):
+                    refresh = refresh_aws_managed_policy_catalog(session, db, find_references)
+                    db.expire_all()
+                    rows = PG_queries.get_aws_managed_policy_catalog(db)
+        # Pending entries have no document yet
+        return [_catalog_entry(row) for row in rows if row.version_id], refresh
+    finally:
+        db.close()
@@ -1,18 +1,104 @@
-import boto3
 from botocore.exceptions import ClientError
 from app.core.config import settings
-import json
-import re
 import string
 import random
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import as_completed
+from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import PG_queries
 from app.services.aws_client_helper import get_aws_session
+from app.services.policy_scanners import POLICY_SCANNERS
+from app.services.concurrency import ContextThreadPoolExecutor, fetch_all, async_fetch_all
+from app.services.aws_async import async_client_pool, paginate
+from app.services.executors import run_db
+from app.services.reservations import RESERVATION_SOURCES, EXPIRY_WARNING_DAYS, get_reservation_inventory, get_savings_plans, sort_reservations
+from app.services.savings_plans import UTILIZATION_WINDOW_DAYS, get_utilization_series, aggregate_utilization
+from app.services.stacksets import SERVICE_MANAGED, auto_deployment_label, list_stack_set_summaries, describe_stack_sets, get_stack_instance_targets
+from app.services.cost_explorer import COST_WINDOW_DAYS, get_daily_costs, monthly_billing_periods, get_linked_account_costs
+from app.services.delegated_admins import get_delegated_administrators, get_regional_security_admins, service_name
+
+def _ram_share_batch(ram_client, share_arns: list):
+    """
+    Fetch the principal associations and resources of a batch of shares with one
+    paginated call each, grouped by share ARN
+    """
+    associations = {arn: [] for arn in share_arns}
+    paginator = ram_client.get_paginator('get_resource_share_associations')
+    for page in paginator.paginate(resourceShareArns=share_arns, associationType='PRINCIPAL'):
+        for assoc in page.get('resourceShareAssociations', []):
+            associations.setdefault(assoc.get('resourceShareArn'), []).append(assoc)
+
+    resources = {arn: [] for arn in share_arns}
+    paginator = ram_client.get_paginator('list_resources')
+    for page in paginator.paginate(resourceOwner='SELF', resourceShareArns=share_arns):
+        for res in page.get('resources', []):
+            resources.setdefault(res.get('resourceShareArn'), []).append({
+                'Resource_arn': res.get('arn', ''),
+                'Resource_type': res.get('type', 'Unknown'),
+            })
+
+    return associations, resources
+
+
+def _ram_results(owned_shares: list, associations: dict, resources: dict, failed: set):
+    """
+    Build the RAM check result from the owned shares and their associations and
+    resources by share ARN; shares in failed are left out
+    """
+    all_shares = []
+    org_shares = []
+
+    for share in owned_shares:
+        if share['resourceShareArn'] in failed:
+            continue
+        principal_associations = associations.get(share['resourceShareArn'], [])
+
+        share_details = {
+            'Name': share.get('name'),
+            'ARN': share.get('resourceShareArn'),
+            'Status': share.get('status'),
+            'Resources': resources.get(share['resourceShareArn'], [])
+        }
+
+        # If no principal associations, treat as self-share
+        if not principal_associations:
+            all_shares.append(share_details)
+        else:
+            for assoc in principal_associations:
+                # The associated principal is returned as associatedEntity
+                principal = assoc.get('associatedEntity', '')
+                # Only add org/OUs to org_shares
+                if principal.startswith('arn:aws:organizations::'):
+                    org_shares.append(share_details)
+                all_shares.append(share_details)
+
+    return {
+        "success": True,
+        "shared_resources": all_shares,
+        "org_shared_resources": org_shares,
+        "message": f"Found {len(all_shares)} shared resources, {len(org_shares)} with organization/OUs"
+    }
+
+
+def _ram_error_result(error: Exception):
+    error_message = str(error)
+    print(f"Error in RAM check: {error_message}")
+    return {
+        "success": False,
+        "shared_resources": [],
+        "org_shared_resources": [],
+        "message": f"Error checking RAM shared resources: {error_message}"
+    }
+
 
 def check_ram_shared_resources(db: Session = None, account_id: str = None):
     """
     Check for resources shared via RAM with the organization, OUs, or accounts.
     Returns only the fields needed for frontend display.
+    Shares are listed once, then their associations and resources are fetched for
+    RAM_SHARE_BATCH_SIZE shares per call, with the batches running concurrently.
     """
     try:
         session = get_aws_session(db, account_id)
@@ -20,126 +106,142 @@ def check_ram_shared_resources(db: Session = None, account_id: str = None):
             raise ValueError("Failed to create AWS session. Check your credentials and configuration.")
         ram_client = session.client('ram')
 
-        owned_shares = ram_client.get_resource_shares(resourceOwner='SELF')
-        all_shares = []
-        org_shares = []
+        owned_shares = []
+        paginator = ram_client.get_paginator('get_resource_shares')
+        for page in paginator.paginate(resourceOwner='SELF'):
+            owned_shares.extend(page.get('resourceShares', []))
 
-        for share in owned_shares.get('resourceShares', []):
-            try:
-                principal_associations = ram_client.get_resource_share_associations(
-                    resourceShareArns=[share['resourceShareArn']],
-                    associationType='PRINCIPAL'
-                ).get('resourceShareAssociations', [])
-
-                # Get detailed resource info using list_resources
-                resources = []
-                paginator = ram_client.get_paginator('list_resources')
-                for page in paginator.paginate(
-                    resourceOwner='SELF',
-                    resourceShareArns=[share['resourceShareArn']]
-                ):
-                    for res in page.get('resources', []):
-                        resources.append({
-                            'Resource_arn': res.get('arn', ''),
-                            'Resource_type': res.get('type', 'Unknown'),
-                        })
-
-                share_details = {
-                    'Name': share.get('name'),
-                    'ARN': share.get('resourceShareArn'),
-                    'Status': share.get('status'),
-                    'Resources': resources
-                }
+        share_arns = [share['resourceShareArn'] for share in owned_shares]
+        batch_size = max(1, settings.RAM_SHARE_BATCH_SIZE)
+        batches = [share_arns[i:i + batch_size] for i in range(0, len(share_arns), batch_size)]
 
-                # If no principal associations, treat as self-share
-                if not principal_associations:
-                    all_shares.append(share_details)
-                else:
-                    for assoc in principal_associations:
-                        principal = assoc.get('principal', '')
-                        # Only add org/OUs to org_shares
-                        if principal.startswith('arn:aws:organizations::'):
-                            org_shares.append(share_details)
-                        all_shares.append(share_details)
-            except ClientError as e:
-                print(f"Error checking associations for share {share.get('name')}: {e}")
+        associations = {}
+        resources = {}
+        failed = set()
+        for batch, outcome, error in fetch_all('ram', lambda batch: _ram_share_batch(ram_client, batch), batches):
+            if error:
+                print(f"Error checking associations for {len(batch)} shares: {error}")
+                failed.update(batch)
                 continue
+            associations.update(outcome[0])
+            resources.update(outcome[1])
 
-        return {
-            "success": True,
-            "shared_resources": all_shares,
-            "org_shared_resources": org_shares,
-            "message": f"Found {len(all_shares)} shared resources, {len(org_shares)} with organization/OUs"
-        }
+        return _ram_results(owned_shares, associations, resources, failed)
 
     except ClientError as e:
-        error_message = str(e)
-        print(f"Error in RAM check: {error_message}")
-        return {
-             "success": False,
-            "shared_resources": [],
-            "org_shared_resources": [],
-            "message": f"Error checking RAM shared resources: {error_message}"
-        }
+        return _ram_error_result(e)
 
 
-def check_delegated_admins(db: Session = None, account_id: str = None):
+async def _ram_share_batch_async(ram_client, share_arns: list):
+    """_ram_share_batch on an async client"""
+    associations = {arn: [] for arn in share_arns}
+    for assoc in await paginate(ram_client, 'get_resource_share_associations', 'resourceShareAssociations',
+                                resourceShareArns=share_arns, associationType='PRINCIPAL'):
+        associations.setdefault(assoc.get('resourceShareArn'), []).append(assoc)
+
+    resources = {arn: [] for arn in share_arns}
+    for res in await paginate(ram_client, 'list_resources', 'resources',
+                              resourceOwner='SELF', resourceShareArns=share_arns):
+        resources.setdefault(res.get('resourceShareArn'), []).append({
+            'Resource_arn': res.get('arn', ''),
+            'Resource_type': res.get('type', 'Unknown'),
+        })
+
+    return associations, resources
+
+
+async def check_ram_shared_resources_async(db: Session = None, account_id: str = None):
     """
-    Check if services like AWS Backup, GuardDuty, and Inspector have delegated admins.
+    check_ram_shared_resources written against the asyncio AWS layer: the share batches
+    are awaited concurrently on the event loop instead of occupying resource pool threads.
+    Needs aiobotocore, see async_aws_available.
     """
-    results = {}
     try:
-        # Get AWS session
-        session = get_aws_session(db, account_id)
+        session = await run_db(get_aws_session, db, account_id)
         if not session:
             raise ValueError("Failed to create AWS session. Check your credentials and configuration.")
-        
-        guardduty = session.client('guardduty')
-        guardduty_admins = guardduty.list_organization_admin_accounts()
-        results['GuardDuty'] = guardduty_admins.get('AdminAccounts', [])
-        print(f"GuardDuty delegated admins: {len(results['GuardDuty'])}")
-    except ClientError as e:
-        print(f"Error checking GuardDuty: {e}")
-        results['GuardDuty'] = f"Error: {str(e)}"
-    
-    # Check AWS Backup delegated admin
-    try:
-        organizations = session.client('organizations')
-        backup_admins = organizations.list_delegated_administrators(ServicePrincipal='backup.amazonaws.com')
-        results['AWS Backup'] = backup_admins.get('DelegatedAdministrators', [])
-        print(f"AWS Backup delegated admins: {len(results['AWS Backup'])}")
+        ram_client = await async_client_pool.client(session, 'ram')
+
+        owned_shares = await paginate(ram_client, 'get_resource_shares', 'resourceShares', resourceOwner='SELF')
+
+        share_arns = [share['resourceShareArn'] for share in owned_shares]
+        batch_size = max(1, settings.RAM_SHARE_BATCH_SIZE)
+        batches = [share_arns[i:i + batch_size] for i in range(0, len(share_arns), batch_size)]
+
+        associations = {}
+        resources = {}
+        failed = set()
+        for batch, outcome, error in await async_fetch_all('ram', lambda batch: _ram_share_batch_async(ram_client, batch), batches):
+            if error:
+                print(f"Error checking associations for {len(batch)} shares: {error}")
+                failed.update(batch)
+                continue
+            associations.update(outcome[0])
+            resources.update(outcome[1])
+
+        return _ram_results(owned_shares, associations, resources, failed)
+
     except ClientError as e:
-        print(f"Error checking AWS Backup: {e}")
-        results['AWS Backup'] = f"Error: {str(e)}"
-    
-    # Check Inspector delegated admin
+        return _ram_error_result(e)
+
+
+def check_delegated_admins(db: Session = None, account_id: str = None, refresh: bool = False):
+    """
+    Check which services (AWS Backup, GuardDuty, Inspector, Security Hub, Config, ...)
+    have delegated admins, by sweeping every delegated administrator of the organization.
+    GuardDuty and Inspector admins are also listed per enabled region, since they are
+    regional settings. Both are shared by all accounts of the organization for
+    DELEGATED_ADMIN_CACHE_TTL_SECONDS unless refresh is set.
+    """
+    results = {"success": True}
     try:
-        # Get region from session
-        region = session.region_name if hasattr(session, "region_name") else None
-        print("Using region:", region)
-        inspector2 = session.client('inspector2', region_name=region)
-        inspector_admin = inspector2.list_delegated_admin_accounts()
-        if inspector_admin['delegatedAdminAccounts']:
-            results['Inspector'] = inspector_admin['delegatedAdminAccounts']
-            print(f"Inspector delegated admin: {inspector_admin['delegatedAdminAccounts'][0]['accountId']}")
-        else:
-            results['Inspector'] = []
-            print("No Inspector delegated admin found")
+        # Get AWS session
+        session = get_aws_session(db, account_id)
+        if not session:
+            raise ValueError("Failed to create AWS session. Check your credentials and configuration.")
+
+        organization_id, sweep, cached = get_delegated_administrators(session, refresh)
+        regional_admins, regional_cached = get_regional_security_admins(session, organization_id, refresh)
     except ClientError as e:
-        print(f"Error checking Inspector: {e}")
-        results['Inspector'] = []
-    
-    # Print detailed results
-    print("\nDetailed results:")
-    print(json.dumps(results, indent=2, default=str))
-    
+        print(f"Error checking delegated admins: {e}")
+        results["error"] = str(e)
+        results["success"] = False
+        results["message"] = f"Error checking delegated admins: {str(e)}"
+        return results
+
+    results["delegated_administrators"] = sweep["administrators"]
+    for service_principal in sorted(sweep["services"], key=service_name):
+        results[service_name(service_principal)] = sweep["services"][service_principal]
+    results["regional_security_admins"] = regional_admins
+
+    results["summary"] = {
+        "organization_id": organization_id,
+        "administrator_count": len(sweep["administrators"]),
+        "service_count": len(sweep["services"]),
+        "swept_at": sweep["swept_at"],
+        "cached": cached,
+        "regions_checked": len(regional_admins),
+        "guardduty_admin_regions": [row["Region"] for row in regional_admins if row["GuardDuty"]],
+        "inspector_admin_regions": [row["Region"] for row in regional_admins if row["Inspector"]],
+        "regional_cached": regional_cached
+    }
+    results["message"] = (
+        f"Found {len(sweep['administrators'])} delegated administrators "
+        f"for {len(sweep['services'])} services"
+    )
+    print(results["message"])
+
     return results
 
 
-def check_cost_explorer_data(db: Session = None, account_id: str = None):
+def check_cost_explorer_data(db: Session = None, account_id: str = None, linked_accounts: bool = False):
     """
     Check Cost Explorer data availability to confirm historical data access.
     This helps verify that after migration, historical data from Payer1 won't be available in Payer2.
+    Daily costs are cached in Postgres, so a run only asks Cost Explorer for the days
+    that were missing or still estimated.
+    With linked_accounts, the account is treated as the payer and the cost of every
+    linked account is summarized from grouped queries, instead of one check per account.
     """
     results = {
         "billing_periods": [],
@@ -155,33 +257,23 @@ def check_cost_explorer_data(db: Session = None, account_id: str = None):
         ce_client = session.client('ce')
         
         # Get current date and calculate dates for last 3 months
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        
-        # Check if cost data is available
-        response = ce_client.get_cost_and_usage(
-            TimePeriod={
-                'Start': start_date,
-                'End': end_date
-            },
-            Granularity='MONTHLY',
-            Metrics=['UnblendedCost']
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=COST_WINDOW_DAYS)
+        
+        days, stats = get_daily_costs(ce_client, db, account_id or "default", start_date, end_date)
+        results["billing_periods"] = monthly_billing_periods(days, end_date)
+        results["summary"] = stats
+        results["message"] = (
+            f"Cost data available for {len(days)} days "
+            f"({stats['days_fetched']} fetched from Cost Explorer, {stats['days_cached']} from cache)"
         )
-        
-        # Format cost explorer data
-        for period in response.get('ResultsByTime', []):
-            start = period.get('TimePeriod', {}).get('Start')
-            end = period.get('TimePeriod', {}).get('End')
-            amount = period.get('Total', {}).get('UnblendedCost', {}).get('Amount', '0')
-            unit = period.get('Total', {}).get('UnblendedCost', {}).get('Unit', 'USD')
-            estimated = period.get('Estimated', False)
-            
-            results["billing_periods"].append({
-                "Period": f"{start} to {end}",
-                "Amount": amount,
-                "Unit": unit,
-                "Estimated": "Yes" if estimated else "No"
-            })
+
+        if linked_accounts:
+            summaries, requests = get_linked_account_costs(ce_client, start_date, end_date)
+            results["linked_accounts"] = summaries
+            stats["linked_accounts"] = len(summaries)
+            stats["cost_explorer_requests"] += requests
+            results["message"] += f", {len(summaries)} linked accounts"
         
     except ClientError as e:
         results["error"] = str(e)
@@ -205,87 +297,56 @@ def check_cost_explorer_data(db: Session = None, account_id: str = None):
 def check_ri_and_savings_plans(db: Session = None, account_id: str = None):
     """
     Check if any Reserved Instances or Savings Plans are purchased and in use.
+    EC2, RDS, ElastiCache, Redshift and OpenSearch reservations are listed in every
+    enabled region concurrently and reported with the Savings Plans in one table,
+    sorted by expiry.
     """
     results = {
-        "reserved_instances": [],
-        "savings_plans": [],
+        "reservations": [],
         "success": True
     }
-    # Check Reserved Instances
+    regions = []
+    active_sps = []
     try:
         # Get AWS session
         session = get_aws_session(db, account_id)
         if not session:
             raise ValueError("Failed to create AWS session. Check your credentials and configuration.")
 
-        ec2_client = session.client('ec2')
-        ri_response = ec2_client.describe_reserved_instances(
-            Filters=[{'Name': 'state', 'Values': ['active']}]
-        )
-        
-        active_ris = ri_response.get('ReservedInstances', [])
-        
-        # Format RI data
-        for ri in active_ris:
-            results["reserved_instances"].append({
-                "Id": ri.get('ReservedInstancesId', ''),
-                "Type": ri.get('InstanceType', ''),
-                "Count": ri.get('InstanceCount', 0),
-                "End_date": ri.get('End', '').strftime('%Y-%m-%d') if isinstance(ri.get('End'), datetime) else str(ri.get('End', '')),
-                "Offering_class": ri.get('OfferingClass', ''),
-                "Offering_type": ri.get('OfferingType', ''),
-                "Scope": ri.get('Scope', ''),
-                "Zone": ri.get('AvailabilityZone', '')
-            })
-        
+        reservations, regions, region_errors = get_reservation_inventory(session)
+        results["reservations"] = reservations
+        if region_errors:
+            results["region_errors"] = region_errors
+            if len(region_errors) == len(regions) * len(RESERVATION_SOURCES):
+                results["error"] = next(iter(region_errors.values()))
+                results["success"] = False
+
     except ClientError as e:
         results["error"] = str(e)
         results["success"] = False
     
     # Check Savings Plans
     try:
-        sp_client = session.client('savingsplans')
-        
-        # Check for active Savings Plans
-        sp_response = sp_client.describe_savings_plans(
-            states=['active']
-        )
-        
-        active_sps = sp_response.get('savingsPlans', [])
-        
-        # Format Savings Plans data
-        for sp in active_sps:
-            results["savings_plans"].append({
-                "Id": sp.get('savingsPlanId', ''),
-                "Type": sp.get('savingsPlanType', ''),
-                "Commitment": sp.get('commitment', ''),
-                "End_date": sp.get('term', {}).get('end', ''),
-                "Payment_option": sp.get('paymentOption', ''),
-                "Region": sp.get('region', '')
-            })
+        active_sps = get_savings_plans(session)
+        results["reservations"] = sort_reservations(results["reservations"] + active_sps)
         
         # Only check utilization if there are active savings plans
         if active_sps:
             try:
-                # Check Savings Plan utilization
+                # Per-plan daily utilization, only new days are requested from Cost Explorer
                 ce_client = session.client('ce')
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-                
-                utilization = ce_client.get_savings_plans_utilization(
-                    TimePeriod={
-                        'Start': start_date,
-                        'End': end_date
-                    }
-                )
-                
-                # Add utilization data
-                if utilization.get('SavingsPlansUtilizationsByTime'):
-                    util_data = utilization.get('SavingsPlansUtilizationsByTime', [{}])[0]
-                    results["utilization"] = {
-                        "Percentage": util_data.get('Utilization', {}).get('Utilization', 'N/A'),
-                        "Net_savings": util_data.get('Savings', {}).get('NetSavings', 'N/A')
-                    }
+                end_date = datetime.now().date()
+                start_date = end_date - timedelta(days=UTILIZATION_WINDOW_DAYS)
+                # Days before the oldest plan started have nothing to fetch
+                plan_starts = [date.fromisoformat(sp["Start_date"]) for sp in active_sps if sp["Start_date"]]
+                if plan_starts:
+                    start_date = max(start_date, min(plan_starts))
+                account_key = account_id or "default"
+                series, stats = get_utilization_series(ce_client, db, account_key, start_date, end_date)
+                results["utilization"] = aggregate_utilization(db, account_key, start_date, end_date, series)
+                results["utilization"]["Window"] = f"{start_date.isoformat()} to {end_date.isoformat()}"
+                results["utilization"]["Days_cached"] = stats["days_cached"]
+                results["utilization"]["Days_fetched"] = stats["days_fetched"]
                 
             except ClientError as e:
                 results["utilization_error"] = str(e)
@@ -295,19 +356,65 @@ def check_ri_and_savings_plans(db: Session = None, account_id: str = None):
             results["error"] = str(e)
     
     # Add summary information
+    by_service = {}
+    for reservation in results["reservations"]:
+        by_service[reservation["Service"]] = by_service.get(reservation["Service"], 0) + 1
     results["summary"] = {
-        "has_reserved_instances": len(results["reserved_instances"]) > 0,
-        "has_savings_plans": len(results["savings_plans"]) > 0,
+        "has_reserved_instances": any(service != "Savings Plans" for service in by_service),
+        "has_savings_plans": "Savings Plans" in by_service,
+        "reservations_by_service": by_service,
+        "expiring_within_90_days": sum(
+            1 for reservation in results["reservations"]
+            if reservation["Days_left"] is not None and reservation["Days_left"] <= EXPIRY_WARNING_DAYS
+        ),
+        "regions_checked": len(regions),
         "note": "If migrating to a new payer account, any RIs and SPs will need to be transferred or recreated."
     }
+    results["message"] = (
+        f"Found {len(results['reservations'])} active reservations and Savings Plans, "
+        f"{results['summary']['expiring_within_90_days']} expiring within {EXPIRY_WARNING_DAYS} days"
+    )
     
     return results
 
 
-def check_policy_references(db: Session = None, account_id: str = None):
+def _run_policy_scanner(service: str, result_key: str, scanner, session, previous: dict, on_event=None):
+    """
+    Run one policy scanner and capture its findings, count, fingerprints, error and duration.
+    Events the scanner emits are passed to on_event tagged with the service and result key.
+    """
+    partial = {
+        "service": service,
+        "findings": [],
+        "checked": 0,
+        "error": None,
+        "details": {},
+        "previous": previous,
+        "fingerprints": []
+    }
+    if on_event:
+        partial["emit"] = lambda event: on_event({**event, "service": service, "result_key": result_key})
+    start_time = time.time()
+    try:
+        scanner(session, partial)
+    except Exception as e:
+        print(f"Error in {service} policy check: {str(e)}")
+        partial["error"] = str(e)
+    partial["duration"] = round(time.time() - start_time, 2)
+    return partial
+
+
+def check_policy_references(db: Session = None, account_id: str = None, full_rescan: bool = False, on_event=None):
     """
     Check policy documents across various AWS services for Organization/OU references.
     This helps identify policies that may need to be updated during migration.
+    Each service is scanned by its own scanner, concurrently in a bounded thread pool.
+    Resources unchanged since the last scan of the account reuse their stored findings
+    unless full_rescan is set.
+    on_event, when given, is called from the scanner threads with every finding as soon as
+    it is found, periodic progress and one "service_complete" event per service, plus a
+    "checkpoint" event before each resource fetch; an exception raised by on_event stops
+    the scanner that emitted it, and stops the whole check when raised for "service_complete".
     """
     results = {
         "iam_policies": [],
@@ -319,321 +426,81 @@ def check_policy_references(db: Session = None, account_id: str = None):
         "secretsmanager_policies": [],
         "summary": {
             "total_policies_checked": 0,
-            "total_with_references": 0
+            "total_with_references": 0,
+            "resources_skipped": 0,
+            "resources_rescanned": 0,
+            "resources_unscanned": 0,
+            "services": {}
         },
         "success": True
     }
     
-    # Pattern to search for org/OU references in policies
-    org_patterns = [
-        r'aws:PrincipalOrgID',
-        r'aws:PrincipalOrgPaths',
-        r'arn:aws:organizations',
-        r'arn:aws:iam::[0-9]+:role/aws-service-role/organizations',
-        r'organizations',
-        r'org-'
-    ]
-    
     try:
         # Get AWS session
         session = get_aws_session(db, account_id)
         if not session:
             raise ValueError("Failed to create AWS session. Check your credentials and configuration.")
-
-        # Check IAM policies
-        iam_client = session.client('iam')
-        
-        # Check customer managed policies
-        paginator = iam_client.get_paginator('list_policies')
-        policy_iterator = paginator.paginate(Scope='Local')
-        
-        for page in policy_iterator:
-            print(f"Found {len(page['Policies'])} customer managed policies")
-            for policy in page['Policies']:
-                print(f"Checking policy: {policy['PolicyName']}")
-                results["summary"]["total_policies_checked"] += 1
-                try:
-                    policy_version = iam_client.get_policy_version(
-                        PolicyArn=policy['Arn'],
-                        VersionId=policy['DefaultVersionId']
-                    )
-                    
-                    policy_doc = json.dumps(policy_version['PolicyVersion']['Document'])
-                    print(f"Policy document: {policy_doc[:100]}...")  # Print first 100 chars
-                    
-                    # Check if policy contains org references
-                    matches = []
-                    for pattern in org_patterns:
-                        if re.search(pattern, policy_doc, re.IGNORECASE):
-                            print(f"Found match with pattern: {pattern}")
-                            matches.append(pattern)
-                    
-                    if matches:
-                        print(f"*** FOUND ORGANIZATION REFERENCE IN POLICY: {policy['PolicyName']} ***")
-                        results["iam_policies"].append({
-                            "Name": policy['PolicyName'],
-                            "Arn": policy['Arn'],
-                            "Type": "Customer Managed",
-                            "References": matches
-                        })
-                except Exception as e:
-                    print(f"Error processing policy {policy['PolicyName']}: {str(e)}")
-                    continue
-    except Exception as e:
-        print(f"Error in IAM policy check: {str(e)}")
-        results["iam_error"] = str(e)
-        
-    # Also check AWS managed policies with "organization" in the name
-    try:
-        print("\nChecking AWS managed policies with 'organization' in the name...")
-        aws_policy_iterator = paginator.paginate(Scope='AWS')
-        
-        for page in aws_policy_iterator:
-            for policy in page['Policies']:
-                if 'organization' in policy['PolicyName'].lower():
-                    print(f"Checking AWS managed policy: {policy['PolicyName']}")
-                    results["summary"]["total_policies_checked"] += 1
-                    try:
-                        policy_version = iam_client.get_policy_version(
-                            PolicyArn=policy['Arn'],
-                            VersionId=policy['DefaultVersionId']
-                        )
-                        
-                        policy_doc = json.dumps(policy_version['PolicyVersion']['Document'])
-                        print(f"AWS policy document: {policy_doc[:100]}...")
-                        
-                        # Check if policy contains org references
-                        matches = []
-                        for pattern in org_patterns:
-                            if re.search(pattern, policy_doc, re.IGNORECASE):
-                                print(f"Found match with pattern: {pattern}")
-                                matches.append(pattern)
-                        
-                        if matches:
-                            print(f"*** FOUND ORGANIZATION REFERENCE IN AWS POLICY: {policy['PolicyName']} ***")
-                            results["iam_policies"].append({
-                                "Name": policy['PolicyName'],
-                                "Arn": policy['Arn'],
-                                "Type": "AWS Managed",
-                                "References": matches
-                            })
-                    except Exception as e:
-                        print(f"Error processing AWS policy {policy['PolicyName']}: {str(e)}")
-                        continue
-    except Exception as e:
-        print(f"Error in AWS managed policy check: {str(e)}")
-        results["aws_policy_error"] = str(e)
-    
-    # Check S3 bucket policies with error handling for SSL issues
-    try:
-        # Use us-east-1 region for S3 to avoid regional endpoint issues
-        s3_client = session.client('s3', region_name='us-east-1')
-        
-        # List all buckets
-        buckets = s3_client.list_buckets()['Buckets']
-        
-        for bucket in buckets:
-            bucket_name = bucket['Name']
-            results["summary"]["total_policies_checked"] += 1
-            try:
-                policy = s3_client.get_bucket_policy(Bucket=bucket_name)
-                policy_doc = policy['Policy']
-                
-                # Check if policy contains org references
-                matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                if matches:
-                    results["s3_policies"].append({
-                        "Bucket": bucket_name,
-                        "References": matches
-                    })
-            except Exception:
-                continue
-    except Exception as e:
-        results["s3_error"] = str(e)
-    
-    # Check KMS key policies
-    try:
-        kms_client = session.client('kms')
-        
-        paginator = kms_client.get_paginator('list_keys')
-        
-        for page in paginator.paginate():
-            for key in page['Keys']:
-                results["summary"]["total_policies_checked"] += 1
-                key_id = key['KeyId']
-                
-                try:
-                    # Get key policy
-                    key_policy = kms_client.get_key_policy(
-                        KeyId=key_id,
-                        PolicyName='default'
-                    )
-                    
-                    policy_doc = key_policy['Policy']
-                    
-                    # Check if policy contains org references
-                    matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                    if matches:
-                        # Try to get alias
-                        key_alias = "Unknown"
-                        try:
-                            aliases = kms_client.list_aliases(KeyId=key_id)
-                            if aliases['Aliases']:
-                                key_alias = aliases['Aliases'][0]['AliasName']
-                        except:
-                            pass
-                        
-                        results["kms_policies"].append({
-                            "Key_id": key_id,
-                            "Alias": key_alias,
-                            "References": matches
-                        })
-                except Exception:
-                    continue
-    except Exception as e:
-        results["kms_error"] = str(e)
-    
-    # Check SQS queue policies
-    try:
-        sqs_client = session.client('sqs')
-        
-        # List all queues
-        queues_response = sqs_client.list_queues()
-        queue_urls = queues_response.get('QueueUrls', [])
-        
-        for queue_url in queue_urls:
-            results["summary"]["total_policies_checked"] += 1
-            try:
-                # Get queue attributes including policy
-                attributes = sqs_client.get_queue_attributes(
-                    QueueUrl=queue_url,
-                    AttributeNames=['Policy']
-                )
-                
-                if 'Policy' in attributes['Attributes']:
-                    policy_doc = attributes['Attributes']['Policy']
-                    
-                    # Check if policy contains org references
-                    matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                    if matches:
-                        # Extract queue name from URL
-                        queue_name = queue_url.split('/')[-1]
-                        results["sqs_policies"].append({
-                            "Queue_name": queue_name,
-                            "Queue_url": queue_url,
-                            "References": matches
-                        })
-            except Exception as e:
-                print(f"Error checking SQS policy for {queue_url}: {str(e)}")
-                continue
     except Exception as e:
-        results["sqs_error"] = str(e)
-    
-    # Check SNS topic policies
-    try:
-        sns_client = session.client('sns')
-        
-        # List all topics
-        paginator = sns_client.get_paginator('list_topics')
-        
-        for page in paginator.paginate():
-            for topic in page['Topics']:
-                topic_arn = topic['TopicArn']
-                results["summary"]["total_policies_checked"] += 1
-                try:
-                    # Get topic attributes including policy
-                    attributes = sns_client.get_topic_attributes(
-                        TopicArn=topic_arn
-                    )
-                    
-                    if 'Policy' in attributes['Attributes']:
-                        policy_doc = attributes['Attributes']['Policy']
-                        
-                        # Check if policy contains org references
-                        matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                        if matches:
-                            # Extract topic name from ARN
-                            topic_name = topic_arn.split(':')[-1]
-                            results["sns_policies"].append({
-                                "Topic_name": topic_name,
-                                "Topic_arn": topic_arn,
-                                "References": matches
-                            })
-                except Exception as e:
-                    print(f"Error checking SNS policy for {topic_arn}: {str(e)}")
-                    continue
-    except Exception as e:
-        results["sns_error"] = str(e)
-    
-    # Check Lambda function policies
-    try:
-        lambda_client = session.client('lambda')
-        
-        # List all functions
-        paginator = lambda_client.get_paginator('list_functions')
-        
-        for page in paginator.paginate():
-            for function in page['Functions']:
-                function_name = function['FunctionName']
-                results["summary"]["total_policies_checked"] += 1
-                try:
-                    # Get policy
-                    policy_response = lambda_client.get_policy(
-                        FunctionName=function_name
-                    )
-                    
-                    if 'Policy' in policy_response:
-                        policy_doc = policy_response['Policy']
-                        
-                        # Check if policy contains org references
-                        matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                        if matches:
-                            results["lambda_policies"].append({
-                                "Function_name": function_name,
-                                "Function_arn": function['FunctionArn'],
-                                "References": matches
-                            })
-                except Exception as e:
-                    # ResourceNotFoundException is expected for functions without policies
-                    if 'ResourceNotFoundException' not in str(e):
-                        print(f"Error checking Lambda policy for {function_name}: {str(e)}")
-                    continue
-    except Exception as e:
-        results["lambda_error"] = str(e)
-    
-    # Check Secrets Manager policies
-    try:
-        secretsmanager_client = session.client('secretsmanager')
-        
-        # List all secrets
-        paginator = secretsmanager_client.get_paginator('list_secrets')
-        
-        for page in paginator.paginate():
-            for secret in page['SecretList']:
-                secret_name = secret['Name']
-                results["summary"]["total_policies_checked"] += 1
-                try:
-                    # Get resource policy
-                    policy_response = secretsmanager_client.get_resource_policy(
-                        SecretId=secret_name
-                    )
-                    
-                    if 'ResourcePolicy' in policy_response and policy_response['ResourcePolicy']:
-                        policy_doc = policy_response['ResourcePolicy']
-                        
-                        # Check if policy contains org references
-                        matches = [pattern for pattern in org_patterns if re.search(pattern, policy_doc, re.IGNORECASE)]
-                        if matches:
-                            results["secretsmanager_policies"].append({
-                                "Secret_name": secret_name,
-                                "Secret_arn": secret['ARN'],
-                                "References": matches
-                            })
-                except Exception as e:
-                    print(f"Error checking Secrets Manager policy for {secret_name}: {str(e)}")
-                    continue
-    except Exception as e:
-        results["secretsmanager_error"] = str(e)
+        results["error"] = str(e)
+        results["success"] = False
+        results["message"] = f"Error checking policy references: {str(e)}"
+        return results
+
+    # Fingerprints of the last scan, loaded here since scanners run outside this DB session's thread
+    fingerprint_account = account_id or "default"
+    previous = {}
+    if db is not None and not full_rescan:
+        try:
+            previous = PG_queries.get_policy_scan_fingerprints(db, fingerprint_account)
+        except SQLAlchemyError as e:
+            print(f"Error loading policy scan fingerprints, scanning everything: {str(e)}")
+            db.rollback()
+
+    with ContextThreadPoolExecutor(max_workers=settings.POLICY_SCAN_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(_run_policy_scanner, service, result_key, scanner, session, previous.get(service, {}), on_event)
+            for service, result_key, _, scanner in POLICY_SCANNERS
+        ]
+        if on_event:
+            for future in as_completed(futures):
+                partial = future.result()
+                on_event({
+                    "type": "service_complete",
+                    "service": partial["service"],
+                    "checked": partial["checked"],
+                    "with_references": len(partial["findings"]),
+                    "duration": partial["duration"],
+                    "error": partial["error"]
+                })
+        # Merge in scanner order, not completion order, so the output is deterministic
+        partials = [future.result() for future in futures]
+
+    fingerprints_by_service = {}
+    for (service, result_key, error_key, _), partial in zip(POLICY_SCANNERS, partials):
+        results[result_key].extend(partial["findings"])
+        results["summary"]["total_policies_checked"] += partial["checked"]
+        results["summary"]["resources_skipped"] += partial["details"].get("skipped", 0)
+        results["summary"]["resources_rescanned"] += partial["details"].get("rescanned", 0)
+        results["summary"]["resources_unscanned"] += len(partial["details"].get("unscanned", []))
+        if partial["error"]:
+            results[error_key] = partial["error"]
+        else:
+            # A failed scan keeps the previous fingerprints rather than storing a partial set
+            fingerprints_by_service[service] = partial["fingerprints"]
+        results["summary"]["services"][service] = {
+            "checked": partial["checked"],
+            "with_references": len(partial["findings"]),
+            "duration": partial["duration"],
+            "error": partial["error"],
+            **partial["details"]
+        }
+
+    if db is not None:
+        try:
+            PG_queries.replace_policy_scan_fingerprints(db, fingerprint_account, fingerprints_by_service)
+        except SQLAlchemyError as e:
+            print(f"Error saving policy scan fingerprints: {str(e)}")
+            db.rollback()
     
     # Update summary
     results["summary"]["total_with_references"] = (
@@ -646,10 +513,15 @@ def check_policy_references(db: Session = None, account_id: str = None):
         len(results["secretsmanager_policies"])
     )
     
-    results["message"] = f"Found {results['summary']['total_with_references']} policies with organization references"
+    results["message"] = (
+        f"Found {results['summary']['total_with_references']} policies with organization references "
+        f"({results['summary']['resources_rescanned']} rescanned, {results['summary']['resources_skipped']} unchanged since the last scan"
+        f"{', ' + str(results['summary']['resources_unscanned']) + ' could not be read' if results['summary']['resources_unscanned'] else ''})"
+    )
     
     return results
 
+
 def check_stacksets_for_org_integration(db: Session = None, account_id: str = None):
     """
     Check if CloudFormation StackSets use AWS Organizations.
@@ -675,47 +547,34 @@ def check_stacksets_for_org_integration(db: Session = None, account_id: str = No
         # CloudFormation client
         cfn_client = session.client('cloudformation')
         
-        # List all StackSets
-        paginator = cfn_client.get_paginator('list_stack_sets')
-        
-        for page in paginator.paginate():
-            for stackset_summary in page['Summaries']:
-                stackset_name = stackset_summary['StackSetName']
-                results["summary"]["total_stacksets"] += 1
-                
-                try:
-                    # Get StackSet details
-                    stackset = cfn_client.describe_stack_set(
-                        StackSetName=stackset_name
-                    )
-                    
-                    # Check if StackSet uses service-managed permissions (Organizations integration)
-                    permission_model = stackset['StackSet'].get('PermissionModel', '')
-                    auto_deployment = stackset['StackSet'].get('AutoDeployment', {})
-                    
-                    # Format auto_deployment as a string to avoid [object Object] in frontend
-                    auto_deployment_str = "Enabled" if auto_deployment.get('Enabled', False) else "Disabled"
-                    if 'RetainStacksOnAccountRemoval' in auto_deployment:
-                        auto_deployment_str += f", Retain stacks on account removal: {'Yes' if auto_deployment.get('RetainStacksOnAccountRemoval') else 'No'}"
-                    
-                    stackset_info = {
-                        "name": stackset_name,
-                        "permission_model": permission_model if permission_model else "Self-managed",
-                        "auto_deployment": auto_deployment_str,
-                        "uses_organizations": permission_model == 'SERVICE_MANAGED'
-                    }
-                    
-                    stacksets.append(stackset_info)
-                    
-                    # If it uses Organizations, add to the org integrated list
-                    if permission_model == 'SERVICE_MANAGED':
-                        results["org_integrated_stacksets"].append(stackset_info)
-                        results["summary"]["org_integrated_count"] += 1
-                        print(f"Found StackSet using Organizations: {stackset_name}")
-                    
-                except Exception as e:
-                    print(f"Error getting details for StackSet {stackset_name}: {str(e)}")
-                    continue
+        # Classify every StackSet from its summary, only service-managed ones need details
+        summaries = list_stack_set_summaries(cfn_client)
+        results["summary"]["total_stacksets"] = len(summaries)
+        
+        for stackset_summary in summaries:
+            permission_model = stackset_summary.get('PermissionModel', '')
+            stackset_info = {
+                "name": stackset_summary['StackSetName'],
+                "permission_model": permission_model if permission_model else "Self-managed",
+                "auto_deployment": auto_deployment_label(stackset_summary.get('AutoDeployment', {})),
+                "uses_organizations": permission_model == SERVICE_MANAGED
+            }
+            stacksets.append(stackset_info)
+            
+            # If it uses Organizations, add to the org integrated list
+            if permission_model == SERVICE_MANAGED:
+                results["org_integrated_stacksets"].append(stackset_info)
+                results["summary"]["org_integrated_count"] += 1
+                print(f"Found StackSet using Organizations: {stackset_info['name']}")
+        
+        org_integrated_names = [stackset_info["name"] for stackset_info in results["org_integrated_stacksets"]]
+        for stackset_info, (name, stackset, error) in zip(
+            results["org_integrated_stacksets"], describe_stack_sets(cfn_client, org_integrated_names)
+        ):
+            if error:
+                print(f"Error getting details for StackSet {name}: {str(error)}")
+                continue
+            stackset_info["auto_deployment_ous"] = ", ".join(sorted(stackset.get('OrganizationalUnitIds', [])))
         
         # Get organization details if any StackSets use Organizations
         if results["org_integrated_stacksets"]:
@@ -729,29 +588,19 @@ def check_stacksets_for_org_integration(db: Session = None, account_id: str = No
                     "feature_set": org_details['Organization']['FeatureSet']
                 }
                 
-                # Get deployment targets (OUs)
-                for stackset_info in results["org_integrated_stacksets"]:
-                    try:
-                        targets = cfn_client.list_stack_instances(
-                            StackSetName=stackset_info["name"]
-                        )
-                        
-                        # Extract unique OUs and accounts
-                        ous = set()
-                        accounts = set()
-                        
-                        for instance in targets.get('Summaries', []):
-                            if 'OrganizationalUnitId' in instance:
-                                ous.add(instance['OrganizationalUnitId'])
-                            if 'Account' in instance:
-                                accounts.add(instance['Account'])
-                        
-                        # Convert sets to comma-separated strings to avoid array display issues
-                        stackset_info["deployment_ous"] = ", ".join(ous) if ous else ""
-                        stackset_info["deployment_accounts"] = ", ".join(accounts) if accounts else ""
-                        
-                    except Exception as e:
-                        print(f"Error getting instances for StackSet {stackset_info['name']}: {str(e)}")
+                # Get deployment targets (OUs), every StackSet's instances are paged through concurrently
+                for stackset_info, (name, targets, error) in zip(
+                    results["org_integrated_stacksets"], get_stack_instance_targets(cfn_client, org_integrated_names)
+                ):
+                    if error:
+                        print(f"Error getting instances for StackSet {name}: {str(error)}")
+                        continue
+                    
+                    # Convert sets to comma-separated strings to avoid array display issues
+                    stackset_info["deployment_ous"] = ", ".join(sorted(targets["ous"]))
+                    stackset_info["deployment_accounts"] = ", ".join(sorted(targets["accounts"]))
+                    stackset_info["deployment_regions"] = ", ".join(sorted(targets["regions"]))
+                    stackset_info["stack_instances"] = targets["instances"]
             
             except Exception as e:
                 results["org_error"] = str(e)
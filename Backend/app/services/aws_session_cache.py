@@ -0,0 +1,250 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import boto3
+from botocore.config import Config
+from app.core.config import settings
+from app.services.rate_governor import rate_governor
+
+
+def credential_fingerprint(access_key: str = None, secret_key: str = None,
+                           session_token: str = None, profile_name: str = None):
+    """
+    Return a short, non-reversible fingerprint of a credential set.
+    Used as part of the cache key so rotated credentials never reuse a stale client.
+    """
+    digest = hashlib.sha256()
+    for part in (access_key, secret_key, session_token, profile_name):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class LRUTTLCache:
+    """
+    Small thread-safe mapping with least-recently-used eviction and a per-entry time to live.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # Futures of the values being built by get_or_create, by key
+        self._building = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """
+        Return the cached value for key, building it with factory() on a miss.
+        Values are built outside the cache lock, so builds of different keys run in
+        parallel; concurrent callers of one key wait for a single build.
+        """
+        with self._lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+            building = self._building.get(key)
+            if building is None:
+                building = self._building[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return building.result()
+        try:
+            value = factory()
+        except BaseException as e:
+            with self._lock:
+                if self._building.get(key) is building:
+                    del self._building[key]
+            building.set_exception(e)
+            raise
+        with self._lock:
+            # Not stored when the key was removed while it was being built
+            if self._building.get(key) is building:
+                del self._building[key]
+                self.put(key, value)
+        building.set_result(value)
+        return value
+
+    def remove_where(self, predicate):
+        """Drop every entry whose key satisfies predicate and return how many were removed"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            for key in [key for key in self._building if predicate(key)]:
+                del self._building[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._building.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class AWSSessionCache:
+    """
+    Process-wide cache of boto3 sessions and clients.
+
+    Sessions are keyed by (account_id, credential fingerprint, region) and clients by
+    (account_id, credential fingerprint, service, region), so building a client only
+    loads the botocore service model and opens connections once per credential set.
+    """
+
+    def __init__(self, max_sessions: int, max_clients: int, ttl_seconds: int):
+        self.sessions = LRUTTLCache(max_sessions, ttl_seconds)
+        self.clients = LRUTTLCache(max_clients, ttl_seconds)
+        self.invalidations = 0
+        # Bumped by invalidate(), so caches built on top (the async client pool) can tell
+        # which of their entries predate an invalidation
+        self._generations = {}
+        self._global_generation = 0
+        self._generation_lock = threading.Lock()
+
+    def get_session(self, account_key: str, region_name: str, aws_access_key_id: str = None,
+                    aws_secret_access_key: str = None, aws_session_token: str = None,
+                    profile_name: str = None):
+        """
+        Get a cached session for the given credentials, creating it on first use
+        """
+        fingerprint = credential_fingerprint(
+            aws_access_key_id, aws_secret_access_key, aws_session_token, profile_name
+        )
+
+        def build_session():
+            return CachedSession(
+                cache=self,
+                account_key=account_key,
+                fingerprint=fingerprint,
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                aws_session_token=aws_session_token,
+                profile_name=profile_name,
+                region_name=region_name
+            )
+
+        return self.sessions.get_or_create((account_key, fingerprint, region_name), build_session)
+
+    def get_client(self, account_key: str, fingerprint: str, service_name: str, region_name: str, factory):
+        """
+        Get a cached client, building it with factory() on a miss
+        """
+        return self.clients.get_or_create((account_key, fingerprint, service_name, region_name), factory)
+
+    def invalidate(self, account_key: str = None):
+        """
+        Drop cached sessions and clients for one account, or everything when account_key is None
+        """
+        if account_key is None:
+            self.sessions.clear()
+            self.clients.clear()
+        else:
+            self.sessions.remove_where(lambda key: key[0] == account_key)
+            self.clients.remove_where(lambda key: key[0] == account_key)
+        with self._generation_lock:
+            if account_key is None:
+                self._global_generation += 1
+            else:
+                self._generations[account_key] = self._generations.get(account_key, 0) + 1
+        self.invalidations += 1
+
+    def generation(self, account_key: str):
+        """Changes whenever the account's entries, or all entries, are invalidated"""
+        with self._generation_lock:
+            return self._global_generation, self._generations.get(account_key, 0)
+
+    def stats(self):
+        return {
+            "sessions": self.sessions.stats(),
+            "clients": self.clients.stats(),
+            "invalidations": self.invalidations
+        }
+
+
+class CachedSession(boto3.session.Session):
+    """
+    boto3 Session whose client() calls are served from an AWSSessionCache.
+
+    Clients created with extra arguments (endpoint_url, explicit credentials, ...)
+    bypass the cache, since they no longer match the cache key. Cached clients get a
+    connection pool sized for the concurrent resource fetches in app.services.concurrency,
+    retry throttled and transient failures in botocore's standard mode, and send their
+    requests through the account's rate_governor buckets.
+    """
+
+    def __init__(self, cache: AWSSessionCache, account_key: str, fingerprint: str, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.account_key = account_key
+        self.fingerprint = fingerprint
+
+    def client(self, service_name, region_name=None, **kwargs):
+        region = region_name or self.region_name
+        if kwargs:
+            return super().client(service_name, region_name=region, **kwargs)
+        return self.cache.get_client(
+            self.account_key,
+            self.fingerprint,
+            service_name,
+            region,
+            lambda: rate_governor.attach(
+                super(CachedSession, self).client(
+                    service_name,
+                    region_name=region,
+                    config=Config(
+                        max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+                        # The only retry layer: checks call the clients directly
+                        retries={"mode": "standard", "total_max_attempts": settings.THROTTLE_MAX_ATTEMPTS}
+                    )
+                ),
+                self.account_key
+            )
+        )
+
+
+aws_session_cache = AWSSessionCache(
+    max_sessions=settings.AWS_SESSION_CACHE_MAX_SESSIONS,
+    max_clients=settings.AWS_SESSION_CACHE_MAX_CLIENTS,
+    ttl_seconds=settings.AWS_SESSION_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,163 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+
+# Error codes AWS returns when a caller is being rate limited: botocore's standard retry mode
+# list without TransactionInProgressException and LimitExceededException, which on most
+# services report a conflicting operation or a resource quota rather than a request rate
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException'
+}
+
+
+def parse_limits(value: str):
+    """
+    Parse a "service=limit,service=limit" string into a dict
+    """
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        service, limit = item.split("=", 1)
+        limits[service.strip()] = int(limit)
+    return limits
+
+
+RESOURCE_FETCH_LIMITS = parse_limits(settings.RESOURCE_FETCH_LIMITS)
+
+# Process-wide fetch slots per service, shared by every iter_fetch call (all regions,
+# steps and jobs); services without a RESOURCE_FETCH_LIMITS entry are added on first use
+_service_slots = {
+    service: threading.BoundedSemaphore(max(1, limit)) for service, limit in RESOURCE_FETCH_LIMITS.items()
+}
+_service_slots_lock = threading.Lock()
+
+# How often async fetches waiting for a slot of their service try again
+ASYNC_SLOT_POLL_SECONDS = 0.01
+
+
+def service_slots(service: str):
+    """The shared semaphore bounding in-flight fetches of a service"""
+    with _service_slots_lock:
+        slots = _service_slots.get(service)
+        if slots is None:
+            slots = threading.BoundedSemaphore(max(1, settings.RESOURCE_FETCH_DEFAULT_LIMIT))
+            _service_slots[service] = slots
+        return slots
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that runs each task in a copy of the submitting thread's context,
+    like asyncio.to_thread, so context variables (the rate governor's trackers) follow
+    the work of a step onto every pool it fans out to
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# Shared pool for per-resource fetches (get_bucket_policy, get_key_policy, ...) of all scanners
+_resource_pool = ContextThreadPoolExecutor(
+    max_workers=settings.RESOURCE_FETCH_MAX_WORKERS,
+    thread_name_prefix="resource-fetch"
+)
+
+
+def iter_fetch(service: str, fetch, items, checkpoint=None):
+    """
+    Run fetch(item) for every item on the shared resource pool and yield
+    (index, item, result, error) tuples as the fetches complete.
+
+    At most the service's RESOURCE_FETCH_LIMITS entry (or RESOURCE_FETCH_DEFAULT_LIMIT)
+    of its fetches are in flight at once across the whole process: the slots are shared
+    by concurrent calls, so regions, steps and jobs scanning one service split them.
+    Throttled requests are retried by the clients themselves (botocore's standard retry
+    mode, see CachedSession). Results are yielded while later items
+    are still being submitted, so a consumer sees the first results after the first
+    fetches, not after the last one.
+    checkpoint(), when given, is called before each fetch is submitted; an exception it
+    raises stops the iteration (fetches already in flight finish, their results are dropped).
+    """
+    items = list(items)
+    in_flight = service_slots(service)
+    completed = queue.Queue()
+
+    def on_done(index, item, future):
+        in_flight.release()
+        completed.put((index, item, future))
+
+    def outcome(entry):
+        index, item, future = entry
+        error = future.exception()
+        return index, item, (None if error else future.result()), error
+
+    pending = 0
+    for index, item in enumerate(items):
+        if checkpoint:
+            checkpoint()
+        # Acquire in the submitting thread so pool workers never block on another service's limit.
+        # Slots may be held by other calls, so while waiting, results of this call are yielded
+        # as they arrive, and with nothing of its own in flight it simply blocks.
+        while not in_flight.acquire(blocking=False):
+            if not pending:
+                in_flight.acquire()
+                break
+            try:
+                entry = completed.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            pending -= 1
+            yield outcome(entry)
+        future = _resource_pool.submit(fetch, item)
+        future.add_done_callback(lambda done, index=index, item=item: on_done(index, item, done))
+        pending += 1
+
+    while pending:
+        pending -= 1
+        yield outcome(completed.get())
+
+
+def fetch_all(service: str, fetch, items):
+    """
+    Run fetch(item) for every item on the shared resource pool (see iter_fetch) and
+    return a list of (item, result, error) tuples in the same order as items.
+    """
+    outcomes = sorted(iter_fetch(service, fetch, items), key=lambda outcome: outcome[0])
+    return [(item, result, error) for _, item, result, error in outcomes]
+
+
+async def async_fetch_all(service: str, fetch, items):
+    """
+    Await fetch(item) for every item on the event loop. The fetches take the same
+    process-wide slots of the service as iter_fetch, so sync and async scans of one
+    service together stay within its RESOURCE_FETCH_LIMITS entry. The semaphore is
+    polled rather than waited on, so a full service never blocks the event loop.
+    Returns a list of (item, result, error) tuples in the same order as items.
+    """
+    in_flight = service_slots(service)
+
+    async def run(item):
+        while not in_flight.acquire(blocking=False):
+            await asyncio.sleep(ASYNC_SLOT_POLL_SECONDS)
+        try:
+            return item, await fetch(item), None
+        except Exception as e:
+            return item, None, e
+        finally:
+            in_flight.release()
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
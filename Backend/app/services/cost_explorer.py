@@ -0,0 +1,207 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import PG_queries
+from app.services.concurrency import fetch_all
+
+# Days of history check_cost_explorer_data reports
+COST_WINDOW_DAYS = 90
+
+# Services listed per linked account in the payer breakdown
+TOP_SERVICES = 5
+
+
+def get_cost_and_usage_pages(ce_client, start: date, end: date, granularity: str, group_by: list = None,
+                             attributes: dict = None):
+    """
+    Run one get_cost_and_usage query for [start, end), following NextPageToken.
+    Returns (ResultsByTime entries of all pages, number of requests made).
+    When attributes is given, the descriptions of grouped dimension values
+    (account names for LINKED_ACCOUNT) are collected into it.
+    """
+    request = {
+        "TimePeriod": {"Start": start.isoformat(), "End": end.isoformat()},
+        "Granularity": granularity,
+        "Metrics": ["UnblendedCost"]
+    }
+    if group_by:
+        request["GroupBy"] = group_by
+
+    results = []
+    requests = 0
+    while True:
+        response = ce_client.get_cost_and_usage(**request)
+        requests += 1
+        results.extend(response.get('ResultsByTime', []))
+        if attributes is not None:
+            for value in response.get('DimensionValueAttributes', []):
+                attributes[value['Value']] = value.get('Attributes', {}).get('description', '')
+        token = response.get('NextPageToken')
+        if not token:
+            return results, requests
+        request["NextPageToken"] = token
+
+
+def _day_entry(period: dict):
+    cost = period.get('Total', {}).get('UnblendedCost', {})
+    return {
+        "usage_date": date.fromisoformat(period['TimePeriod']['Start']),
+        "amount": Decimal(cost.get('Amount', '0')),
+        "unit": cost.get('Unit', 'USD'),
+        "estimated": bool(period.get('Estimated', False))
+    }
+
+
+def get_daily_costs(ce_client, db, account_key: str, start: date, end: date):
+    """
+    Return the daily unblended cost of [start, end) as a list of
+    {usage_date, amount, unit, estimated}, answered from the cost_explorer_daily cache.
+
+    Only days that are missing from the cache or were still estimated when fetched are
+    requested again, with a single DAILY query from the first such day to end, and the
+    result is written back. Without a usable database every day is fetched.
+    The second value counts cached days, fetched days and Cost Explorer requests.
+    """
+    cached = {}
+    if db is not None:
+        try:
+            for row in PG_queries.get_cost_explorer_days(db, account_key, start, end):
+                cached[row.usage_date] = {
+                    "usage_date": row.usage_date,
+                    "amount": Decimal(row.amount),
+                    "unit": row.unit,
+                    "estimated": row.estimated
+                }
+        except SQLAlchemyError as e:
+            print(f"Error reading cached Cost Explorer data, fetching every day: {str(e)}")
+            db.rollback()
+
+    all_days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+    stale = [day for day in all_days if day not in cached or cached[day]["estimated"]]
+    stats = {"days_cached": len(all_days) - len(stale), "days_fetched": 0, "cost_explorer_requests": 0}
+
+    if stale:
+        periods, requests = get_cost_and_usage_pages(ce_client, min(stale), end, 'DAILY')
+        fetched = [_day_entry(period) for period in periods]
+        stats["days_fetched"] = len(fetched)
+        stats["cost_explorer_requests"] = requests
+        for day in fetched:
+            cached[day["usage_date"]] = day
+
+        if db is not None and fetched:
+            try:
+                PG_queries.upsert_cost_explorer_days(db, account_key, fetched)
+            except SQLAlchemyError as e:
+                print(f"Error caching Cost Explorer data: {str(e)}")
+                db.rollback()
+
+    return [cached[day] for day in all_days if day in cached], stats
+
+
+def monthly_billing_periods(days: list, end: date):
+    """
+    Roll daily costs up into calendar months, in the shape check_cost_explorer_data reports:
+    a month is estimated when any of its days is
+    """
+    months = {}
+    for day in days:
+        month = months.setdefault((day["usage_date"].year, day["usage_date"].month), {
+            "start": day["usage_date"],
+            "amount": Decimal(0),
+            "unit": day["unit"],
+            "estimated": False
+        })
+        month["amount"] += day["amount"]
+        month["estimated"] = month["estimated"] or day["estimated"]
+
+    periods = []
+    for (year, month_number), month in sorted(months.items()):
+        next_month = date(year + month_number // 12, month_number % 12 + 1, 1)
+        periods.append({
+            "Period": f"{month['start'].isoformat()} to {min(next_month, end).isoformat()}",
+            "Amount": format(month["amount"].normalize(), 'f'),
+            "Unit": month["unit"],
+            "Estimated": "Yes" if month["estimated"] else "No"
+        })
+    return periods
+
+
+def month_windows(start: date, end: date):
+    """Split [start, end) at calendar month boundaries"""
+    windows = []
+    window_start = start
+    while window_start < end:
+        next_month = date(window_start.year + window_start.month // 12, window_start.month % 12 + 1, 1)
+        windows.append((window_start, min(next_month, end)))
+        window_start = next_month
+    return windows
+
+
+def get_linked_account_costs(ce_client, start: date, end: date):
+    """
+    Cost of every linked account of the payer for [start, end), from get_cost_and_usage
+    grouped by LINKED_ACCOUNT and SERVICE. The range is split into monthly windows that
+    are queried concurrently, each following NextPageToken, so a payer with hundreds of
+    accounts costs a handful of requests.
+
+    Returns (per-account summaries sorted by total cost, number of requests made).
+    """
+    def query(window):
+        return get_cost_and_usage_pages(
+            ce_client, window[0], window[1], 'MONTHLY',
+            group_by=[{"Type": "DIMENSION", "Key": "LINKED_ACCOUNT"}, {"Type": "DIMENSION", "Key": "SERVICE"}],
+            attributes=names
+        )
+
+    accounts = {}
+    names = {}
+    requests = 0
+    for window, outcome, error in fetch_all('ce', query, month_windows(start, end)):
+        if error:
+            raise error
+        periods, window_requests = outcome
+        requests += window_requests
+        for period in periods:
+            period_label = f"{period['TimePeriod']['Start']} to {period['TimePeriod']['End']}"
+            estimated = bool(period.get('Estimated', False))
+            for group in period.get('Groups', []):
+                account_id, service = group['Keys']
+                cost = group['Metrics']['UnblendedCost']
+                amount = Decimal(cost.get('Amount', '0'))
+                account = accounts.setdefault(account_id, {
+                    "total": Decimal(0), "unit": cost.get('Unit', 'USD'), "estimated": False, "months": {}, "services": {}
+                })
+                account["total"] += amount
+                account["estimated"] = account["estimated"] or estimated
+                month = account["months"].setdefault(period_label, {"amount": Decimal(0), "estimated": False})
+                month["amount"] += amount
+                month["estimated"] = month["estimated"] or estimated
+                account["services"][service] = account["services"].get(service, Decimal(0)) + amount
+
+    summaries = []
+    for account_id, account in accounts.items():
+        top_services = sorted(account["services"].items(), key=lambda item: item[1], reverse=True)[:TOP_SERVICES]
+        summaries.append({
+            "Account_id": account_id,
+            "Name": names.get(account_id, ''),
+            "Total": format(account["total"].normalize(), 'f'),
+            "Unit": account["unit"],
+            "Estimated": "Yes" if account["estimated"] else "No",
+            "Months": [
+                {
+                    "Period": period,
+                    "Amount": format(month["amount"].normalize(), 'f'),
+                    "Estimated": "Yes" if month["estimated"] else "No"
+                }
+                for period, month in sorted(account["months"].items())
+            ],
+            "Top_services": [
+                {"Service": service, "Amount": format(amount.normalize(), 'f')}
+                for service, amount in top_services
+            ],
+            "_total": account["total"]
+        })
+    summaries.sort(key=lambda summary: summary["_total"], reverse=True)
+    for summary in summaries:
+        del summary["_total"]
+    return summaries, requests
@@ -0,0 +1,187 @@
+from datetime import datetime
+from botocore.exceptions import BotoCoreError, ClientError
+from app.core.config import settings
+from app.services.aws_session_cache import LRUTTLCache
+from app.services.concurrency import fetch_all
+from app.services.regions import get_enabled_regions, for_each_region
+
+# Display names for common service principals; others are shown as the principal itself
+SERVICE_PRINCIPAL_NAMES = {
+    "access-analyzer.amazonaws.com": "IAM Access Analyzer",
+    "account.amazonaws.com": "Account Management",
+    "auditmanager.amazonaws.com": "Audit Manager",
+    "backup.amazonaws.com": "AWS Backup",
+    "cloudtrail.amazonaws.com": "CloudTrail",
+    "config.amazonaws.com": "Config",
+    "config-multiaccountsetup.amazonaws.com": "Config (multi-account setup)",
+    "detective.amazonaws.com": "Detective",
+    "fms.amazonaws.com": "Firewall Manager",
+    "guardduty.amazonaws.com": "GuardDuty",
+    "inspector2.amazonaws.com": "Inspector",
+    "ipam.amazonaws.com": "IPAM",
+    "macie.amazonaws.com": "Macie",
+    "member.org.stacksets.cloudformation.amazonaws.com": "CloudFormation StackSets",
+    "securityhub.amazonaws.com": "Security Hub",
+    "servicecatalog.amazonaws.com": "Service Catalog",
+    "securitylake.amazonaws.com": "Security Lake",
+    "sso.amazonaws.com": "IAM Identity Center",
+    "ssm.amazonaws.com": "Systems Manager",
+}
+
+# ("account", account key) -> organization id, ("org", organization id) -> sweep and
+# ("regional", organization id) -> regional security admin matrix.
+# Every account of an organization gets the same answer, so sweeps are shared per org.
+# A matrix with failed lookups depends on who asked (a member account is denied what the
+# management account may read), so it is only cached for the calling account, under
+# ("regional", organization id, account key).
+_sweep_cache = LRUTTLCache(1024, settings.DELEGATED_ADMIN_CACHE_TTL_SECONDS)
+
+
+def service_name(service_principal: str):
+    return SERVICE_PRINCIPAL_NAMES.get(service_principal, service_principal)
+
+
+def sweep_delegated_administrators(session):
+    """
+    List every delegated administrator of the organization and the services each one
+    is delegated for: one paginated list_delegated_administrators, then
+    list_delegated_services_for_account per administrator, run concurrently.
+
+    Returns {"administrators": [...], "services": {service principal: [administrators]}, "swept_at"}.
+    """
+    org_client = session.client('organizations')
+
+    administrators = []
+    paginator = org_client.get_paginator('list_delegated_administrators')
+    for page in paginator.paginate():
+        administrators.extend(page['DelegatedAdministrators'])
+
+    def delegated_services(admin):
+        services = []
+        paginator = org_client.get_paginator('list_delegated_services_for_account')
+        for page in paginator.paginate(AccountId=admin['Id']):
+            services.extend(page['DelegatedServices'])
+        return services
+
+    sweep = {"administrators": [], "services": {}, "swept_at": datetime.now().isoformat()}
+    for admin, services, error in fetch_all('organizations', delegated_services, administrators):
+        entry = {
+            "Account_id": admin['Id'],
+            "Name": admin.get('Name', ''),
+            "Email": admin.get('Email', ''),
+            "Status": admin.get('Status', ''),
+            "Services": [service['ServicePrincipal'] for service in services or []]
+        }
+        if error:
+            print(f"Error listing delegated services for account {admin['Id']}: {error}")
+            entry["Error"] = str(error)
+        sweep["administrators"].append(entry)
+        for service in services or []:
+            sweep["services"].setdefault(service['ServicePrincipal'], []).append({
+                "Account_id": admin['Id'],
+                "Name": admin.get('Name', ''),
+                "Delegation_enabled": service.get('DelegationEnabledDate')
+            })
+    return sweep
+
+
+def get_delegated_administrators(session, refresh: bool = False):
+    """
+    Return (organization id, sweep, cached) for the session's organization, reusing a
+    sweep younger than DELEGATED_ADMIN_CACHE_TTL_SECONDS unless refresh is set.
+    Sweeps in which listing an administrator's services failed are not cached.
+    """
+    account_key = (getattr(session, "account_key", None), getattr(session, "fingerprint", None))
+    organization_id = _sweep_cache.get(("account", account_key)) if account_key[0] else None
+    if organization_id is None:
+        organization_id = session.client('organizations').describe_organization()['Organization']['Id']
+        if account_key[0]:
+            _sweep_cache.put(("account", account_key), organization_id)
+
+    sweep = None if refresh else _sweep_cache.get(("org", organization_id))
+    if sweep is not None:
+        return organization_id, sweep, True
+
+    sweep = sweep_delegated_administrators(session)
+    # A partial answer (throttled or denied for some admin) would be served org-wide for the whole TTL
+    if not any("Error" in admin for admin in sweep["administrators"]):
+        _sweep_cache.put(("org", organization_id), sweep)
+    return organization_id, sweep, False
+
+
+def _guardduty_admins(session, region: str):
+    client = session.client('guardduty', region_name=region)
+    admins = []
+    for page in client.get_paginator('list_organization_admin_accounts').paginate():
+        admins.extend(
+            {"Account_id": admin['AdminAccountId'], "Status": admin.get('AdminStatus', '')}
+            for admin in page.get('AdminAccounts', [])
+        )
+    return admins
+
+
+def _inspector_admins(session, region: str):
+    client = session.client('inspector2', region_name=region)
+    admins = []
+    for page in client.get_paginator('list_delegated_admin_accounts').paginate():
+        admins.extend(
+            {"Account_id": admin['accountId'], "Status": admin.get('status', '')}
+            for admin in page.get('delegatedAdminAccounts', [])
+        )
+    return admins
+
+
+# Regional services whose delegated admin is set per region: (column, lister)
+REGIONAL_SECURITY_SERVICES = [
+    ("GuardDuty", _guardduty_admins),
+    ("Inspector", _inspector_admins),
+]
+
+
+def scan_regional_security_admins(session):
+    """
+    Query the GuardDuty and Inspector delegated admin of every enabled region, with the
+    regions running concurrently on the shared region pool.
+    Returns one row per region: {"Region", "GuardDuty": [admins], "Inspector": [admins]},
+    plus "Errors": {service: reason} for the lookups that failed in that region.
+    """
+    def scan_region(region):
+        row = {"Region": region}
+        for column, list_admins in REGIONAL_SECURITY_SERVICES:
+            try:
+                row[column] = list_admins(session, region)
+            except (BotoCoreError, ClientError) as e:
+                # Not the management/admin account, or the service is not offered in this region
+                row[column] = []
+                row.setdefault("Errors", {})[column] = e.response['Error']['Code'] if isinstance(e, ClientError) else str(e)
+        return row
+
+    matrix = []
+    for region, row, error in for_each_region(get_enabled_regions(session), scan_region):
+        if error:
+            print(f"Error checking security service admins in {region}: {str(error)}")
+            row = {"Region": region, "Errors": {"all": str(error)}}
+            row.update({column: [] for column, _ in REGIONAL_SECURITY_SERVICES})
+        matrix.append(row)
+    return matrix
+
+
+def get_regional_security_admins(session, organization_id: str, refresh: bool = False):
+    """
+    Return (matrix, cached) for the organization, see scan_regional_security_admins.
+    Matrices without errors are shared by the organization, the others are cached per account.
+    """
+    account_key = (getattr(session, "account_key", None), getattr(session, "fingerprint", None))
+    if not refresh:
+        matrix = _sweep_cache.get(("regional", organization_id))
+        if matrix is None and account_key[0]:
+            matrix = _sweep_cache.get(("regional", organization_id, account_key))
+        if matrix is not None:
+            return matrix, True
+
+    matrix = scan_regional_security_admins(session)
+    if not any("Errors" in row for row in matrix):
+        _sweep_cache.put(("regional", organization_id), matrix)
+    elif account_key[0]:
+        _sweep_cache.put(("regional", organization_id, account_key), matrix)
+    return matrix, False
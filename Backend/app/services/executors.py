@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import threading
+import time
+from app.core.config import settings
+from app.services.concurrency import ContextThreadPoolExecutor
+
+
+class InstrumentedExecutor(ContextThreadPoolExecutor):
+    """
+    ContextThreadPoolExecutor that counts queued and running tasks, so pool saturation
+    can be read from the metrics endpoint
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        submitted_at = time.monotonic()
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        def run():
+            waited = time.monotonic() - submitted_at
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.peak_active = max(self.peak_active, self.active)
+                self.queue_wait_seconds_total += waited
+                self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, waited)
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+            return result
+
+        future = super().submit(run)
+        future.add_done_callback(self._forget_cancelled)
+        return future
+
+    def _forget_cancelled(self, future):
+        # A task cancelled while queued never runs, so it leaves the queue here
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self):
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "saturation": round(self.active / self.max_workers, 3),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "peak_active": self.peak_active,
+                "peak_queued": self.peak_queued,
+                "queue_wait_seconds_avg": round(self.queue_wait_seconds_total / started, 4) if started else 0.0,
+                "queue_wait_seconds_max": round(self.queue_wait_seconds_max, 4)
+            }
+
+
+# Whole checks and other blocking boto3 work started by request handlers
+aws_executor = InstrumentedExecutor("aws-io", settings.AWS_EXECUTOR_MAX_WORKERS)
+
+# Synchronous SQLAlchemy work of request handlers
+db_executor = InstrumentedExecutor("db", settings.DB_EXECUTOR_MAX_WORKERS)
+
+# Background step jobs (app/services/step_jobs.py), kept apart so long scans don't starve handlers
+job_executor = InstrumentedExecutor("step-jobs", settings.STEP_JOB_MAX_WORKERS)
+
+
+async def _run_in(executor: InstrumentedExecutor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_aws(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the AWS executor"""
+    return await _run_in(aws_executor, fn, *args, **kwargs)
+
+
+async def run_db(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the DB executor"""
+    return await _run_in(db_executor, fn, *args, **kwargs)
+
+
+def executor_stats():
+    return {executor.name: executor.stats() for executor in (aws_executor, db_executor, job_executor)}
@@ -0,0 +1,40 @@
+# Every AWS managed key has an alias under this prefix (alias/aws/s3, alias/aws/ebs, ...)
+AWS_MANAGED_ALIAS_PREFIX = "alias/aws/"
+
+
+def build_alias_index(kms_client):
+    """
+    Page through list_aliases once and return {key_id: [alias names]}.
+    Aliases that do not point at a key are left out.
+    """
+    index = {}
+    paginator = kms_client.get_paginator('list_aliases')
+    for page in paginator.paginate():
+        for alias in page['Aliases']:
+            if alias.get('TargetKeyId'):
+                index.setdefault(alias['TargetKeyId'], []).append(alias['AliasName'])
+    return index
+
+
+def get_kms_inventory(kms_client):
+    """
+    List every key of the client's region with its aliases, using one paginated
+    list_keys and one paginated list_aliases instead of a call per key.
+
+    Returns a list of {"KeyId", "KeyArn", "Aliases", "AwsManaged"} dicts. AWS managed keys
+    are recognised by their alias/aws/ alias, so no describe_key call is needed.
+    """
+    aliases = build_alias_index(kms_client)
+
+    inventory = []
+    paginator = kms_client.get_paginator('list_keys')
+    for page in paginator.paginate():
+        for key in page['Keys']:
+            key_aliases = aliases.get(key['KeyId'], [])
+            inventory.append({
+                "KeyId": key['KeyId'],
+                "KeyArn": key.get('KeyArn'),
+                "Aliases": key_aliases,
+                "AwsManaged": any(alias.startswith(AWS_MANAGED_ALIAS_PREFIX) for alias in key_aliases)
+            })
+    return inventory
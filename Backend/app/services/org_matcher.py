@@ -0,0 +1,92 @@
+import re
+
+
+class OrgReferenceMatcher:
+    """
+    Finds which of a list of regex patterns occur in a policy document, in one pass.
+
+    All patterns are compiled once into a single case-insensitive alternation. The
+    document is scanned with finditer; when one alternative matches, the other patterns
+    are only re-checked at the positions covered by that match, so overlapping patterns
+    (e.g. 'organizations' inside 'arn:aws:organizations') are still reported exactly as
+    separate re.search calls would report them.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(pattern, re.IGNORECASE) for pattern in self.patterns]
+
+        # Named groups, so patterns with capturing groups of their own don't shift the mapping
+        alternation = '|'.join(f'(?P<_p{index}>{pattern})' for index, pattern in enumerate(self.patterns))
+        first_chars = self._first_chars(self.patterns)
+        if first_chars:
+            # Lets the regex engine skip straight to candidate positions with a charset scan
+            alternation = f"(?=[{re.escape(''.join(sorted(first_chars)))}])(?:{alternation})"
+        self._first_chars_set = first_chars
+        self._combined = re.compile(alternation, re.IGNORECASE)
+
+    @staticmethod
+    def _first_chars(patterns):
+        """
+        Lowercased literal first character of every pattern, or None when any pattern
+        starts with a regex construct (then no charset prefilter is used)
+        """
+        chars = set()
+        for pattern in patterns:
+            if not pattern or re.escape(pattern[0]) != pattern[0] or pattern[1:2] in ('*', '?', '{'):
+                return None
+            chars.add(pattern[0].lower())
+        return chars
+
+    def find(self, document):
+        """
+        Return the patterns found in document, in the order they were given.
+        document may be the raw policy string or an already parsed policy (dict/list).
+        """
+        if not isinstance(document, str):
+            document = '\n'.join(_iter_strings(document))
+        # Lowercasing first keeps the first-character charset scan valid
+        text = document.lower()
+
+        found = set()
+        for match in self._combined.finditer(text):
+            # The pattern's own group closes after any group nested in it, so it is lastgroup
+            found.add(int(match.lastgroup[2:]))
+            if len(found) == len(self.patterns):
+                break
+            # Other patterns may start inside the span this alternative consumed
+            for position in range(match.start(), match.end()):
+                if self._first_chars_set is not None and text[position] not in self._first_chars_set:
+                    continue
+                for index, compiled in enumerate(self._compiled):
+                    if index not in found and compiled.match(text, position):
+                        found.add(index)
+            if len(found) == len(self.patterns):
+                break
+
+        return [self.patterns[index] for index in sorted(found)]
+
+    def matches(self, document):
+        """True when document contains at least one of the patterns"""
+        if not isinstance(document, str):
+            document = '\n'.join(_iter_strings(document))
+        return self._combined.search(document.lower()) is not None
+
+
+def _iter_strings(value):
+    """
+    Yield every key and string value of a parsed JSON document
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, dict):
+            for key, child in item.items():
+                yield str(key)
+                stack.append(child)
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif item is not None:
+            yield str(item)
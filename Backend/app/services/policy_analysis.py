@@ -0,0 +1,256 @@
+import json
+import re
+
+# Global condition keys that tie a policy to an organization, by lowercased key
+ORG_CONDITION_KEYS = {
+    key.lower(): key for key in (
+        "aws:PrincipalOrgID",
+        "aws:PrincipalOrgPaths",
+        "aws:ResourceOrgID",
+        "aws:ResourceOrgPaths",
+        "aws:SourceOrgID",
+        "aws:SourceOrgPaths"
+    )
+}
+
+ORGANIZATIONS_ARN = re.compile(r'^arn:aws[\w-]*:organizations:', re.IGNORECASE)
+ORGANIZATIONS_SERVICE_ROLE_ARN = re.compile(
+    r'^arn:aws[\w-]*:iam::[0-9*]+:role/aws-service-role/organizations\.amazonaws\.com/', re.IGNORECASE
+)
+ORGANIZATIONS_SERVICE_PRINCIPAL = "organizations.amazonaws.com"
+ORGANIZATIONS_ACTION_PREFIX = "organizations:"
+
+# Labels used in finding "References" for the kinds of reference without a key
+ORGANIZATIONS_ARN_LABEL = "arn:aws:organizations"
+ORGANIZATIONS_SERVICE_ROLE_LABEL = "aws-service-role/organizations"
+ORGANIZATIONS_SERVICE_PRINCIPAL_LABEL = ORGANIZATIONS_SERVICE_PRINCIPAL
+ORGANIZATIONS_ACTION_LABEL = "organizations actions"
+
+# Reference categories: org references tie the policy to the organization's identity
+# (its ID, paths or ARNs); organizations dependencies grant or use the Organizations
+# service itself (its service principal, organizations:* actions), which a policy
+# loses just as well when the account moves to another organization
+ORG_REFERENCE = "org_reference"
+ORGANIZATIONS_DEPENDENCY = "organizations_dependency"
+
+# Every org condition key and organizations ARN contains "org", so raw documents
+# without it are rejected before they are parsed
+_ORG_HINT = re.compile('org', re.IGNORECASE)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _principals(value):
+    """
+    Normalize a Principal/NotPrincipal element to {principal type: [values]}
+    """
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        # "Principal": "*"
+        return {"*": [str(item) for item in _as_list(value)]}
+    return {kind: [str(item) for item in _as_list(items)] for kind, items in value.items()}
+
+
+class PolicyIndex:
+    """
+    A policy document parsed once into normalized statements, with its condition keys
+    indexed so lookups do not rescan the document.
+
+    Each statement is a dict with sid, effect, actions, not_actions, resources,
+    not_resources, principals and not_principals ({principal type: [values]}) and
+    conditions, a list of (operator, key, values).
+    """
+
+    def __init__(self, statements: list):
+        self.statements = statements
+        self._conditions_by_key = {}
+        for index, statement in enumerate(statements):
+            for operator, key, values in statement["conditions"]:
+                self._conditions_by_key.setdefault(key.lower(), []).append((index, operator, key, values))
+
+    @classmethod
+    def parse(cls, document):
+        """
+        Build the index from a raw JSON policy string or an already parsed policy.
+        Raises ValueError when the document is not a valid policy.
+        """
+        if isinstance(document, str):
+            document = json.loads(document)
+        if not isinstance(document, dict):
+            raise ValueError("Policy document must be a JSON object")
+
+        statements = []
+        for raw in _as_list(document.get("Statement")):
+            if not isinstance(raw, dict):
+                raise ValueError("Policy statement must be a JSON object")
+            conditions = []
+            for operator, entries in (raw.get("Condition") or {}).items():
+                for key, values in (entries or {}).items():
+                    conditions.append((operator, key, [str(value) for value in _as_list(values)]))
+            statements.append({
+                "sid": raw.get("Sid"),
+                "effect": raw.get("Effect"),
+                "actions": [str(action) for action in _as_list(raw.get("Action"))],
+                "not_actions": [str(action) for action in _as_list(raw.get("NotAction"))],
+                "resources": [str(resource) for resource in _as_list(raw.get("Resource"))],
+                "not_resources": [str(resource) for resource in _as_list(raw.get("NotResource"))],
+                "principals": _principals(raw.get("Principal")),
+                "not_principals": _principals(raw.get("NotPrincipal")),
+                "conditions": conditions
+            })
+        return cls(statements)
+
+    def conditions(self, key: str):
+        """
+        Return (statement, operator, key, values) for every use of a condition key,
+        matched case-insensitively like IAM does
+        """
+        return [
+            (self.statements[index], operator, original_key, values)
+            for index, operator, original_key, values in self._conditions_by_key.get(key.lower(), [])
+        ]
+
+    def condition_values(self, key: str):
+        """Every value a condition key is compared against, in document order"""
+        return [value for _, _, _, values in self.conditions(key) for value in values]
+
+    def statements_with_condition(self, key: str):
+        """Statements that use a condition key, each once, in document order"""
+        indexes = dict.fromkeys(index for index, _, _, _ in self._conditions_by_key.get(key.lower(), []))
+        return [self.statements[index] for index in indexes]
+
+    def principals(self, principal_type: str = None):
+        """
+        Return (statement, principal type, value) for every Principal value, optionally
+        only those of one type (AWS, Service, Federated, CanonicalUser or "*")
+        """
+        return [
+            (statement, kind, value)
+            for statement in self.statements
+            for kind, values in statement["principals"].items()
+            if principal_type is None or kind == principal_type
+            for value in values
+        ]
+
+    def actions(self, service: str = None):
+        """
+        Return (statement, action) for every Action value, optionally only the actions
+        of one service prefix (e.g. "organizations"), matched case-insensitively
+        """
+        prefix = f"{service.lower()}:" if service else None
+        return [
+            (statement, action)
+            for statement in self.statements
+            for action in statement["actions"]
+            if prefix is None or action.lower().startswith(prefix)
+        ]
+
+    def org_references(self):
+        """
+        Return the organization references of the policy as a list of dicts:
+          {"kind": "condition", "key": "aws:PrincipalOrgID", "operator", "values", "sid", "effect"}
+          {"kind": "organizations_arn" | "organizations_service_role", "location", "values", "sid", "effect"}
+          {"kind": "organizations_service_principal", "location", "values", "sid", "effect"}
+          {"kind": "organizations_action", "location", "values", "sid", "effect"}
+        where location is Principal, NotPrincipal, Resource, NotResource, Action, NotAction
+        or Condition:<key>. Every reference also has a "category", ORG_REFERENCE or
+        ORGANIZATIONS_DEPENDENCY (service principal and action references).
+        """
+        references = []
+        for statement in self.statements:
+            for operator, key, values in statement["conditions"]:
+                canonical = ORG_CONDITION_KEYS.get(key.lower())
+                if canonical:
+                    references.append({
+                        "kind": "condition",
+                        "category": ORG_REFERENCE,
+                        "key": canonical,
+                        "operator": operator,
+                        "values": values,
+                        "sid": statement["sid"],
+                        "effect": statement["effect"]
+                    })
+
+            locations = [
+                ("Principal", [value for values in statement["principals"].values() for value in values]),
+                ("NotPrincipal", [value for values in statement["not_principals"].values() for value in values]),
+                ("Resource", statement["resources"]),
+                ("NotResource", statement["not_resources"])
+            ] + [(f"Condition:{key}", values) for _, key, values in statement["conditions"]]
+
+            for location, values in locations:
+                for kind, pattern in (("organizations_arn", ORGANIZATIONS_ARN),
+                                      ("organizations_service_role", ORGANIZATIONS_SERVICE_ROLE_ARN)):
+                    matched = [value for value in values if pattern.match(value)]
+                    if matched:
+                        references.append({
+                            "kind": kind,
+                            "category": ORG_REFERENCE,
+                            "location": location,
+                            "values": matched,
+                            "sid": statement["sid"],
+                            "effect": statement["effect"]
+                        })
+                # The service principal, as a Principal or e.g. an aws:PrincipalServiceName value
+                matched = [value for value in values if value.lower() == ORGANIZATIONS_SERVICE_PRINCIPAL]
+                if matched:
+                    references.append({
+                        "kind": "organizations_service_principal",
+                        "category": ORGANIZATIONS_DEPENDENCY,
+                        "location": location,
+                        "values": matched,
+                        "sid": statement["sid"],
+                        "effect": statement["effect"]
+                    })
+
+            for location, values in (("Action", statement["actions"]), ("NotAction", statement["not_actions"])):
+                matched = [value for value in values if value.lower().startswith(ORGANIZATIONS_ACTION_PREFIX)]
+                if matched:
+                    references.append({
+                        "kind": "organizations_action",
+                        "category": ORGANIZATIONS_DEPENDENCY,
+                        "location": location,
+                        "values": matched,
+                        "sid": statement["sid"],
+                        "effect": statement["effect"]
+                    })
+        return references
+
+
+def reference_label(reference: dict):
+    """Short label of one reference, as shown in a finding's References"""
+    if reference["kind"] == "text":
+        return reference["pattern"]
+    if reference["kind"] == "condition":
+        return reference["key"]
+    if reference["kind"] == "organizations_service_role":
+        return ORGANIZATIONS_SERVICE_ROLE_LABEL
+    if reference["kind"] == "organizations_service_principal":
+        return ORGANIZATIONS_SERVICE_PRINCIPAL_LABEL
+    if reference["kind"] == "organizations_action":
+        return ORGANIZATIONS_ACTION_LABEL
+    return ORGANIZATIONS_ARN_LABEL
+
+
+def reference_labels(references: list):
+    """Distinct labels of a list of references, in the order they first appear"""
+    return list(dict.fromkeys(reference_label(reference) for reference in references))
+
+
+def analyze_org_references(document):
+    """
+    Return the organization references of a policy document (raw string or parsed),
+    see PolicyIndex.org_references. Documents that cannot be parsed raise ValueError.
+    """
+    if document is None:
+        return []
+    if isinstance(document, str) and not _ORG_HINT.search(document):
+        return []
+    return PolicyIndex.parse(document).org_references()
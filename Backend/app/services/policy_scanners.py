@@ -0,0 +1,680 @@
+import hashlib
+import json
+from botocore.exceptions import ClientError
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.services.aws_managed_policy_catalog import get_aws_managed_policy_catalog, is_catalog_policy
+from app.services.aws_session_cache import LRUTTLCache
+from app.services.concurrency import fetch_all, iter_fetch
+from app.services.kms_inventory import get_kms_inventory
+from app.services.org_matcher import OrgReferenceMatcher
+from app.services.policy_analysis import ORG_REFERENCE, ORGANIZATIONS_DEPENDENCY, analyze_org_references, reference_labels
+from app.services.regions import get_enabled_regions, for_each_region
+
+# Text patterns for org/OU references, only used for documents that are not valid JSON policies
+ORG_PATTERNS = [
+    r'aws:PrincipalOrgID',
+    r'aws:PrincipalOrgPaths',
+    r'arn:aws:organizations',
+    r'arn:aws:iam::[0-9]+:role/aws-service-role/organizations',
+    r'organizations',
+    r'org-'
+]
+
+ORG_REFERENCE_MATCHER = OrgReferenceMatcher(ORG_PATTERNS)
+
+
+# Version of the finding format, part of every stored fingerprint so that findings
+# stored in an older format are matched again instead of being reused
+FINDING_FORMAT = "v3"
+
+
+def find_org_references(policy_doc):
+    """
+    Return the organization references of a policy document (raw string or parsed JSON),
+    see policy_analysis.PolicyIndex.org_references. Documents that are not valid JSON
+    policies fall back to text matching and yield {"kind": "text", "pattern"} references.
+    """
+    try:
+        return analyze_org_references(policy_doc)
+    except (ValueError, TypeError, AttributeError):
+        return [
+            {"kind": "text", "category": ORG_REFERENCE, "pattern": pattern}
+            for pattern in ORG_REFERENCE_MATCHER.find(policy_doc)
+        ]
+
+
+def _with_references(build_finding, references: list):
+    """
+    Build a finding for a policy with organization references: References holds their
+    labels, Org_references the exact keys, values and statements they were found in, and
+    Organizations_dependencies the uses of the Organizations service principal and actions
+    """
+    if not references:
+        return None
+    finding = build_finding(reference_labels(references))
+    finding["Org_references"] = [reference for reference in references if reference["category"] != ORGANIZATIONS_DEPENDENCY]
+    dependencies = [reference for reference in references if reference["category"] == ORGANIZATIONS_DEPENDENCY]
+    if dependencies:
+        finding["Organizations_dependencies"] = dependencies
+    return finding
+
+
+# Each scanner below checks one service and records into `partial`:
+#   partial["findings"]     - list of result rows, in the shape returned to the frontend
+#   partial["checked"]      - number of policies/resources inspected
+#   partial["details"]      - optional extra per-service facts for the summary, including
+#                             "no_policy" (fetched, no policy attached) and "unscanned"
+#                             (resources whose policy could not be read, with the reason)
+#   partial["fingerprints"] - per-resource fingerprint and result, stored for the next scan
+# and, when partial["emit"] is set, reports each finding and periodic progress through it
+# as soon as they are known (used by the streaming endpoint).
+# partial["previous"] holds the fingerprints stored by the last scan of this account, so
+# resources whose fingerprint did not change reuse their stored result instead of being
+# fetched and matched again.
+# Exceptions raised by a scanner are recorded as that service's error by the caller,
+# findings collected before the failure are kept. Per-resource policy fetches go through
+# iter_fetch, which runs them on the shared bounded pool. Regional services are scanned
+# in every enabled region through scan_regions, and their findings carry a "Region".
+
+# Emit a progress event every this many resources of a service
+PROGRESS_EVERY = 100
+
+
+def emit(partial: dict, event_type: str, **data):
+    """
+    Report an event for the streaming endpoint, a no-op for a plain scan
+    """
+    callback = partial.get("emit")
+    if callback:
+        callback({"type": event_type, **data})
+
+
+def _emit_finding(partial: dict, finding):
+    if finding:
+        emit(partial, "finding", finding=finding)
+
+def content_fingerprint(document):
+    """
+    Fingerprint of a policy document's content, for resources without cheap change metadata
+    """
+    if document is None:
+        return "none"
+    if not isinstance(document, str):
+        document = json.dumps(document, sort_keys=True)
+    return "sha256:" + hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def _record(partial: dict, resource_key: str, fingerprint: str, match):
+    """
+    Record one resource's fingerprint and return its finding (or None).
+    The stored finding is reused when the fingerprint is unchanged, otherwise match() is called.
+    """
+    details = partial["details"]
+    fingerprint = f"{FINDING_FORMAT}:{fingerprint}"
+    stored = partial["previous"].get(resource_key)
+    if stored is not None and stored["fingerprint"] == fingerprint:
+        finding = stored["result"]
+        details["skipped"] = details.get("skipped", 0) + 1
+    else:
+        finding = match()
+        details["rescanned"] = details.get("rescanned", 0) + 1
+    partial["fingerprints"].append({
+        "resource_arn": resource_key,
+        "fingerprint": fingerprint,
+        "result": finding
+    })
+    return finding
+
+
+def scan_resources(service: str, partial: dict, resources: list, resource_key, fetch, build_finding, list_token=None):
+    """
+    Fetch and match the policy of every listed resource of one service.
+
+    resource_key(resource)  -> stable key (usually the ARN) the fingerprint is stored under
+    fetch(resource)         -> policy document, or None when the resource has no policy
+    build_finding(resource, labels) -> result row for a resource with org references, labels
+                               being the reference labels (Org_references is added to it)
+    list_token(resource)    -> optional change token available from the listing call
+                               (version id, RevisionId, ...); when it matches the stored
+                               fingerprint the resource is not fetched at all
+    Findings are emitted as soon as each resource is done and appended in listing order.
+    """
+    partial["checked"] += len(resources)
+    findings = [None] * len(resources)
+    emit(partial, "progress", listed=len(resources), done=0)
+
+    def match_document(resource, document):
+        references = find_org_references(document) if document else []
+        return _with_references(lambda labels: build_finding(resource, labels), references)
+
+    to_fetch = []
+    for index, resource in enumerate(resources):
+        key = resource_key(resource)
+        token = list_token(resource) if list_token else None
+        stored = partial["previous"].get(key)
+        if token is not None and stored is not None and stored["fingerprint"] == f"{FINDING_FORMAT}:list:{token}":
+            findings[index] = _record(partial, key, f"list:{token}", lambda: None)
+            _emit_finding(partial, findings[index])
+        else:
+            to_fetch.append((index, resource, token))
+
+    details = partial["details"]
+    done = len(resources) - len(to_fetch)
+    # The checkpoint event lets the receiver stop the scan before each fetch (a cancelled job raises from it)
+    checkpoint = lambda: emit(partial, "checkpoint")
+    for _, (index, resource, token), document, error in iter_fetch(service, lambda entry: fetch(entry[1]), to_fetch, checkpoint):
+        done += 1
+        key = resource_key(resource)
+        if error:
+            # No fingerprint is stored, so the resource is fetched again on the next scan
+            print(f"Error checking {service} policy for {key}: {str(error)}")
+            reason = error.response['Error']['Code'] if isinstance(error, ClientError) else type(error).__name__
+            details.setdefault("unscanned", []).append({"resource": key, "reason": reason})
+        else:
+            if document is None:
+                details["no_policy"] = details.get("no_policy", 0) + 1
+            fingerprint = f"list:{token}" if token is not None else content_fingerprint(document)
+            findings[index] = _record(partial, key, fingerprint, lambda: match_document(resource, document))
+            _emit_finding(partial, findings[index])
+        if done % PROGRESS_EVERY == 0:
+            emit(partial, "progress", listed=len(resources), done=done)
+
+    partial["findings"].extend(finding for finding in findings if finding)
+
+
+def _iam_policy_finding(name: str, arn: str, policy_type: str, matches: list):
+    print(f"*** FOUND ORGANIZATION REFERENCE IN {policy_type.upper()} POLICY: {name} ***")
+    return {
+        "Name": name,
+        "Arn": arn,
+        "Type": policy_type,
+        "References": matches
+    }
+
+
+def _iam_list_token(policy: dict):
+    update_date = policy.get('UpdateDate')
+    return f"{policy['DefaultVersionId']}@{update_date.isoformat() if hasattr(update_date, 'isoformat') else update_date}"
+
+
+def scan_customer_managed_policies(session, partial: dict):
+    """
+    Check customer managed IAM policies, one GetPolicyVersion call per changed policy
+    """
+    iam_client = session.client('iam')
+    paginator = iam_client.get_paginator('list_policies')
+
+    policies = []
+    for page in paginator.paginate(Scope='Local'):
+        policies.extend(page['Policies'])
+    print(f"Found {len(policies)} customer managed policies")
+
+    def fetch(policy):
+        return iam_client.get_policy_version(
+            PolicyArn=policy['Arn'],
+            VersionId=policy['DefaultVersionId']
+        )['PolicyVersion']['Document']
+
+    scan_resources(
+        'iam', partial, policies,
+        resource_key=lambda policy: policy['Arn'],
+        fetch=fetch,
+        build_finding=lambda policy, matches: _iam_policy_finding(policy['PolicyName'], policy['Arn'], "Customer Managed", matches),
+        list_token=_iam_list_token
+    )
+
+
+def _record_iam_document(partial: dict, resource_key: str, fingerprint: str, document, name: str, arn: str, policy_type: str):
+    """
+    Count one IAM policy document from the authorization details and record its finding
+    """
+    partial["checked"] += 1
+
+    def match():
+        references = find_org_references(document) if document else []
+        return _with_references(lambda labels: _iam_policy_finding(name, arn, policy_type, labels), references)
+
+    finding = _record(partial, resource_key, fingerprint, match)
+    if finding:
+        partial["findings"].append(finding)
+        _emit_finding(partial, finding)
+    if partial["checked"] % PROGRESS_EVERY == 0:
+        emit(partial, "progress", checked=partial["checked"])
+
+
+def scan_iam_authorization_details(session, partial: dict):
+    """
+    Check IAM policies in bulk with GetAccountAuthorizationDetails.
+
+    A handful of paginated calls return the default version of every customer managed
+    policy, every role trust policy and every user/group/role inline policy, instead of
+    one GetPolicyVersion call per policy.
+    """
+    iam_client = session.client('iam')
+    paginator = iam_client.get_paginator('get_account_authorization_details')
+
+    for page in paginator.paginate(Filter=['LocalManagedPolicy', 'Role', 'User', 'Group']):
+        for policy in page.get('Policies', []):
+            document = next(
+                (version['Document'] for version in policy.get('PolicyVersionList', []) if version.get('IsDefaultVersion')),
+                None
+            )
+            policy_name = policy.get('PolicyName') or policy['Arn'].split('/')[-1]
+            _record_iam_document(partial, policy['Arn'], f"list:{_iam_list_token(policy)}", document, policy_name, policy['Arn'], "Customer Managed")
+
+        for role in page.get('RoleDetailList', []):
+            trust_policy = role.get('AssumeRolePolicyDocument')
+            _record_iam_document(partial, f"{role['Arn']}#trust", content_fingerprint(trust_policy), trust_policy, role['RoleName'], role['Arn'], "Role Trust Policy")
+            for inline in role.get('RolePolicyList', []):
+                document = inline.get('PolicyDocument')
+                _record_iam_document(partial, f"{role['Arn']}#inline/{inline['PolicyName']}", content_fingerprint(document), document, f"{role['RoleName']}/{inline['PolicyName']}", role['Arn'], "Inline (Role)")
+
+        for user in page.get('UserDetailList', []):
+            for inline in user.get('UserPolicyList', []):
+                document = inline.get('PolicyDocument')
+                _record_iam_document(partial, f"{user['Arn']}#inline/{inline['PolicyName']}", content_fingerprint(document), document, f"{user['UserName']}/{inline['PolicyName']}", user['Arn'], "Inline (User)")
+
+        for group in page.get('GroupDetailList', []):
+            for inline in group.get('GroupPolicyList', []):
+                document = inline.get('PolicyDocument')
+                _record_iam_document(partial, f"{group['Arn']}#inline/{inline['PolicyName']}", content_fingerprint(document), document, f"{group['GroupName']}/{inline['PolicyName']}", group['Arn'], "Inline (Group)")
+
+
+def scan_iam_policies(session, partial: dict):
+    """
+    Check account IAM policies using the configured IAM_SCAN_MODE.
+    "authorization_details" falls back to the per-policy scan when the caller is not
+    allowed to call GetAccountAuthorizationDetails.
+    """
+    if settings.IAM_SCAN_MODE == "per_policy":
+        scan_customer_managed_policies(session, partial)
+        return
+
+    try:
+        scan_iam_authorization_details(session, partial)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('AccessDenied', 'AccessDeniedException'):
+            raise
+        print(f"GetAccountAuthorizationDetails not allowed, falling back to per-policy IAM scan: {str(e)}")
+        partial["findings"].clear()
+        partial["fingerprints"].clear()
+        partial["details"].clear()
+        partial["checked"] = 0
+        # Findings already streamed are reported again by the per-policy scan
+        emit(partial, "restart", reason="GetAccountAuthorizationDetails not allowed")
+        scan_customer_managed_policies(session, partial)
+
+
+def _sweep_aws_managed_policies(session, partial: dict):
+    """
+    Check AWS managed IAM policies with "organization" in the name directly against AWS
+    """
+    iam_client = session.client('iam')
+    paginator = iam_client.get_paginator('list_policies')
+
+    policies = []
+    for page in paginator.paginate(Scope='AWS'):
+        policies.extend(policy for policy in page['Policies'] if is_catalog_policy(policy))
+
+    def fetch(policy):
+        return iam_client.get_policy_version(
+            PolicyArn=policy['Arn'],
+            VersionId=policy['DefaultVersionId']
+        )['PolicyVersion']['Document']
+
+    scan_resources(
+        'iam', partial, policies,
+        resource_key=lambda policy: policy['Arn'],
+        fetch=fetch,
+        build_finding=lambda policy, matches: _iam_policy_finding(policy['PolicyName'], policy['Arn'], "AWS Managed", matches)
+    )
+
+
+def scan_aws_managed_policies(session, partial: dict):
+    """
+    Check AWS managed IAM policies with "organization" in the name.
+    Answers from the shared Postgres catalog, which is only swept when stale, and falls
+    back to sweeping AWS directly when the catalog cannot be read.
+    """
+    try:
+        catalog, refresh = get_aws_managed_policy_catalog(session, find_org_references)
+    except SQLAlchemyError as e:
+        print(f"AWS managed policy catalog unavailable, sweeping AWS directly: {str(e)}")
+        partial["details"]["catalog"] = "unavailable"
+        _sweep_aws_managed_policies(session, partial)
+        return
+
+    partial["details"]["catalog"] = "refreshed" if refresh else "cached"
+    if refresh:
+        partial["details"]["catalog_fetched"] = refresh["fetched"]
+
+    partial["checked"] += len(catalog)
+    for entry in catalog:
+        # Analyzed from the stored document, so catalog rows written by an older analysis stay correct
+        finding = _with_references(
+            lambda labels: {
+                "Name": entry["policy_name"],
+                "Arn": entry["policy_arn"],
+                "Type": "AWS Managed",
+                "References": labels
+            },
+            find_org_references(entry["document"])
+        )
+        if finding:
+            partial["findings"].append(finding)
+            _emit_finding(partial, finding)
+
+
+# (account, bucket name) -> region; a bucket's region only changes if it is deleted and recreated
+_bucket_region_cache = LRUTTLCache(settings.S3_BUCKET_REGION_CACHE_SIZE, settings.S3_BUCKET_REGION_CACHE_TTL_SECONDS)
+
+
+def _list_buckets(s3_client):
+    """
+    List all buckets; paginated listings also return each bucket's region
+    """
+    if not s3_client.can_paginate('list_buckets'):
+        return s3_client.list_buckets()['Buckets']
+    buckets = []
+    for page in s3_client.get_paginator('list_buckets').paginate(PaginationConfig={'PageSize': 1000}):
+        buckets.extend(page.get('Buckets', []))
+    return buckets
+
+
+def _resolve_bucket_regions(session, s3_client, buckets: list):
+    """
+    Return {bucket name: region}, from the listing's BucketRegion, the bucket region
+    cache, or GetBucketLocation (in parallel) for the rest
+    """
+    account_key = getattr(session, "account_key", None)
+    regions = {}
+    unresolved = []
+    for bucket in buckets:
+        region = bucket.get('BucketRegion') or _bucket_region_cache.get((account_key, bucket['Name']))
+        if region:
+            regions[bucket['Name']] = region
+        else:
+            unresolved.append(bucket['Name'])
+
+    def locate(name):
+        location = s3_client.get_bucket_location(Bucket=name).get('LocationConstraint')
+        # Buckets in us-east-1 have no location constraint, "EU" is the legacy name of eu-west-1
+        return {None: 'us-east-1', '': 'us-east-1', 'EU': 'eu-west-1'}.get(location, location)
+
+    for name, region, error in fetch_all('s3', locate, unresolved):
+        if error:
+            # Fall back to the global endpoint, botocore follows the region redirect
+            print(f"Error getting location of bucket {name}: {str(error)}")
+            regions[name] = 'us-east-1'
+            continue
+        regions[name] = region
+        _bucket_region_cache.put((account_key, name), region)
+    return regions
+
+
+def scan_s3_policies(session, partial: dict):
+    """
+    Check S3 bucket policies, each through a client in the bucket's own region so no
+    request is redirected. Buckets whose policy cannot be read (e.g. AccessDenied) are
+    listed in details["unscanned"], buckets without a policy are counted in details["no_policy"].
+    """
+    # Listing and locating buckets works from the global endpoint
+    s3_client = session.client('s3', region_name='us-east-1')
+    buckets = _list_buckets(s3_client)
+    regions = _resolve_bucket_regions(session, s3_client, buckets)
+
+    def fetch(bucket):
+        regional_client = session.client('s3', region_name=regions[bucket['Name']])
+        try:
+            return regional_client.get_bucket_policy(Bucket=bucket['Name'])['Policy']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchBucketPolicy':
+                return None
+            raise
+
+    scan_resources(
+        's3', partial, buckets,
+        resource_key=lambda bucket: f"arn:aws:s3:::{bucket['Name']}",
+        fetch=fetch,
+        build_finding=lambda bucket, matches: {
+            "Bucket": bucket['Name'],
+            "Region": regions[bucket['Name']],
+            "References": matches
+        }
+    )
+    partial["details"]["regions"] = len(set(regions.values()))
+
+
+def scan_regions(session, partial: dict, scan_region):
+    """
+    Run scan_region(session, region, region_partial) in every enabled region concurrently
+    and merge the per-region results into partial in region order.
+    A failing region is reported in details["region_errors"]; the service only fails
+    when every region failed.
+    """
+    regions = get_enabled_regions(session)
+    parent_emit = partial.get("emit")
+
+    def run(region):
+        region_partial = {
+            "service": partial.get("service"),
+            "findings": [],
+            "checked": 0,
+            "details": {},
+            "previous": partial["previous"],
+            "fingerprints": []
+        }
+        if parent_emit:
+            region_partial["emit"] = lambda event: parent_emit({**event, "region": region})
+        scan_region(session, region, region_partial)
+        return region_partial
+
+    region_errors = {}
+    first_error = None
+    for region, region_partial, error in for_each_region(regions, run):
+        if error:
+            print(f"Error in {partial.get('service')} policy check in {region}: {str(error)}")
+            region_errors[region] = str(error)
+            first_error = first_error or error
+            continue
+        partial["findings"].extend(region_partial["findings"])
+        partial["checked"] += region_partial["checked"]
+        partial["fingerprints"].extend(region_partial["fingerprints"])
+        for name, value in region_partial["details"].items():
+            if isinstance(value, list):
+                partial["details"].setdefault(name, []).extend(value)
+            else:
+                partial["details"][name] = partial["details"].get(name, 0) + value
+
+    partial["details"]["regions"] = len(regions)
+    if region_errors:
+        partial["details"]["region_errors"] = region_errors
+        if len(region_errors) == len(regions):
+            raise first_error
+
+
+def _scan_kms_region(session, region: str, partial: dict):
+    kms_client = session.client('kms', region_name=region)
+    inventory = get_kms_inventory(kms_client)
+
+    # AWS managed key policies are fixed by AWS, only customer managed keys are fetched
+    keys = [key for key in inventory if not key["AwsManaged"]]
+    partial["details"]["aws_managed_skipped"] = len(inventory) - len(keys)
+
+    def fetch(key):
+        return kms_client.get_key_policy(KeyId=key['KeyId'], PolicyName='default')['Policy']
+
+    scan_resources(
+        'kms', partial, keys,
+        resource_key=lambda key: key['KeyArn'] or key['KeyId'],
+        fetch=fetch,
+        build_finding=lambda key, matches: {
+            "Key_id": key['KeyId'],
+            "Alias": key['Aliases'][0] if key['Aliases'] else "Unknown",
+            "Region": region,
+            "References": matches
+        }
+    )
+
+
+def scan_kms_policies(session, partial: dict):
+    """
+    Check customer managed KMS key policies in every enabled region
+    """
+    scan_regions(session, partial, _scan_kms_region)
+
+
+def _scan_sqs_region(session, region: str, partial: dict):
+    sqs_client = session.client('sqs', region_name=region)
+    paginator = sqs_client.get_paginator('list_queues')
+
+    queue_urls = []
+    for page in paginator.paginate():
+        queue_urls.extend(page.get('QueueUrls', []))
+
+    def fetch(queue_url):
+        attributes = sqs_client.get_queue_attributes(
+            QueueUrl=queue_url,
+            AttributeNames=['Policy']
+        )
+        return attributes.get('Attributes', {}).get('Policy')
+
+    scan_resources(
+        'sqs', partial, queue_urls,
+        resource_key=lambda queue_url: queue_url,
+        fetch=fetch,
+        build_finding=lambda queue_url, matches: {
+            "Queue_name": queue_url.split('/')[-1],
+            "Queue_url": queue_url,
+            "Region": region,
+            "References": matches
+        }
+    )
+
+
+def scan_sqs_policies(session, partial: dict):
+    """
+    Check SQS queue policies in every enabled region
+    """
+    scan_regions(session, partial, _scan_sqs_region)
+
+
+def _scan_sns_region(session, region: str, partial: dict):
+    sns_client = session.client('sns', region_name=region)
+    paginator = sns_client.get_paginator('list_topics')
+
+    topic_arns = []
+    for page in paginator.paginate():
+        topic_arns.extend(topic['TopicArn'] for topic in page['Topics'])
+
+    def fetch(topic_arn):
+        return sns_client.get_topic_attributes(TopicArn=topic_arn)['Attributes'].get('Policy')
+
+    scan_resources(
+        'sns', partial, topic_arns,
+        resource_key=lambda topic_arn: topic_arn,
+        fetch=fetch,
+        build_finding=lambda topic_arn, matches: {
+            "Topic_name": topic_arn.split(':')[-1],
+            "Topic_arn": topic_arn,
+            "Region": region,
+            "References": matches
+        }
+    )
+
+
+def scan_sns_policies(session, partial: dict):
+    """
+    Check SNS topic policies in every enabled region
+    """
+    scan_regions(session, partial, _scan_sns_region)
+
+
+def _scan_lambda_region(session, region: str, partial: dict):
+    lambda_client = session.client('lambda', region_name=region)
+    paginator = lambda_client.get_paginator('list_functions')
+
+    functions = []
+    for page in paginator.paginate():
+        functions.extend(page['Functions'])
+
+    def fetch(function):
+        try:
+            return lambda_client.get_policy(FunctionName=function['FunctionName']).get('Policy')
+        except ClientError as e:
+            # ResourceNotFoundException is expected for functions without policies
+            if e.response['Error']['Code'] == 'ResourceNotFoundException':
+                return None
+            raise
+
+    scan_resources(
+        'lambda', partial, functions,
+        resource_key=lambda function: function['FunctionArn'],
+        fetch=fetch,
+        build_finding=lambda function, matches: {
+            "Function_name": function['FunctionName'],
+            "Function_arn": function['FunctionArn'],
+            "Region": region,
+            "References": matches
+        },
+        list_token=lambda function: function.get('RevisionId')
+    )
+
+
+def scan_lambda_policies(session, partial: dict):
+    """
+    Check Lambda function resource policies in every enabled region.
+    Changing a function's resource policy changes its RevisionId, so unchanged functions are not fetched.
+    """
+    scan_regions(session, partial, _scan_lambda_region)
+
+
+def _scan_secretsmanager_region(session, region: str, partial: dict):
+    secretsmanager_client = session.client('secretsmanager', region_name=region)
+    paginator = secretsmanager_client.get_paginator('list_secrets')
+
+    secrets = []
+    for page in paginator.paginate():
+        secrets.extend(page['SecretList'])
+
+    def fetch(secret):
+        return secretsmanager_client.get_resource_policy(SecretId=secret['ARN']).get('ResourcePolicy')
+
+    def list_token(secret):
+        changed = secret.get('LastChangedDate')
+        return changed.isoformat() if hasattr(changed, 'isoformat') else changed
+
+    scan_resources(
+        'secretsmanager', partial, secrets,
+        resource_key=lambda secret: secret['ARN'],
+        fetch=fetch,
+        build_finding=lambda secret, matches: {
+            "Secret_name": secret['Name'],
+            "Secret_arn": secret['ARN'],
+            "Region": region,
+            "References": matches
+        },
+        list_token=list_token
+    )
+
+
+def scan_secretsmanager_policies(session, partial: dict):
+    """
+    Check Secrets Manager resource policies in every enabled region.
+    Unchanged secrets (same LastChangedDate) are not fetched.
+    """
+    scan_regions(session, partial, _scan_secretsmanager_region)
+
+
+# (service name, result list key, error key, scanner), in the order results are reported
+POLICY_SCANNERS = [
+    ("iam", "iam_policies", "iam_error", scan_iam_policies),
+    ("iam_aws_managed", "iam_policies", "aws_policy_error", scan_aws_managed_policies),
+    ("s3", "s3_policies", "s3_error", scan_s3_policies),
+    ("kms", "kms_policies", "kms_error", scan_kms_policies),
+    ("sqs", "sqs_policies", "sqs_error", scan_sqs_policies),
+    ("sns", "sns_policies", "sns_error", scan_sns_policies),
+    ("lambda", "lambda_policies", "lambda_error", scan_lambda_policies),
+    ("secretsmanager", "secretsmanager_policies", "secretsmanager_error", scan_secretsmanager_policies),
+]
@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import threading
+import time
+from app.core.config import settings
+from app.services.concurrency import THROTTLING_ERROR_CODES, parse_limits
+
+# Requests per second each service's buckets start at and climb back to
+RATE_LIMITS = parse_limits(settings.RATE_GOVERNOR_RATES)
+
+# Trackers of the runs the current code belongs to; pools started from a run copy the
+# context (concurrency.ContextThreadPoolExecutor), so their requests count for it too
+_active_trackers = contextvars.ContextVar("rate_governor_trackers", default=())
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate adapts to throttling: every throttled response halves the
+    rate (down to RATE_GOVERNOR_MIN_RATE) and empties the bucket, every successful one
+    adds back a fiftieth of the ceiling, so throughput settles just under the API quota.
+    """
+
+    def __init__(self, max_rate: float):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.tokens = max_rate
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.requests += 1
+            # Tokens may go negative: later callers queue up behind this reservation
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited_seconds += wait
+        return wait
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Take a token, waiting on the event loop until one is available"""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(settings.RATE_GOVERNOR_MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 50)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "max_rate": self.max_rate,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "waited_seconds": round(self.waited_seconds, 2)
+            }
+
+
+class ThrottleTracker:
+    """
+    Requests and throttled responses of the AWS calls made inside a `with` block, and in
+    the threads and tasks its work fans out to. Counted per tracker, so steps running at
+    once on one account each report only their own requests.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_by_service = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _active_trackers.set(_active_trackers.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_trackers.reset(self._token)
+        return False
+
+    def on_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def on_throttle(self, service: str, region: str):
+        with self._lock:
+            self.throttled += 1
+            label = f"{service} ({region})"
+            self.throttled_by_service[label] = self.throttled_by_service.get(label, 0) + 1
+
+    def report(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "throttled_by_service": dict(self.throttled_by_service)
+            }
+
+
+class RateGovernor:
+    """
+    Process-wide token buckets keyed by (account, service, region), shared by every
+    client of that key and so by all concurrently running steps. Clients are hooked in
+    through botocore events: each HTTP attempt, retries included, waits for a token in
+    before-send, and needs-retry reports throttled or successful responses back. Both
+    are also counted by the active trackers (track()) of the calling context.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, account_key: str, service: str, region: str):
+        key = (account_key, service, region)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(float(RATE_LIMITS.get(service, settings.RATE_GOVERNOR_DEFAULT_RATE)))
+                self._buckets[key] = bucket
+            return bucket
+
+    def attach(self, client, account_key: str, asynchronous: bool = False):
+        """
+        Route every request of a boto3 client, or of an aiobotocore client when
+        asynchronous is set, through its bucket; returns the client
+        """
+        if not settings.RATE_GOVERNOR_ENABLED:
+            return client
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+        bucket = self.bucket(account_key, service, region)
+
+        if asynchronous:
+            # aiobotocore awaits coroutine handlers, so waiting for a token doesn't block the loop
+            async def before_send(**kwargs):
+                await bucket.acquire_async()
+                for tracker in _active_trackers.get():
+                    tracker.on_request()
+        else:
+            def before_send(**kwargs):
+                bucket.acquire()
+                for tracker in _active_trackers.get():
+                    tracker.on_request()
+
+        def needs_retry(response=None, caught_exception=None, **kwargs):
+            if response is None:
+                return
+            http_response, parsed = response
+            if parsed.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES or http_response.status_code == 429:
+                bucket.on_throttle()
+                for tracker in _active_trackers.get():
+                    tracker.on_throttle(service, region)
+            elif http_response.status_code < 400:
+                bucket.on_success()
+
+        client.meta.events.register('before-send', before_send)
+        client.meta.events.register('needs-retry', needs_retry)
+        return client
+
+    def track(self):
+        """
+        Tracker counting the requests made while it is entered:
+            with rate_governor.track() as tracker:
+                ...
+            tracker.report()
+        """
+        return ThrottleTracker()
+
+    def stats(self):
+        with self._lock:
+            buckets = list(self._buckets.items())
+        return {f"{account} {service} ({region})": bucket.stats() for (account, service, region), bucket in buckets}
+
+
+rate_governor = RateGovernor()
@@ -0,0 +1,59 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from app.core.config import settings
+from app.services.aws_session_cache import LRUTTLCache
+from app.services.concurrency import ContextThreadPoolExecutor
+
+# Enabled regions per (account, credentials), discovered once and reused by every check
+_region_cache = LRUTTLCache(settings.AWS_SESSION_CACHE_MAX_SESSIONS, settings.REGION_CACHE_TTL_SECONDS)
+
+# Shared by all checks, so its size caps the number of regions scanned at once process-wide
+_region_pool = ContextThreadPoolExecutor(max_workers=settings.REGION_SCAN_MAX_WORKERS, thread_name_prefix="region-scan")
+
+
+def _pinned_regions():
+    return [region.strip() for region in settings.SCAN_REGIONS.split(",") if region.strip()]
+
+
+def get_enabled_regions(session):
+    """
+    Return the regions enabled for the session's account, sorted.
+
+    Uses SCAN_REGIONS when set, otherwise ec2:DescribeRegions, cached per account for
+    REGION_CACHE_TTL_SECONDS. When the regions cannot be listed only the session's own
+    region is returned, and that fallback is not cached.
+    """
+    pinned = _pinned_regions()
+    if pinned:
+        return pinned
+
+    key = (getattr(session, "account_key", None), getattr(session, "fingerprint", None))
+    regions = _region_cache.get(key) if key[0] else None
+    if regions is not None:
+        return regions
+
+    try:
+        ec2_client = session.client('ec2')
+        response = ec2_client.describe_regions(AllRegions=False)
+        regions = sorted(region['RegionName'] for region in response['Regions'])
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error listing enabled regions, scanning {session.region_name} only: {str(e)}")
+        return [session.region_name]
+
+    if key[0]:
+        _region_cache.put(key, regions)
+    return regions
+
+
+def for_each_region(regions, scan_region):
+    """
+    Run scan_region(region) for every region on the shared region pool.
+    Returns a list of (region, result, error) tuples in the same order as regions.
+    """
+    futures = [(region, _region_pool.submit(scan_region, region)) for region in regions]
+    outcomes = []
+    for region, future in futures:
+        try:
+            outcomes.append((region, future.result(), None))
+        except Exception as e:
+            outcomes.append((region, None, e))
+    return outcomes
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta, timezone
+from app.services.concurrency import fetch_all
+from app.services.regions import get_enabled_regions, for_each_region
+
+# Reservations ending within this many days are counted as expiring soon
+EXPIRY_WARNING_DAYS = 90
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if value:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return None
+
+
+def _reservation(service: str, region: str, reservation_id: str, reservation_type: str, count,
+                 state: str, offering: str, start, end=None, duration_seconds=None):
+    """One row of the reservation table; end is derived from start + duration when not given"""
+    start = _as_datetime(start)
+    end = _as_datetime(end)
+    if end is None and start is not None and duration_seconds:
+        end = start + timedelta(seconds=int(duration_seconds))
+    return {
+        "Service": service,
+        "Id": reservation_id,
+        "Type": reservation_type,
+        "Count": count,
+        "Region": region,
+        "State": state,
+        "Offering": offering,
+        "Start_date": start.strftime('%Y-%m-%d') if start else '',
+        "End_date": end.strftime('%Y-%m-%d') if end else '',
+        "Days_left": (end - datetime.now(timezone.utc)).days if end else None
+    }
+
+
+def _paginate(client, operation: str, result_key: str, **kwargs):
+    paginator = client.get_paginator(operation)
+    items = []
+    for page in paginator.paginate(**kwargs):
+        items.extend(page.get(result_key, []))
+    return items
+
+
+def _ec2_reservations(session, region: str):
+    client = session.client('ec2', region_name=region)
+    response = client.describe_reserved_instances(Filters=[{'Name': 'state', 'Values': ['active']}])
+    return [
+        _reservation(
+            "EC2", region, ri.get('ReservedInstancesId', ''), ri.get('InstanceType', ''),
+            ri.get('InstanceCount', 0), ri.get('State', ''),
+            f"{ri.get('OfferingClass', '')} {ri.get('OfferingType', '')}".strip(),
+            ri.get('Start'), end=ri.get('End')
+        )
+        for ri in response.get('ReservedInstances', [])
+    ]
+
+
+def _rds_reservations(session, region: str):
+    client = session.client('rds', region_name=region)
+    return [
+        _reservation(
+            "RDS", region, ri.get('ReservedDBInstanceId', ''), ri.get('DBInstanceClass', ''),
+            ri.get('DBInstanceCount', 0), ri.get('State', ''), ri.get('OfferingType', ''),
+            ri.get('StartTime'), duration_seconds=ri.get('Duration')
+        )
+        for ri in _paginate(client, 'describe_reserved_db_instances', 'ReservedDBInstances')
+        if ri.get('State') == 'active'
+    ]
+
+
+def _elasticache_reservations(session, region: str):
+    client = session.client('elasticache', region_name=region)
+    return [
+        _reservation(
+            "ElastiCache", region, node.get('ReservedCacheNodeId', ''), node.get('CacheNodeType', ''),
+            node.get('CacheNodeCount', 0), node.get('State', ''), node.get('OfferingType', ''),
+            node.get('StartTime'), duration_seconds=node.get('Duration')
+        )
+        for node in _paginate(client, 'describe_reserved_cache_nodes', 'ReservedCacheNodes')
+        if node.get('State') == 'active'
+    ]
+
+
+def _redshift_reservations(session, region: str):
+    client = session.client('redshift', region_name=region)
+    return [
+        _reservation(
+            "Redshift", region, node.get('ReservedNodeId', ''), node.get('NodeType', ''),
+            node.get('NodeCount', 0), node.get('State', ''), node.get('OfferingType', ''),
+            node.get('StartTime'), duration_seconds=node.get('Duration')
+        )
+        for node in _paginate(client, 'describe_reserved_nodes', 'ReservedNodes')
+        if node.get('State') == 'active'
+    ]
+
+
+def _opensearch_reservations(session, region: str):
+    client = session.client('opensearch', region_name=region)
+    instances = []
+    request = {"MaxResults": 100}
+    # No botocore paginator for this operation
+    while True:
+        response = client.describe_reserved_instances(**request)
+        instances.extend(response.get('ReservedInstances', []))
+        if not response.get('NextToken'):
+            break
+        request["NextToken"] = response['NextToken']
+    return [
+        _reservation(
+            "OpenSearch", region, ri.get('ReservedInstanceId', ''), ri.get('InstanceType', ''),
+            ri.get('InstanceCount', 0), ri.get('State', ''), ri.get('PaymentOption', ''),
+            ri.get('StartTime'), duration_seconds=ri.get('Duration')
+        )
+        for ri in instances
+        if ri.get('State', '').lower() == 'active'
+    ]
+
+
+# Regional reservation APIs: (service label, lister)
+RESERVATION_SOURCES = [
+    ("EC2", _ec2_reservations),
+    ("RDS", _rds_reservations),
+    ("ElastiCache", _elasticache_reservations),
+    ("Redshift", _redshift_reservations),
+    ("OpenSearch", _opensearch_reservations),
+]
+
+
+def get_savings_plans(session):
+    """Every active Savings Plan of the account, in reservation table rows"""
+    client = session.client('savingsplans')
+    plans = []
+    request = {"states": ['active'], "maxResults": 1000}
+    # No botocore paginator for this operation
+    while True:
+        response = client.describe_savings_plans(**request)
+        plans.extend(response.get('savingsPlans', []))
+        if not response.get('nextToken'):
+            break
+        request["nextToken"] = response['nextToken']
+    return [
+        _reservation(
+            "Savings Plans", plan.get('region', '') or 'global', plan.get('savingsPlanId', ''),
+            plan.get('savingsPlanType', ''), 1, plan.get('state', ''),
+            f"{plan.get('paymentOption', '')}, {plan.get('commitment', '')} {plan.get('currency', 'USD')}/hour",
+            plan.get('start'), end=plan.get('end')
+        )
+        for plan in plans
+    ]
+
+
+def sort_reservations(rows: list):
+    """Order reservation rows by expiry, rows without an end date last"""
+    return sorted(rows, key=lambda row: (row["End_date"] or '9999', row["Service"], row["Id"]))
+
+
+def get_reservation_inventory(session):
+    """
+    List the active reservations of every service in RESERVATION_SOURCES in every
+    enabled region. Regions run on the shared region pool and the services of a region
+    run concurrently on the resource pool; every listing is fully paginated.
+
+    Returns (rows sorted by end date, regions checked, {"<region>/<service>": error}).
+    """
+    regions = get_enabled_regions(session)
+
+    def scan_region(region):
+        return fetch_all('reservations', lambda source: source[1](session, region), RESERVATION_SOURCES)
+
+    rows = []
+    errors = {}
+    for region, outcomes, error in for_each_region(regions, scan_region):
+        if error:
+            outcomes = [(source, None, error) for source in RESERVATION_SOURCES]
+        for (service, _), reservations, service_error in outcomes:
+            if service_error:
+                # Usually the service is not offered in the region or not authorized
+                errors[f"{region}/{service}"] = str(service_error)
+                continue
+            rows.extend(reservations)
+
+    return sort_reservations(rows), regions, errors
@@ -0,0 +1,193 @@
+import statistics
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import PG_queries
+from app.services.concurrency import fetch_all
+
+# Days of utilization history check_ri_and_savings_plans reports
+UTILIZATION_WINDOW_DAYS = 30
+
+# Cost Explorer may still revise the most recent days, so they are fetched again on every run
+UTILIZATION_REFRESH_DAYS = 3
+
+
+def plan_id(savings_plan_arn: str):
+    return savings_plan_arn.rsplit('/', 1)[-1]
+
+
+def get_utilization_details(ce_client, day: date):
+    """
+    Utilization of every Savings Plan on one day, from get_savings_plans_utilization_details
+    following NextToken, as series entries
+    """
+    request = {
+        "TimePeriod": {"Start": day.isoformat(), "End": (day + timedelta(days=1)).isoformat()},
+        "MaxResults": 1000
+    }
+    entries = []
+    while True:
+        response = ce_client.get_savings_plans_utilization_details(**request)
+        for detail in response.get('SavingsPlansUtilizationDetails', []):
+            utilization = detail.get('Utilization', {})
+            entries.append({
+                "savings_plan_arn": detail['SavingsPlanArn'],
+                "usage_date": day,
+                "total_commitment": Decimal(utilization.get('TotalCommitment', '0')),
+                "used_commitment": Decimal(utilization.get('UsedCommitment', '0')),
+                "unused_commitment": Decimal(utilization.get('UnusedCommitment', '0')),
+                "utilization_percentage": Decimal(utilization.get('UtilizationPercentage', '0')),
+                "net_savings": Decimal(detail.get('Savings', {}).get('NetSavings', '0'))
+            })
+        if not response.get('NextToken'):
+            return entries
+        request["NextToken"] = response['NextToken']
+
+
+def _series_entry(row):
+    return {
+        "savings_plan_arn": row.savings_plan_arn,
+        "usage_date": row.usage_date,
+        "total_commitment": Decimal(row.total_commitment),
+        "used_commitment": Decimal(row.used_commitment),
+        "unused_commitment": Decimal(row.unused_commitment),
+        "utilization_percentage": Decimal(row.utilization_percentage),
+        "net_savings": Decimal(row.net_savings)
+    }
+
+
+def _empty_day(day: date):
+    """Marker row for a day without utilization (before a plan started, after it ended)"""
+    return {
+        "savings_plan_arn": PG_queries.SAVINGS_PLAN_EMPTY_DAY,
+        "usage_date": day,
+        "total_commitment": Decimal(0),
+        "used_commitment": Decimal(0),
+        "unused_commitment": Decimal(0),
+        "utilization_percentage": Decimal(0),
+        "net_savings": Decimal(0)
+    }
+
+
+def get_utilization_series(ce_client, db, account_key: str, start: date, end: date):
+    """
+    Return the per-plan daily utilization of [start, end), answered from the
+    savings_plan_utilization_daily cache.
+
+    Days without cached rows, and the last UTILIZATION_REFRESH_DAYS days, are requested
+    with one paginated details query per day, run concurrently, and written back.
+    Days that had no utilization are stored as a marker row, so they are not requested
+    again either. The second value counts cached and fetched days.
+    """
+    cached = []
+    if db is not None:
+        try:
+            cached = [_series_entry(row) for row in PG_queries.get_savings_plan_utilization_days(db, account_key, start, end)]
+        except SQLAlchemyError as e:
+            print(f"Error reading cached Savings Plans utilization, fetching every day: {str(e)}")
+            db.rollback()
+
+    all_days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+    refresh_from = end - timedelta(days=UTILIZATION_REFRESH_DAYS)
+    cached_days = {entry["usage_date"] for entry in cached if entry["usage_date"] < refresh_from}
+    missing = [day for day in all_days if day not in cached_days]
+    stats = {"days_cached": len(all_days) - len(missing), "days_fetched": 0}
+
+    series = [
+        entry for entry in cached
+        if entry["usage_date"] in cached_days and entry["savings_plan_arn"] != PG_queries.SAVINGS_PLAN_EMPTY_DAY
+    ]
+    fetched = []
+    to_store = []
+    for day, entries, error in fetch_all('ce', lambda day: get_utilization_details(ce_client, day), missing):
+        if error:
+            raise error
+        fetched.extend(entries)
+        to_store.extend(entries or [_empty_day(day)])
+        stats["days_fetched"] += 1
+    series.extend(fetched)
+
+    if db is not None and to_store:
+        try:
+            PG_queries.upsert_savings_plan_utilization_days(db, account_key, to_store)
+        except SQLAlchemyError as e:
+            print(f"Error caching Savings Plans utilization: {str(e)}")
+            db.rollback()
+
+    series.sort(key=lambda entry: (entry["usage_date"], entry["savings_plan_arn"]))
+    return series, stats
+
+
+def _p10(values: list):
+    """10th percentile with linear interpolation, like Postgres percentile_cont(0.1)"""
+    if len(values) == 1:
+        return values[0]
+    return Decimal(statistics.quantiles(values, n=10, method='inclusive')[0])
+
+
+def _aggregate_in_memory(series: list):
+    """Same rows as PG_queries.aggregate_savings_plan_utilization, for runs without a database"""
+    groups = {None: series}
+    for entry in series:
+        groups.setdefault(entry["savings_plan_arn"], []).append(entry)
+
+    rows = []
+    for savings_plan_arn, entries in groups.items():
+        if not entries:
+            continue
+        percentages = sorted(entry["utilization_percentage"] for entry in entries)
+        rows.append({
+            "savings_plan_arn": savings_plan_arn,
+            "days": len(entries),
+            "mean_utilization": sum(percentages) / len(percentages),
+            "p10_utilization": _p10(percentages),
+            "used_commitment": sum(entry["used_commitment"] for entry in entries),
+            "total_commitment": sum(entry["total_commitment"] for entry in entries),
+            "unused_commitment": sum(entry["unused_commitment"] for entry in entries),
+            "net_savings": sum(entry["net_savings"] for entry in entries)
+        })
+    return rows
+
+
+def _summary(row: dict):
+    def amount(value):
+        return format(Decimal(value).quantize(Decimal('0.01')), 'f')
+
+    total = Decimal(row["total_commitment"])
+    summary = {
+        "Days": row["days"],
+        "Mean_utilization": amount(row["mean_utilization"]),
+        "P10_utilization": amount(row["p10_utilization"]),
+        "Utilization": amount(Decimal(row["used_commitment"]) / total * 100) if total else "0.00",
+        "Unused_commitment": amount(row["unused_commitment"]),
+        "Net_savings": amount(row["net_savings"])
+    }
+    if row["savings_plan_arn"]:
+        summary = {"Id": plan_id(row["savings_plan_arn"]), **summary}
+    return summary
+
+
+def aggregate_utilization(db, account_key: str, start: date, end: date, series: list):
+    """
+    Mean and 10th percentile daily utilization, commitment-weighted utilization and
+    unused commitment per plan and across all plans. The aggregation runs as one
+    grouped query over the cache; without a database it is done over series.
+
+    Returns {"Plans": [per plan, least utilized first], "All_plans": {...}}.
+    """
+    rows = None
+    if db is not None:
+        try:
+            rows = [row._asdict() for row in PG_queries.aggregate_savings_plan_utilization(db, account_key, start, end)]
+        except SQLAlchemyError as e:
+            print(f"Error aggregating Savings Plans utilization: {str(e)}")
+            db.rollback()
+    if rows is None:
+        rows = _aggregate_in_memory(series)
+
+    plans = sorted(
+        (_summary(row) for row in rows if row["savings_plan_arn"]),
+        key=lambda plan: Decimal(plan["Mean_utilization"])
+    )
+    overall = next((_summary(row) for row in rows if not row["savings_plan_arn"] and row["days"]), None)
+    return {"Plans": plans, "All_plans": overall or {}}
@@ -0,0 +1,59 @@
+from app.services.concurrency import fetch_all
+
+SERVICE_MANAGED = 'SERVICE_MANAGED'
+
+
+def auto_deployment_label(auto_deployment: dict):
+    """Auto deployment settings as a string, to avoid [object Object] in the frontend"""
+    label = "Enabled" if auto_deployment.get('Enabled', False) else "Disabled"
+    if 'RetainStacksOnAccountRemoval' in auto_deployment:
+        label += f", Retain stacks on account removal: {'Yes' if auto_deployment.get('RetainStacksOnAccountRemoval') else 'No'}"
+    return label
+
+
+def list_stack_set_summaries(cfn_client):
+    """Every StackSet summary; summaries already carry PermissionModel and AutoDeployment"""
+    summaries = []
+    paginator = cfn_client.get_paginator('list_stack_sets')
+    for page in paginator.paginate():
+        summaries.extend(page['Summaries'])
+    return summaries
+
+
+def describe_stack_sets(cfn_client, names: list):
+    """
+    describe_stack_set for the given StackSets, run concurrently.
+    Returns a list of (name, StackSet, error) in the order of names.
+    """
+    return fetch_all(
+        'cloudformation',
+        lambda name: cfn_client.describe_stack_set(StackSetName=name)['StackSet'],
+        names
+    )
+
+
+def stack_instance_targets(cfn_client, name: str):
+    """
+    Page through every stack instance of a StackSet, keeping only the distinct OUs,
+    accounts and regions, so StackSets with thousands of instances stay small in memory
+    """
+    targets = {"ous": set(), "accounts": set(), "regions": set(), "instances": 0}
+    paginator = cfn_client.get_paginator('list_stack_instances')
+    for page in paginator.paginate(StackSetName=name):
+        for instance in page.get('Summaries', []):
+            targets["instances"] += 1
+            if instance.get('OrganizationalUnitId'):
+                targets["ous"].add(instance['OrganizationalUnitId'])
+            if instance.get('Account'):
+                targets["accounts"].add(instance['Account'])
+            if instance.get('Region'):
+                targets["regions"].add(instance['Region'])
+    return targets
+
+
+def get_stack_instance_targets(cfn_client, names: list):
+    """
+    stack_instance_targets for the given StackSets, run concurrently.
+    Returns a list of (name, targets, error) in the order of names.
+    """
+    return fetch_all('cloudformation', lambda name: stack_instance_targets(cfn_client, name), names)
@@ -0,0 +1,224 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.db import PG_queries
+from app.db.PG import StepStatus
+from app.db.schemas import StepExecutionCreate
+from app.db.session import SessionLocal
+from app.services.executors import job_executor
+from app.services.step_registry import execution_logs, execution_status
+
+
+class StepJobCancelled(Exception):
+    """Raised from the event callback of a cancelled job to stop its check"""
+
+
+class StepJobNotCancellable(Exception):
+    """A job that is in progress but cannot be cancelled from this process"""
+
+
+class StepJob:
+    """
+    A step execution running (or queued) on the job executor of this process.
+    Partial results are collected from the check's events and written to the
+    execution row at most every STEP_JOB_PROGRESS_SECONDS, and after each service.
+    """
+
+    def __init__(self, execution_id: int, step: dict):
+        self.execution_id = execution_id
+        self.step = step
+        self.future = None
+        self.cancelled = threading.Event()
+        self.partial = {"partial": True, "findings": 0, "progress": {}, "services": {}}
+        self.written_at = 0.0
+        self._lock = threading.Lock()
+
+    def on_event(self, event: dict):
+        """
+        Fold one event of a check into the partial result; called from scanner threads.
+        Raises StepJobCancelled once the job is cancelled, which stops the scan at its next event.
+        """
+        if self.cancelled.is_set():
+            raise StepJobCancelled(f"Step job {self.execution_id} was cancelled")
+        if event["type"] == "checkpoint":
+            return
+        with self._lock:
+            service = event.get("service")
+            if event["type"] == "finding":
+                self.partial["findings"] += 1
+            elif event["type"] == "progress":
+                self.partial["progress"][service] = {
+                    key: value for key, value in event.items() if key not in ("type", "service", "result_key")
+                }
+            elif event["type"] == "service_complete":
+                self.partial["progress"].pop(service, None)
+                self.partial["services"][service] = {
+                    "checked": event["checked"],
+                    "with_references": event["with_references"],
+                    "duration": event["duration"],
+                    "error": event["error"]
+                }
+            due = event["type"] == "service_complete" or time.monotonic() - self.written_at >= settings.STEP_JOB_PROGRESS_SECONDS
+            if not due:
+                return
+            self.written_at = time.monotonic()
+            # Copied under the lock: the scanner threads keep updating it
+            partial = {**self.partial, "progress": dict(self.partial["progress"]), "services": dict(self.partial["services"])}
+        self._write_partial(partial)
+
+    def _write_partial(self, partial: dict):
+        db = SessionLocal()
+        try:
+            PG_queries.update_running_step_execution(db, self.execution_id, StepStatus.IN_PROGRESS, result_data=partial)
+        except SQLAlchemyError as e:
+            print(f"Error saving partial result of job {self.execution_id}: {str(e)}")
+        finally:
+            db.close()
+
+    def run(self, run_check):
+        """Worker: run the check with its own DB session and record the outcome"""
+        db = SessionLocal()
+        start_time = time.time()
+        try:
+            try:
+                result = run_check(db, self.on_event)
+                logs = execution_logs(self.step, result)
+                status = execution_status(result)
+                if self.cancelled.is_set():
+                    # The check finished before its next event, so its result is complete and kept
+                    logs.append("Cancel requested after the check had finished, result kept")
+            except StepJobCancelled:
+                db.rollback()
+                _mark_cancelled(db, self.execution_id)
+                return
+            except Exception as e:
+                print(f"Error in step job {self.execution_id}: {str(e)}")
+                db.rollback()
+                result = {"success": False, "error": str(e), "message": f"Step failed: {str(e)}"}
+                logs = execution_logs(self.step, result)
+                status = StepStatus.FAILED
+            PG_queries.update_running_step_execution(
+                db, self.execution_id, status,
+                result_data=result, logs=logs, execution_time=int(time.time() - start_time)
+            )
+        finally:
+            db.close()
+            with _jobs_lock:
+                _jobs.pop(self.execution_id, None)
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def submit_step_job(db, step: dict, run_check):
+    """
+    Record an in-progress execution of a registered step and queue run_check(db, on_event)
+    on the job executor. Returns the execution, whose id is the job ID.
+    """
+    execution = PG_queries.create_step_execution(db, StepExecutionCreate(
+        step_id=step["id"],
+        status=StepStatus.IN_PROGRESS,
+        result_data={},
+        logs=[],
+        execution_time=0
+    ))
+    job = StepJob(execution.id, step)
+    with _jobs_lock:
+        _jobs[execution.id] = job
+        job.future = job_executor.submit(job.run, run_check)
+    return execution
+
+
+def job_state(execution_id: int):
+    """
+    State of a job run by this process, "queued", "running" or "cancelling" (running
+    until its next event); None for other jobs
+    """
+    with _jobs_lock:
+        job = _jobs.get(execution_id)
+    if job is None or job.future is None:
+        return None
+    if not job.future.running():
+        return "queued"
+    return "cancelling" if job.cancelled.is_set() else "running"
+
+
+def _heartbeat():
+    """
+    Refresh the executions of this process's jobs (queued ones included) and fail the
+    in-progress executions no process has refreshed for STEP_JOB_STALE_SECONDS
+    """
+    with _jobs_lock:
+        execution_ids = list(_jobs)
+    db = SessionLocal()
+    try:
+        PG_queries.touch_step_executions(db, execution_ids)
+        stale_before = datetime.now() - timedelta(seconds=settings.STEP_JOB_STALE_SECONDS)
+        interrupted = PG_queries.fail_interrupted_step_executions(db, stale_before)
+        if interrupted:
+            print(f"Marked {interrupted} step executions of stopped API processes as failed")
+    except SQLAlchemyError as e:
+        print(f"Error in step job heartbeat: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+_heartbeat_stop = threading.Event()
+
+
+def _heartbeat_loop():
+    while True:
+        _heartbeat()
+        if _heartbeat_stop.wait(settings.STEP_JOB_PROGRESS_SECONDS):
+            return
+
+
+def start_job_heartbeat():
+    """Start the heartbeat of this process's jobs, at startup; the first beat runs at once"""
+    _heartbeat_stop.clear()
+    threading.Thread(target=_heartbeat_loop, name="step-job-heartbeat", daemon=True).start()
+
+
+def stop_job_heartbeat():
+    _heartbeat_stop.set()
+
+
+def _mark_cancelled(db, execution_id: int):
+    return PG_queries.update_running_step_execution(db, execution_id, StepStatus.CANCELLED, logs=["Cancelled by request"])
+
+
+def cancel_step_job(db, execution_id: int):
+    """
+    Cancel an in-progress job. A queued job never starts and is marked cancelled at once.
+    A running check with events stops at its next one (the policy scan emits one before
+    each resource fetch) and then ends cancelled; if it finishes first, its result is kept.
+    Running checks without events may have side effects (create_iam_admin creates a user
+    and returns its password), so they are not cancelled, nor are jobs that another live
+    process runs: both raise StepJobNotCancellable. Executions lost with their process
+    are marked cancelled. Returns False when the execution is no longer in progress.
+    """
+    with _jobs_lock:
+        job = _jobs.get(execution_id)
+    if job is not None:
+        if job.future.cancel():
+            with _jobs_lock:
+                _jobs.pop(execution_id, None)
+            return _mark_cancelled(db, execution_id)
+        if job.future.done():
+            return False
+        if not job.step.get("events"):
+            raise StepJobNotCancellable(f"Job {execution_id} is running a check that cannot be interrupted")
+        job.cancelled.set()
+        return True
+
+    execution = PG_queries.get_step_execution(db, execution_id)
+    if execution is None or execution.status != StepStatus.IN_PROGRESS:
+        return False
+    last_seen = execution.updated_at or execution.created_at
+    if datetime.now() - last_seen < timedelta(seconds=settings.STEP_JOB_STALE_SECONDS):
+        raise StepJobNotCancellable(f"Job {execution_id} is run by another API process")
+    return _mark_cancelled(db, execution_id)
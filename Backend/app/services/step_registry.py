@@ -0,0 +1,204 @@
+import threading
+from app.db import PG_queries
+from app.db.PG import AutomationType, PhaseType, StepStatus
+from app.services.aws_services import check_ram_shared_resources, check_ram_shared_resources_async, check_delegated_admins, check_cost_explorer_data, check_ri_and_savings_plans, check_policy_references, check_stacksets_for_org_integration, create_fallback_admin_user
+
+# Map URL path to PhaseType enum
+PHASE_TYPE_MAP = {
+    "assess-existing": PhaseType.ASSESS_EXISTING,
+    "prepare-new": PhaseType.PREPARE_NEW,
+    "migrate": PhaseType.MIGRATION,
+    "verify": PhaseType.VERIFY_NEW,
+    "post-migration": PhaseType.POST_MIGRATION
+}
+
+
+def _message_log(result: dict):
+    return f"Analysis complete: {result['message'] if 'message' in result else 'No message provided.'}"
+
+
+def _cost_explorer_log(result: dict):
+    return (
+        f"Analysis complete: Found {len(result.get('billing_periods', []))} billing periods "
+        f"and {len(result.get('cur_reports', []))} Cost and Usage Reports"
+    )
+
+
+# Every executable step, keyed by URL slug.
+#   check(db, account_id, *options) runs the step and returns its result dict; options are
+#   the step's boolean query parameters with their defaults, passed in declaration order.
+#   async_check, when set, is awaited instead whenever the aiobotocore layer is available.
+#   events marks checks that take an on_event callback after the options, which background
+#   jobs use for partial results.
+#   log is the step-specific line of the execution logs, complete_log builds the last one.
+# The metadata columns are written to the step table once per process (seed_steps).
+STEP_REGISTRY = {
+    "check_ram": {
+        "id": 1,
+        "phase": "assess-existing",
+        "title": "Check for resources shared via RAM",
+        "description": "Check for resources shared via RAM with the rest of the Org or OUs",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically scan for shared resources",
+        "check": check_ram_shared_resources,
+        "async_check": check_ram_shared_resources_async,
+        "log": "Checking for resources shared via RAM..."
+    },
+    "check_admin_services": {
+        "id": 2,
+        "phase": "assess-existing",
+        "title": "Check for delegated admin services",
+        "description": "Check if services like AWS Backups, GuardDuty, Inspector have delegated admin in old org",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 8,
+        "notes": "Agent will identify all delegated admin services",
+        "check": check_delegated_admins,
+        "options": {"refresh": False},
+        "log": "Checking for delegated admin accounts..."
+    },
+    "cost_explorer_data": {
+        "id": 3,
+        "phase": "assess-existing",
+        "title": "Check Cost Explorer Data",
+        "description": "Cost explorer data in Payer2 will NOT have historical data from Payer1.",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically check Cost Explorer data",
+        "check": check_cost_explorer_data,
+        "options": {"linked_accounts": False},
+        "log": "Checking Cost Explorer data...",
+        "complete_log": _cost_explorer_log
+    },
+    "check_savings": {
+        "id": 4,
+        "phase": "assess-existing",
+        "title": "Check RI and Savings Plans",
+        "description": "Check RI and Savings Plans",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically check RI and Savings Plans",
+        "check": check_ri_and_savings_plans,
+        "log": "Checking RI and Savings Plans..."
+    },
+    "check_policies": {
+        "id": 5,
+        "phase": "assess-existing",
+        "title": "Check for policy references",
+        "description": "Check for policy documents across various AWS services for Organization/OU references",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically check for policy references",
+        "check": check_policy_references,
+        "options": {"full_rescan": False},
+        "events": True,
+        "log": "Checking for policy references..."
+    },
+    "check_stacksets": {
+        "id": 6,
+        "phase": "assess-existing",
+        "title": "Check for stacksets",
+        "description": "Check if CloudFormation StackSets use AWS Organizations",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically check for stacksets",
+        "check": check_stacksets_for_org_integration,
+        "log": "Checking for stacksets using Organizations..."
+    },
+    "create_iam_admin": {
+        "id": 8,
+        "phase": "assess-existing",
+        "title": "Create Fallback IAM Admin",
+        "description": "Create Admin for sso if fails",
+        "automation_type": AutomationType.FULLY_AUTOMATED,
+        "estimated_time": 5,
+        "notes": "Agent will automatically create IAM Admin",
+        "check": create_fallback_admin_user,
+        "log": "Creating IAM Admin..."
+    }
+}
+
+# Step ID mapping
+STEP_IDS = {slug: step["id"] for slug, step in STEP_REGISTRY.items()}
+
+# Phase type to step IDs mapping
+PHASE_STEPS = {
+    phase: [step["id"] for step in STEP_REGISTRY.values() if step["phase"] == phase]
+    for phase in PHASE_TYPE_MAP
+}
+
+
+def get_step_definition(phase_type: str, step_slug: str):
+    """Registry entry of a step of a phase, accepting hyphenated slugs; None when unknown"""
+    step = STEP_REGISTRY.get(step_slug.replace("-", "_"))
+    if step is None or step["phase"] != phase_type:
+        return None
+    return step
+
+
+def parse_options(step: dict, query_params):
+    """Values of the step's options from the query string, in declaration order"""
+    values = []
+    for name, default in step.get("options", {}).items():
+        value = query_params.get(name)
+        if value is None:
+            values.append(default)
+        else:
+            values.append(value.strip().lower() in ("1", "true", "yes", "on"))
+    return values
+
+
+def step_rows():
+    """Step table rows of every registered step, for PG_queries.upsert_steps"""
+    return [
+        {
+            "id": step["id"],
+            "phase_type": PHASE_TYPE_MAP[step["phase"]],
+            "title": step["title"],
+            "description": step["description"],
+            "automation_type": step["automation_type"],
+            "api_available": step.get("api_available", True),
+            "estimated_time": step["estimated_time"],
+            "requires_confirmation": step.get("requires_confirmation", False),
+            "notes": step["notes"]
+        }
+        for step in STEP_REGISTRY.values()
+    ]
+
+
+def execution_status(result: dict):
+    """
+    Status of an execution from its result: the check's success flag, or for results
+    without one, failed when they carry an error
+    """
+    if result.get("success", not result.get("error")):
+        return StepStatus.COMPLETED
+    return StepStatus.FAILED
+
+
+def execution_logs(step: dict, result: dict):
+    complete_log = step.get("complete_log", _message_log)
+    return [
+        "Initializing AWS SDK...",
+        "Connecting to AWS account...",
+        step["log"],
+        complete_log(result)
+    ]
+
+
+_seeded = threading.Event()
+
+
+def steps_seeded():
+    return _seeded.is_set()
+
+
+def seed_steps(db):
+    """
+    Write the metadata of every registered step with one bulk upsert. Runs at startup;
+    if the database was down then, the first execution seeds it (see steps_seeded).
+    """
+    if _seeded.is_set():
+        return
+    PG_queries.upsert_steps(db, step_rows())
+    _seeded.set()
@@ -0,0 +1,141 @@
+"""
+Micro-benchmark: legacy per-pattern re.search vs OrgReferenceMatcher.
+
+Builds a corpus of synthetic but realistically sized policy documents (IAM identity
+policies, S3 bucket policies, KMS key policies, SQS/SNS access policies) and times:
+  - legacy:          json.dumps for IAM documents + one re.search per pattern
+  - matcher (raw):   OrgReferenceMatcher.find on the raw document string
+  - matcher (parsed): OrgReferenceMatcher.find on the parsed IAM document, no json.dumps
+  - analysis:        structured policy analysis (exact org condition keys and ARNs),
+                     which also drops text-only matches such as "my-org-data/*"
+
+Run from the Backend directory:
+    python -m benchmarks.bench_org_matcher [--documents 5000] [--repeat 5]
+"""
+import argparse
+import json
+import random
+import re
+import time
+from app.services.org_matcher import OrgReferenceMatcher
+from app.services.policy_analysis import analyze_org_references
+from app.services.policy_scanners import ORG_PATTERNS
+
+ACTIONS = [
+    "s3:GetObject", "s3:PutObject", "s3:ListBucket", "kms:Decrypt", "kms:GenerateDataKey*",
+    "sqs:SendMessage", "sqs:ReceiveMessage", "sns:Publish", "ec2:Describe*", "iam:PassRole",
+    "logs:CreateLogStream", "logs:PutLogEvents", "dynamodb:Query", "lambda:InvokeFunction",
+    "secretsmanager:GetSecretValue", "cloudwatch:PutMetricData", "ssm:GetParameter"
+]
+
+
+def _principal(rng):
+    account = rng.randint(10 ** 11, 10 ** 12 - 1)
+    return rng.choice([
+        "*",
+        {"AWS": f"arn:aws:iam::{account}:root"},
+        {"AWS": [f"arn:aws:iam::{account}:role/app-role-{rng.randint(1, 99)}" for _ in range(rng.randint(1, 4))]},
+        {"Service": rng.choice(["cloudtrail.amazonaws.com", "logs.amazonaws.com", "events.amazonaws.com"])}
+    ])
+
+
+def _condition(rng):
+    # Roughly 1 in 12 statements carries an org reference, like a typical landing zone
+    roll = rng.random()
+    if roll < 0.03:
+        return {"StringEquals": {"aws:PrincipalOrgID": f"o-{rng.randint(10 ** 9, 10 ** 10)}"}}
+    if roll < 0.05:
+        return {"ForAnyValue:StringLike": {"aws:PrincipalOrgPaths": ["o-a1b2c3d4e5/r-ab12/ou-ab12-11111111/*"]}}
+    if roll < 0.07:
+        return {"ArnLike": {"aws:SourceArn": "arn:aws:organizations::111122223333:organization/o-a1b2c3d4e5"}}
+    if roll < 0.08:
+        return {"StringLike": {"s3:prefix": ["my-org-data/*"]}}
+    if roll < 0.3:
+        return {"Bool": {"aws:SecureTransport": "true"}}
+    return None
+
+
+def _statement(rng, index, resource_policy):
+    statement = {
+        "Sid": f"Statement{index}",
+        "Effect": rng.choice(["Allow", "Allow", "Deny"]),
+        "Action": rng.sample(ACTIONS, rng.randint(1, 6)),
+        "Resource": [
+            f"arn:aws:s3:::data-bucket-{rng.randint(1, 5000)}/{rng.choice(['logs', 'exports', 'raw'])}/*"
+            for _ in range(rng.randint(1, 5))
+        ]
+    }
+    if resource_policy:
+        statement["Principal"] = _principal(rng)
+    condition = _condition(rng)
+    if condition:
+        statement["Condition"] = condition
+    return statement
+
+
+def build_corpus(size: int, seed: int = 7):
+    """
+    Return a list of (kind, document) where IAM documents are dicts (as boto3 returns
+    them) and resource policies are JSON strings
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        kind = rng.choice(["iam", "iam", "s3", "kms", "sqs", "sns"])
+        document = {
+            "Version": "2012-10-17",
+            "Id": f"{kind}-policy-{rng.randint(1, 10 ** 6)}",
+            "Statement": [_statement(rng, i, kind != "iam") for i in range(rng.randint(1, 14))]
+        }
+        corpus.append((kind, document if kind == "iam" else json.dumps(document, indent=rng.choice([None, 2]))))
+    return corpus
+
+
+def legacy_find(document):
+    policy_doc = json.dumps(document) if not isinstance(document, str) else document
+    return [pattern for pattern in ORG_PATTERNS if re.search(pattern, policy_doc, re.IGNORECASE)]
+
+
+def _time(fn, documents, repeat):
+    best = None
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = [fn(document) for document in documents]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.documents)
+    documents = [document for _, document in corpus]
+    raw_documents = [document if isinstance(document, str) else json.dumps(document) for document in documents]
+    total_bytes = sum(len(document) for document in raw_documents)
+    matcher = OrgReferenceMatcher(ORG_PATTERNS)
+
+    legacy_time, legacy_output = _time(legacy_find, documents, args.repeat)
+    raw_time, raw_output = _time(matcher.find, raw_documents, args.repeat)
+    parsed_time, parsed_output = _time(matcher.find, documents, args.repeat)
+    analysis_time, analysis_output = _time(analyze_org_references, documents, args.repeat)
+
+    assert raw_output == legacy_output, "matcher (raw) disagrees with legacy matching"
+    assert parsed_output == legacy_output, "matcher (parsed) disagrees with legacy matching"
+
+    matched = sum(1 for references in legacy_output if references)
+    print(f"Corpus: {len(documents)} policies, {total_bytes / len(documents):.0f} bytes avg, {matched} with org references")
+    print(f"{'legacy re.search x' + str(len(ORG_PATTERNS)):<28}{legacy_time * 1000:>10.1f} ms")
+    print(f"{'matcher (raw string)':<28}{raw_time * 1000:>10.1f} ms  {legacy_time / raw_time:.2f}x")
+    print(f"{'matcher (parsed IAM docs)':<28}{parsed_time * 1000:>10.1f} ms  {legacy_time / parsed_time:.2f}x")
+    analyzed = sum(1 for references in analysis_output if references)
+    print(f"{'analysis (structured)':<28}{analysis_time * 1000:>10.1f} ms  {legacy_time / analysis_time:.2f}x  "
+          f"{analyzed} with org references, {matched - analyzed} text-only matches dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes.steps import router as steps_router
 from app.api.routes.account_management import router as account_router
+from app.api.routes.metrics import router as metrics_router
+from app.services.aws_async import async_client_pool
+from app.services.executors import run_db
+from app.services.step_registry import seed_steps
+from app.services.step_jobs import start_job_heartbeat, stop_job_heartbeat
+from app.db.session import SessionLocal
+from sqlalchemy.exc import SQLAlchemyError
 
 app = FastAPI(title="AWS Migration API")
 
@@ -13,12 +20,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(steps_router, prefix="/api")
 app.include_router(account_router, prefix="/api")
+app.include_router(metrics_router, prefix="/api")
+# Last, so the /{phase_type}/{step_slug} dispatcher doesn't shadow the other routers
+app.include_router(steps_router, prefix="/api")
 
 @app.get("/")
 async def root():
     return {"message": "AWS Migration API is running"}
 
+@app.on_event("startup")
+async def seed_step_registry():
+    db = SessionLocal()
+    try:
+        await run_db(seed_steps, db)
+    except SQLAlchemyError as e:
+        print(f"Error seeding steps, retrying on the first execution: {str(e)}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_step_job_heartbeat():
+    start_job_heartbeat()
+
+@app.on_event("shutdown")
+async def close_async_aws_clients():
+    await async_client_pool.close()
+
+@app.on_event("shutdown")
+async def stop_step_job_heartbeat():
+    stop_job_heartbeat()
+
 
 #uvicorn main:app --port 8005 --reload --host 0.0.0.0
\ No newline at end of file
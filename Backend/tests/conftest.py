@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from app.db.PG import Base, Phase, Step, StepStatus
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Sessions on a fresh SQLite database with the app's tables. Postgres-only queries
+    (ON CONFLICT upserts, ROLLUP) are not run against it.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def step(db):
+    """A pending step in its own phase, with a second, completed step in the phase"""
+    phase = Phase(type="Assess Existing Env", title="Assess", status=StepStatus.PENDING)
+    db.add(phase)
+    db.commit()
+    db.add_all([
+        Step(id=101, phase_id=phase.id, title="Check", status=StepStatus.PENDING, automation_type="fully-automated"),
+        Step(id=102, phase_id=phase.id, title="Other", status=StepStatus.COMPLETED, automation_type="fully-automated")
+    ])
+    db.commit()
+    return db.get(Step, 101)
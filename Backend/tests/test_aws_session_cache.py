@@ -0,0 +1,125 @@
+import threading
+import time
+import pytest
+from app.services.aws_session_cache import AWSSessionCache, LRUTTLCache, credential_fingerprint
+
+
+def test_get_or_create_builds_once():
+    cache = LRUTTLCache(max_size=4, ttl_seconds=0)
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    first = cache.get_or_create("key", factory)
+    assert cache.get_or_create("key", factory) is first
+    assert len(built) == 1
+
+
+def test_concurrent_callers_of_one_key_share_a_build():
+    cache = LRUTTLCache(max_size=4, ttl_seconds=0)
+    release = threading.Event()
+    built = []
+
+    def factory():
+        built.append(1)
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("key", factory))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(built) == 1
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_builds_of_different_keys_do_not_wait_for_each_other():
+    cache = LRUTTLCache(max_size=4, ttl_seconds=0)
+    release = threading.Event()
+    slow = threading.Thread(target=lambda: cache.get_or_create("slow", lambda: release.wait(5)))
+    slow.start()
+    try:
+        time.sleep(0.05)
+        started = time.monotonic()
+        assert cache.get_or_create("fast", lambda: "value") == "value"
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+        slow.join(5)
+
+
+def test_failed_build_is_not_cached():
+    cache = LRUTTLCache(max_size=4, ttl_seconds=0)
+
+    def failing():
+        raise RuntimeError("no credentials")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("key", failing)
+    assert cache.get_or_create("key", lambda: "value") == "value"
+
+
+def test_value_built_during_removal_is_not_stored():
+    cache = LRUTTLCache(max_size=4, ttl_seconds=0)
+
+    def factory():
+        cache.remove_where(lambda key: key == "key")
+        return "stale"
+
+    assert cache.get_or_create("key", factory) == "stale"
+    assert cache.get("key") is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    expiring = LRUTTLCache(max_size=2, ttl_seconds=0.01)
+    expiring.put("a", 1)
+    time.sleep(0.02)
+    assert expiring.get("a") is None
+
+
+def test_invalidate_drops_only_the_account():
+    cache = AWSSessionCache(max_sessions=8, max_clients=8, ttl_seconds=0)
+    fingerprint = credential_fingerprint("AKIA", "secret")
+    cache.get_client("111111111111", fingerprint, "s3", "us-east-1", lambda: "client-1")
+    cache.get_client("222222222222", fingerprint, "s3", "us-east-1", lambda: "client-2")
+    generation = cache.generation("111111111111")
+
+    cache.invalidate("111111111111")
+
+    assert cache.get_client("111111111111", fingerprint, "s3", "us-east-1", lambda: "rebuilt") == "rebuilt"
+    assert cache.get_client("222222222222", fingerprint, "s3", "us-east-1", lambda: "rebuilt") == "client-2"
+    assert cache.generation("111111111111") != generation
+    assert cache.invalidations == 1
+
+
+def test_invalidate_everything():
+    cache = AWSSessionCache(max_sessions=8, max_clients=8, ttl_seconds=0)
+    cache.get_client("111111111111", "fp", "s3", "us-east-1", lambda: "client")
+    generation = cache.generation("222222222222")
+
+    cache.invalidate()
+
+    assert cache.clients.stats()["size"] == 0
+    assert cache.generation("222222222222") != generation
+
+
+def test_sessions_are_keyed_by_credentials():
+    cache = AWSSessionCache(max_sessions=8, max_clients=8, ttl_seconds=0)
+    session = cache.get_session("111111111111", "us-east-1", "AKIA", "secret")
+    assert cache.get_session("111111111111", "us-east-1", "AKIA", "secret") is session
+    assert cache.get_session("111111111111", "us-east-1", "AKIA", "rotated") is not session
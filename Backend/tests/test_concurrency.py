@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from app.services import concurrency
+from app.services.concurrency import async_fetch_all, fetch_all, iter_fetch, parse_limits
+
+
+class PeakCounter:
+    """Counts fetches in flight and remembers the highest count"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+
+@pytest.fixture
+def limited_service(monkeypatch):
+    """A service with 2 shared fetch slots"""
+    monkeypatch.setitem(concurrency._service_slots, "test-service", threading.BoundedSemaphore(2))
+    return "test-service"
+
+
+def test_parse_limits():
+    assert parse_limits("iam=4, s3=16,bad,") == {"iam": 4, "s3": 16}
+    assert parse_limits("") == {}
+
+
+def test_fetch_all_keeps_item_order_and_errors():
+    def fetch(item):
+        time.sleep(0.01 * (5 - item))
+        if item == 3:
+            raise ValueError("boom")
+        return item * 10
+
+    outcomes = fetch_all("test-order", fetch, range(5))
+
+    assert [item for item, _, _ in outcomes] == [0, 1, 2, 3, 4]
+    assert [result for _, result, _ in outcomes] == [0, 10, 20, None, 40]
+    assert isinstance(outcomes[3][2], ValueError)
+
+
+def test_slots_are_shared_by_concurrent_calls(limited_service):
+    counter = PeakCounter()
+
+    def fetch(item):
+        with counter:
+            time.sleep(0.02)
+        return item
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.extend(fetch_all(limited_service, fetch, range(6))))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(results) == 18
+    assert counter.peak == 2
+
+
+def test_results_are_yielded_before_the_last_fetch_is_submitted(limited_service):
+    submitted = []
+
+    def fetch(item):
+        submitted.append(item)
+        return item
+
+    first = next(iter_fetch(limited_service, fetch, range(20)))
+    assert first[3] is None
+    assert len(submitted) < 20
+
+
+def test_checkpoint_stops_the_iteration(limited_service):
+    fetched = []
+    calls = []
+
+    def checkpoint():
+        calls.append(1)
+        if len(calls) > 3:
+            raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        for _ in iter_fetch(limited_service, fetched.append, range(10), checkpoint=checkpoint):
+            pass
+    # Fetches already submitted finish on the pool
+    time.sleep(0.1)
+    assert len(fetched) == 3
+
+
+def test_slots_are_released_after_errors(limited_service):
+    def fetch(item):
+        raise RuntimeError(item)
+
+    assert all(error for _, _, error in fetch_all(limited_service, fetch, range(5)))
+    slots = concurrency.service_slots(limited_service)
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+    slots.release()
+    slots.release()
+
+
+def test_async_fetch_all_uses_the_shared_slots(limited_service):
+    counter = PeakCounter()
+    slots = concurrency.service_slots(limited_service)
+    # One slot held by a sync scan of the same service
+    slots.acquire()
+
+    async def fetch(item):
+        with counter:
+            await asyncio.sleep(0.01)
+        if item == 2:
+            raise ValueError("boom")
+        return item
+
+    try:
+        outcomes = asyncio.run(async_fetch_all(limited_service, fetch, range(5)))
+    finally:
+        slots.release()
+
+    assert counter.peak == 1
+    assert [result for _, result, _ in outcomes] == [0, 1, None, 3, 4]
+    assert isinstance(outcomes[2][2], ValueError)
+
+
+def test_context_follows_tasks_onto_the_pool():
+    variable = contextvars.ContextVar("variable", default=None)
+    variable.set("step")
+    with concurrency.ContextThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(variable.get).result() == "step"
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from app.db import PG_queries
+from app.services import cost_explorer
+from app.services.cost_explorer import get_daily_costs, get_linked_account_costs, month_windows, monthly_billing_periods
+
+
+def day(usage_date: date, amount: str, estimated: bool = False):
+    return {"usage_date": usage_date, "amount": Decimal(amount), "unit": "USD", "estimated": estimated}
+
+
+class FakeCostExplorer:
+    """Answers get_cost_and_usage with one DAILY result per day, two days per page"""
+
+    def __init__(self, amounts: dict, estimated_from: date = None):
+        self.amounts = amounts
+        self.estimated_from = estimated_from
+        self.requests = []
+
+    def get_cost_and_usage(self, **request):
+        self.requests.append(request)
+        start = date.fromisoformat(request.get("NextPageToken") or request["TimePeriod"]["Start"])
+        end = date.fromisoformat(request["TimePeriod"]["End"])
+        page_end = min(start + timedelta(days=2), end)
+        results = [
+            {
+                "TimePeriod": {"Start": (start + timedelta(days=offset)).isoformat()},
+                "Total": {"UnblendedCost": {"Amount": self.amounts[start + timedelta(days=offset)], "Unit": "USD"}},
+                "Estimated": self.estimated_from is not None and start + timedelta(days=offset) >= self.estimated_from
+            }
+            for offset in range((page_end - start).days)
+        ]
+        response = {"ResultsByTime": results}
+        if page_end < end:
+            response["NextPageToken"] = page_end.isoformat()
+        return response
+
+
+def test_monthly_billing_periods():
+    days = [
+        day(date(2026, 11, 29), "1.50"),
+        day(date(2026, 11, 30), "2.50"),
+        day(date(2026, 12, 31), "3.10"),
+        day(date(2027, 1, 1), "0.10", estimated=True),
+        day(date(2027, 1, 2), "0.20")
+    ]
+    assert monthly_billing_periods(days, end=date(2027, 1, 3)) == [
+        {"Period": "2026-11-29 to 2026-12-01", "Amount": "4", "Unit": "USD", "Estimated": "No"},
+        {"Period": "2026-12-31 to 2027-01-01", "Amount": "3.1", "Unit": "USD", "Estimated": "No"},
+        {"Period": "2027-01-01 to 2027-01-03", "Amount": "0.3", "Unit": "USD", "Estimated": "Yes"}
+    ]
+
+
+def test_monthly_billing_periods_without_days():
+    assert monthly_billing_periods([], end=date(2027, 1, 3)) == []
+
+
+def test_get_daily_costs_without_a_database_fetches_every_day():
+    start, end = date(2026, 10, 1), date(2026, 10, 6)
+    client = FakeCostExplorer({start + timedelta(days=offset): str(offset) for offset in range(5)})
+
+    days, stats = get_daily_costs(client, None, "111111111111", start, end)
+
+    assert [entry["amount"] for entry in days] == [Decimal(offset) for offset in range(5)]
+    assert stats == {"days_cached": 0, "days_fetched": 5, "cost_explorer_requests": 3}
+
+
+def test_get_daily_costs_fetches_from_the_first_missing_or_estimated_day(monkeypatch):
+    start, end = date(2026, 10, 1), date(2026, 10, 6)
+    cached = [
+        PG_queries.CostExplorerDaily(usage_date=date(2026, 10, 1), amount=Decimal("1"), unit="USD", estimated=False),
+        PG_queries.CostExplorerDaily(usage_date=date(2026, 10, 2), amount=Decimal("2"), unit="USD", estimated=False),
+        PG_queries.CostExplorerDaily(usage_date=date(2026, 10, 3), amount=Decimal("3"), unit="USD", estimated=True),
+        PG_queries.CostExplorerDaily(usage_date=date(2026, 10, 5), amount=Decimal("5"), unit="USD", estimated=False)
+    ]
+    stored = []
+    monkeypatch.setattr(cost_explorer.PG_queries, "get_cost_explorer_days", lambda db, account_key, start, end: cached)
+    monkeypatch.setattr(cost_explorer.PG_queries, "upsert_cost_explorer_days", lambda db, account_key, days: stored.extend(days))
+    client = FakeCostExplorer({date(2026, 10, 3): "3.5", date(2026, 10, 4): "4", date(2026, 10, 5): "5"})
+
+    days, stats = get_daily_costs(client, object(), "111111111111", start, end)
+
+    assert client.requests[0]["TimePeriod"] == {"Start": "2026-10-03", "End": "2026-10-06"}
+    assert [entry["amount"] for entry in days] == [Decimal("1"), Decimal("2"), Decimal("3.5"), Decimal("4"), Decimal("5")]
+    assert [entry["usage_date"] for entry in stored] == [date(2026, 10, 3), date(2026, 10, 4), date(2026, 10, 5)]
+    assert stats == {"days_cached": 3, "days_fetched": 3, "cost_explorer_requests": 2}
+
+
+def test_month_windows():
+    assert month_windows(date(2026, 11, 15), date(2027, 2, 10)) == [
+        (date(2026, 11, 15), date(2026, 12, 1)),
+        (date(2026, 12, 1), date(2027, 1, 1)),
+        (date(2027, 1, 1), date(2027, 2, 1)),
+        (date(2027, 2, 1), date(2027, 2, 10))
+    ]
+    assert month_windows(date(2026, 11, 1), date(2026, 12, 1)) == [(date(2026, 11, 1), date(2026, 12, 1))]
+    assert month_windows(date(2026, 11, 1), date(2026, 11, 1)) == []
+
+
+class FakeGroupedCostExplorer:
+    """Answers grouped MONTHLY queries with one page per (account, service) group"""
+
+    GROUPS = [
+        ("111111111111", "Amazon EC2", "10.5"),
+        ("111111111111", "Amazon S3", "1.25"),
+        ("222222222222", "AWS Lambda", "40")
+    ]
+
+    def get_cost_and_usage(self, **request):
+        page = int(request.get("NextPageToken", "0"))
+        account_id, service, amount = self.GROUPS[page]
+        response = {
+            "ResultsByTime": [{
+                "TimePeriod": request["TimePeriod"],
+                "Estimated": request["TimePeriod"]["End"] == "2026-12-10",
+                "Groups": [{"Keys": [account_id, service], "Metrics": {"UnblendedCost": {"Amount": amount, "Unit": "USD"}}}]
+            }],
+            "DimensionValueAttributes": [{"Value": account_id, "Attributes": {"description": f"account {account_id[0]}"}}]
+        }
+        if page + 1 < len(self.GROUPS):
+            response["NextPageToken"] = str(page + 1)
+        return response
+
+
+def test_get_linked_account_costs():
+    summaries, requests = get_linked_account_costs(FakeGroupedCostExplorer(), date(2026, 11, 20), date(2026, 12, 10))
+
+    assert requests == 6
+    assert [summary["Account_id"] for summary in summaries] == ["222222222222", "111111111111"]
+    first, second = summaries
+    assert first["Name"] == "account 2" and first["Total"] == "80" and first["Estimated"] == "Yes"
+    assert second["Months"] == [
+        {"Period": "2026-11-20 to 2026-12-01", "Amount": "11.75", "Estimated": "No"},
+        {"Period": "2026-12-01 to 2026-12-10", "Amount": "11.75", "Estimated": "Yes"}
+    ]
+    assert second["Top_services"] == [{"Service": "Amazon EC2", "Amount": "21"}, {"Service": "Amazon S3", "Amount": "2.5"}]
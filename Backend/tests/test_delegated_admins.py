@@ -0,0 +1,36 @@
+import boto3
+import pytest
+from moto import mock_aws
+from app.db.PG import StepStatus
+from app.services import aws_services
+from app.services.step_registry import execution_status
+
+
+@pytest.fixture
+def session(monkeypatch):
+    for name in ("AWS_ENDPOINT_URL", "AWS_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        session = boto3.Session(region_name="us-east-1")
+        monkeypatch.setattr(aws_services, "get_aws_session", lambda db, account_id: session)
+        yield session
+
+
+def test_account_outside_an_organization_is_a_failed_check(session):
+    result = aws_services.check_delegated_admins(refresh=True)
+
+    assert result["success"] is False
+    assert "AWSOrganizationsNotInUseException" in result["error"]
+    assert execution_status(result) == StepStatus.FAILED
+
+
+@pytest.mark.parametrize("result, status", [
+    ({"success": True}, StepStatus.COMPLETED),
+    ({"success": False}, StepStatus.FAILED),
+    ({"error": "AccessDenied"}, StepStatus.FAILED),
+    ({"message": "no success flag"}, StepStatus.COMPLETED)
+])
+def test_execution_status(result, status):
+    assert execution_status(result) == status
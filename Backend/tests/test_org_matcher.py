@@ -0,0 +1,71 @@
+import json
+import random
+import re
+import pytest
+from app.services.org_matcher import OrgReferenceMatcher
+from app.services.policy_scanners import ORG_PATTERNS
+
+
+def expected(patterns, document):
+    """What one re.search per pattern reports"""
+    return [pattern for pattern in patterns if re.search(pattern, document, re.IGNORECASE)]
+
+
+DOCUMENTS = [
+    '',
+    'nothing to see here',
+    # 'organizations' only occurs inside the longer arn:aws:organizations match
+    'arn:aws:organizations::123456789012:ou/o-abc/ou-xyz',
+    'arn:aws:iam::123456789012:role/aws-service-role/organizations.amazonaws.com/AWSServiceRoleForOrganizations',
+    '{"Condition": {"StringEquals": {"AWS:PRINCIPALORGID": "o-1234567890"}}}',
+    '{"Condition": {"ForAnyValue:StringLike": {"aws:PrincipalOrgPaths": ["o-a/r-b/ou-c/*"]}}}',
+    'my-org-bucket',
+    'ORG-',
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_find_matches_separate_searches(document):
+    matcher = OrgReferenceMatcher(ORG_PATTERNS)
+    assert matcher.find(document) == expected(ORG_PATTERNS, document)
+    assert matcher.matches(document) == bool(expected(ORG_PATTERNS, document))
+
+
+def test_find_matches_separate_searches_on_random_documents():
+    matcher = OrgReferenceMatcher(ORG_PATTERNS)
+    fragments = [
+        'arn:aws:', 'organizations', 'iam::', '42', ':role/aws-service-role/', 'org-', 'aws:Principal',
+        'OrgID', 'OrgPaths', '"', ' ', 'x', '/'
+    ]
+    generator = random.Random(7)
+    for _ in range(2000):
+        document = ''.join(generator.choice(fragments) for _ in range(generator.randint(1, 12)))
+        assert matcher.find(document) == expected(ORG_PATTERNS, document), document
+
+
+def test_parsed_documents_are_searched_by_keys_and_values():
+    matcher = OrgReferenceMatcher(ORG_PATTERNS)
+    policy = {
+        "Statement": [{
+            "Effect": "Allow",
+            "Principal": "*",
+            "Action": "s3:GetObject",
+            "Condition": {"StringEquals": {"aws:PrincipalOrgID": "o-1234567890"}}
+        }]
+    }
+    assert matcher.find(policy) == ['aws:PrincipalOrgID']
+    assert matcher.find(json.dumps(policy)) == ['aws:PrincipalOrgID']
+
+
+def test_patterns_with_their_own_groups():
+    patterns = [r'(ab)+c', r'b(c|d)', r'x']
+    matcher = OrgReferenceMatcher(patterns)
+    for document in ['ababc', 'abd', 'zzx', 'bc', 'nothing']:
+        assert matcher.find(document) == expected(patterns, document), document
+
+
+def test_patterns_starting_with_a_regex_construct():
+    patterns = [r'[0-9]+-org', r'org']
+    matcher = OrgReferenceMatcher(patterns)
+    assert matcher.find('account 42-org') == patterns
+    assert matcher.find('organization') == ['org']
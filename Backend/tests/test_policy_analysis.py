@@ -0,0 +1,115 @@
+import json
+import pytest
+from app.services.policy_analysis import (
+    ORG_REFERENCE, ORGANIZATIONS_DEPENDENCY, PolicyIndex, analyze_org_references, reference_labels
+)
+
+POLICY = {
+    "Version": "2012-10-17",
+    "Statement": [
+        {
+            "Sid": "OrgRead",
+            "Effect": "Allow",
+            "Principal": "*",
+            "Action": ["s3:GetObject", "s3:ListBucket"],
+            "Resource": "*",
+            "Condition": {
+                "StringEquals": {"AWS:PRINCIPALORGID": "o-1234567890"},
+                "ForAnyValue:StringLike": {"aws:PrincipalOrgPaths": ["o-1234567890/r-ab12/ou-ab12-11111111/*"]}
+            }
+        },
+        {
+            "Sid": "OrgService",
+            "Effect": "Allow",
+            "Principal": {"Service": ["organizations.amazonaws.com", "lambda.amazonaws.com"]},
+            "Action": ["Organizations:DescribeOrganization", "sts:AssumeRole"],
+            "Resource": "arn:aws:organizations::123456789012:ou/o-1234567890/ou-ab12-11111111"
+        },
+        {
+            "Sid": "DenyOutsideOrg",
+            "Effect": "Deny",
+            "NotPrincipal": {"AWS": "arn:aws:iam::123456789012:role/aws-service-role/organizations.amazonaws.com/AWSServiceRoleForOrganizations"},
+            "NotAction": "organizations:LeaveOrganization",
+            "Resource": "*",
+            "Condition": {"StringNotEquals": {"aws:PrincipalOrgID": "o-1234567890"}}
+        }
+    ]
+}
+
+
+def references_by_kind(references):
+    grouped = {}
+    for reference in references:
+        grouped.setdefault(reference["kind"], []).append(reference)
+    return grouped
+
+
+def test_condition_references_keep_operator_values_and_statement():
+    conditions = references_by_kind(analyze_org_references(POLICY))["condition"]
+    assert [(reference["key"], reference["operator"], reference["sid"], reference["effect"]) for reference in conditions] == [
+        ("aws:PrincipalOrgID", "StringEquals", "OrgRead", "Allow"),
+        ("aws:PrincipalOrgPaths", "ForAnyValue:StringLike", "OrgRead", "Allow"),
+        ("aws:PrincipalOrgID", "StringNotEquals", "DenyOutsideOrg", "Deny")
+    ]
+    assert conditions[1]["values"] == ["o-1234567890/r-ab12/ou-ab12-11111111/*"]
+
+
+def test_arn_and_dependency_references():
+    grouped = references_by_kind(analyze_org_references(json.dumps(POLICY)))
+
+    [arn] = grouped["organizations_arn"]
+    assert arn["location"] == "Resource" and arn["sid"] == "OrgService"
+    [role] = grouped["organizations_service_role"]
+    assert role["location"] == "NotPrincipal"
+    [principal] = grouped["organizations_service_principal"]
+    assert principal["location"] == "Principal" and principal["values"] == ["organizations.amazonaws.com"]
+    actions = grouped["organizations_action"]
+    assert [(reference["location"], reference["values"]) for reference in actions] == [
+        ("Action", ["Organizations:DescribeOrganization"]),
+        ("NotAction", ["organizations:LeaveOrganization"])
+    ]
+
+
+def test_every_reference_has_a_category():
+    for reference in analyze_org_references(POLICY):
+        expected = ORGANIZATIONS_DEPENDENCY if reference["kind"] in ("organizations_service_principal", "organizations_action") else ORG_REFERENCE
+        assert reference["category"] == expected
+
+
+def test_reference_labels_are_distinct_and_ordered():
+    assert reference_labels(analyze_org_references(POLICY)) == [
+        "aws:PrincipalOrgID",
+        "aws:PrincipalOrgPaths",
+        "organizations.amazonaws.com",
+        "arn:aws:organizations",
+        "organizations actions",
+        "aws-service-role/organizations"
+    ]
+
+
+def test_documents_without_org_references():
+    assert analyze_org_references(None) == []
+    assert analyze_org_references('{"Statement": []}') == []
+    # Rejected by the "org" prefilter without being parsed
+    assert analyze_org_references('not json') == []
+    assert analyze_org_references({"Statement": {"Effect": "Allow", "Action": "s3:*", "Resource": "*"}}) == []
+
+
+@pytest.mark.parametrize("document", ['{"org": ', '["org"]', '{"Statement": ["org"]}'])
+def test_invalid_policies_raise_value_error(document):
+    with pytest.raises(ValueError):
+        analyze_org_references(document)
+
+
+def test_query_api():
+    index = PolicyIndex.parse(POLICY)
+
+    assert index.condition_values("aws:principalorgid") == ["o-1234567890", "o-1234567890"]
+    assert [statement["sid"] for statement in index.statements_with_condition("aws:PrincipalOrgID")] == ["OrgRead", "DenyOutsideOrg"]
+    assert [(statement["sid"], operator) for statement, operator, _, _ in index.conditions("aws:PrincipalOrgID")] == [
+        ("OrgRead", "StringEquals"), ("DenyOutsideOrg", "StringNotEquals")
+    ]
+    assert [value for _, _, value in index.principals("Service")] == ["organizations.amazonaws.com", "lambda.amazonaws.com"]
+    assert [(kind, value) for _, kind, value in index.principals()][0] == ("*", "*")
+    assert [action for _, action in index.actions("organizations")] == ["Organizations:DescribeOrganization"]
+    assert len(index.actions()) == 4
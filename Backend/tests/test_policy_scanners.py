@@ -0,0 +1,197 @@
+import json
+import boto3
+import pytest
+from moto import mock_aws
+from app.services.policy_scanners import (
+    FINDING_FORMAT, _record, content_fingerprint, scan_iam_authorization_details, scan_resources, scan_s3_policies
+)
+
+ORG_POLICY = {
+    "Version": "2012-10-17",
+    "Statement": [{
+        "Sid": "OrgOnly",
+        "Effect": "Allow",
+        "Principal": "*",
+        "Action": "s3:GetObject",
+        "Resource": "arn:aws:s3:::shared/*",
+        "Condition": {"StringEquals": {"aws:PrincipalOrgID": "o-1234567890"}}
+    }]
+}
+
+PLAIN_POLICY = {
+    "Version": "2012-10-17",
+    "Statement": [{"Effect": "Allow", "Principal": {"AWS": "arn:aws:iam::123456789012:root"}, "Action": "s3:GetObject", "Resource": "*"}]
+}
+
+
+def new_partial(previous=None, events=None):
+    partial = {"findings": [], "checked": 0, "details": {}, "previous": previous or {}, "fingerprints": []}
+    if events is not None:
+        partial["emit"] = events.append
+    return partial
+
+
+def stored(partial):
+    """The fingerprints of a scan, as the next scan receives them in partial["previous"]"""
+    return {entry["resource_arn"]: entry for entry in partial["fingerprints"]}
+
+
+def test_record_reuses_the_stored_finding_for_an_unchanged_fingerprint():
+    previous = {"arn:a": {"fingerprint": f"{FINDING_FORMAT}:sha256:1", "result": {"Name": "a"}}}
+    partial = new_partial(previous)
+
+    def match():
+        raise AssertionError("unchanged resource matched again")
+
+    assert _record(partial, "arn:a", "sha256:1", match) == {"Name": "a"}
+    assert partial["details"] == {"skipped": 1}
+    assert partial["fingerprints"] == [{"resource_arn": "arn:a", "fingerprint": f"{FINDING_FORMAT}:sha256:1", "result": {"Name": "a"}}]
+
+
+def test_record_matches_changed_and_older_format_fingerprints():
+    previous = {
+        "arn:a": {"fingerprint": f"{FINDING_FORMAT}:sha256:1", "result": None},
+        "arn:b": {"fingerprint": "v0:sha256:2", "result": None}
+    }
+    partial = new_partial(previous)
+
+    assert _record(partial, "arn:a", "sha256:changed", lambda: {"Name": "a"}) == {"Name": "a"}
+    assert _record(partial, "arn:b", "sha256:2", lambda: {"Name": "b"}) == {"Name": "b"}
+    assert _record(partial, "arn:new", "sha256:3", lambda: None) is None
+    assert partial["details"] == {"rescanned": 3}
+
+
+def test_content_fingerprint_ignores_key_order():
+    assert content_fingerprint({"a": 1, "b": 2}) == content_fingerprint({"b": 2, "a": 1})
+    assert content_fingerprint(None) == "none"
+    assert content_fingerprint("{}") != content_fingerprint("{ }")
+
+
+def scan(partial, resources, documents, fetched):
+    def fetch(resource):
+        fetched.append(resource["Name"])
+        return documents[resource["Name"]]
+
+    scan_resources(
+        "test", partial, resources,
+        resource_key=lambda resource: f"arn:test:{resource['Name']}",
+        fetch=fetch,
+        build_finding=lambda resource, labels: {"Name": resource["Name"], "References": labels},
+        list_token=lambda resource: resource.get("Version")
+    )
+
+
+def test_scan_resources_skips_resources_whose_list_token_did_not_change():
+    resources = [{"Name": "org", "Version": "1"}, {"Name": "plain", "Version": "1"}, {"Name": "untokened"}]
+    documents = {"org": json.dumps(ORG_POLICY), "plain": json.dumps(PLAIN_POLICY), "untokened": None}
+
+    first, fetched = new_partial(), []
+    scan(first, resources, documents, fetched)
+    assert sorted(fetched) == ["org", "plain", "untokened"]
+    assert [finding["Name"] for finding in first["findings"]] == ["org"]
+    assert first["details"]["no_policy"] == 1
+
+    second, fetched = new_partial(stored(first)), []
+    resources[1]["Version"] = "2"
+    scan(second, resources, documents, fetched)
+    # Unchanged list token: not fetched; no list token: fetched, its unchanged content is not matched again
+    assert sorted(fetched) == ["plain", "untokened"]
+    assert second["findings"] == first["findings"]
+    assert second["details"]["skipped"] == 2 and second["details"]["rescanned"] == 1
+
+
+def test_scan_resources_reports_unreadable_resources_without_a_fingerprint():
+    def fetch(resource):
+        raise PermissionError("denied")
+
+    partial = new_partial()
+    scan_resources(
+        "test", partial, [{"Name": "secret"}],
+        resource_key=lambda resource: resource["Name"],
+        fetch=fetch,
+        build_finding=lambda resource, labels: {"Name": resource["Name"]}
+    )
+    assert partial["details"]["unscanned"] == [{"resource": "secret", "reason": "PermissionError"}]
+    assert partial["fingerprints"] == []
+
+
+def test_scan_resources_emits_findings_and_progress():
+    events = []
+    partial = new_partial(events=events)
+    scan(partial, [{"Name": "org"}], {"org": json.dumps(ORG_POLICY)}, [])
+    types = [event["type"] for event in events]
+    assert types[0] == "progress"
+    assert "checkpoint" in types
+    assert [event["finding"]["Name"] for event in events if event["type"] == "finding"] == ["org"]
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    for name in ("AWS_ENDPOINT_URL", "AWS_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        yield boto3.Session(region_name="us-east-1")
+
+
+def test_scan_s3_policies(aws):
+    s3 = aws.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="org-shared")
+    s3.put_bucket_policy(Bucket="org-shared", Policy=json.dumps({
+        **ORG_POLICY,
+        "Statement": [{**ORG_POLICY["Statement"][0], "Resource": "arn:aws:s3:::org-shared/*"}]
+    }))
+    s3.create_bucket(Bucket="plain")
+    s3.put_bucket_policy(Bucket="plain", Policy=json.dumps({
+        **PLAIN_POLICY,
+        "Statement": [{**PLAIN_POLICY["Statement"][0], "Resource": "arn:aws:s3:::plain/*"}]
+    }))
+    s3.create_bucket(Bucket="no-policy")
+
+    partial = new_partial()
+    scan_s3_policies(aws, partial)
+
+    assert partial["checked"] == 3
+    assert partial["details"]["no_policy"] == 1
+    [finding] = partial["findings"]
+    assert finding["Bucket"] == "org-shared" and finding["Region"] == "us-east-1"
+    assert finding["References"] == ["aws:PrincipalOrgID"]
+    [reference] = finding["Org_references"]
+    assert reference["values"] == ["o-1234567890"] and reference["sid"] == "OrgOnly"
+
+    rescan = new_partial(stored(partial))
+    scan_s3_policies(aws, rescan)
+    assert rescan["findings"] == partial["findings"]
+    assert rescan["details"]["skipped"] == 3
+
+
+def test_scan_iam_authorization_details(aws):
+    iam = aws.client("iam")
+    iam.create_role(RoleName="plain", AssumeRolePolicyDocument=json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [{"Effect": "Allow", "Principal": {"Service": "lambda.amazonaws.com"}, "Action": "sts:AssumeRole"}]
+    }))
+    iam.put_role_policy(RoleName="plain", PolicyName="org-read", PolicyDocument=json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [{"Effect": "Allow", "Action": "organizations:DescribeOrganization", "Resource": "*"}]
+    }))
+    iam.create_policy(PolicyName="org-only", PolicyDocument=json.dumps({
+        "Version": "2012-10-17",
+        "Statement": [{
+            "Effect": "Allow", "Action": "s3:GetObject", "Resource": "*",
+            "Condition": {"StringEquals": {"aws:PrincipalOrgID": "o-1234567890"}}
+        }]
+    }))
+
+    partial = new_partial()
+    scan_iam_authorization_details(aws, partial)
+
+    findings = {finding["Type"]: finding for finding in partial["findings"]}
+    assert set(findings) == {"Customer Managed", "Inline (Role)"}
+    assert findings["Customer Managed"]["Name"] == "org-only"
+    assert findings["Customer Managed"]["References"] == ["aws:PrincipalOrgID"]
+    inline = findings["Inline (Role)"]
+    assert inline["Name"] == "plain/org-read"
+    assert "Org_references" in inline and inline["Org_references"] == []
+    assert [reference["kind"] for reference in inline["Organizations_dependencies"]] == ["organizations_action"]
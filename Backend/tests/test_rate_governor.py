@@ -0,0 +1,101 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from botocore.hooks import HierarchicalEmitter
+from app.services.concurrency import ContextThreadPoolExecutor
+from app.services.rate_governor import RateGovernor, TokenBucket
+
+
+class FakeHttpResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def client():
+    """Stands in for an SQS client: only its event hooks are used"""
+    return SimpleNamespace(meta=SimpleNamespace(
+        events=HierarchicalEmitter(),
+        service_model=SimpleNamespace(service_name="sqs"),
+        region_name="eu-west-1"
+    ))
+
+
+def send(client, error_code: str = None, status_code: int = 200):
+    """Run the governor's hooks for one request and its response, without sending it"""
+    client.meta.events.emit("before-send.sqs.ListQueues", request=None)
+    parsed = {"Error": {"Code": error_code}} if error_code else {}
+    client.meta.events.emit(
+        "needs-retry.sqs.ListQueues", response=(FakeHttpResponse(status_code), parsed), attempts=1, caught_exception=None
+    )
+
+
+def test_bucket_halves_its_rate_on_throttling_and_recovers():
+    bucket = TokenBucket(10.0)
+    bucket.on_throttle()
+    bucket.on_throttle()
+    assert bucket.rate == 2.5 and bucket.tokens <= 0
+    for _ in range(50):
+        bucket.on_success()
+    assert bucket.rate == 10.0
+
+
+def test_bucket_queues_reservations_once_empty():
+    bucket = TokenBucket(10.0)
+    waits = [bucket.reserve() for _ in range(12)]
+    assert waits[:10] == [0.0] * 10
+    assert 0 < waits[10] < waits[11] <= 0.2
+    assert bucket.stats()["requests"] == 12
+
+
+def test_throttled_responses_slow_the_bucket_down(client):
+    governor = RateGovernor()
+    governor.attach(client, "111111111111")
+    bucket = governor.bucket("111111111111", "sqs", "eu-west-1")
+
+    send(client, "ThrottlingException", 400)
+    send(client, "SlowDown", 503)
+    send(client, status_code=429)
+    assert bucket.throttled == 3
+    # Conflicts and quotas are not throttling
+    send(client, "LimitExceededException", 400)
+    send(client, "TransactionInProgressException", 400)
+    assert bucket.throttled == 3
+    assert bucket.requests == 5
+
+
+def test_trackers_count_only_their_own_requests(client):
+    governor = RateGovernor()
+    governor.attach(client, "111111111111")
+
+    with governor.track() as outer:
+        send(client)
+        with governor.track() as inner:
+            send(client, "Throttling", 400)
+        send(client)
+    send(client)
+
+    assert outer.report() == {"requests": 3, "throttled": 1, "throttled_by_service": {"sqs (eu-west-1)": 1}}
+    assert inner.report() == {"requests": 1, "throttled": 1, "throttled_by_service": {"sqs (eu-west-1)": 1}}
+
+
+def test_concurrent_runs_and_their_pools_are_tracked_apart(client):
+    governor = RateGovernor()
+    governor.attach(client, "111111111111")
+    pool = ContextThreadPoolExecutor(max_workers=4)
+    reports = {}
+
+    def run(name: str, requests: int):
+        with governor.track() as tracker:
+            for future in [pool.submit(send, client) for _ in range(requests)]:
+                future.result()
+        reports[name] = tracker.report()["requests"]
+
+    threads = [threading.Thread(target=run, args=(name, requests)) for name, requests in (("a", 5), ("b", 12))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    pool.shutdown()
+
+    assert reports == {"a": 5, "b": 12}
@@ -0,0 +1,168 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Query, Session
+from app.db import PG_queries
+from app.services.savings_plans import _aggregate_in_memory, aggregate_utilization, get_utilization_series
+
+PLAN_A = "arn:aws:savingsplans::111111111111:savingsplan/aaaa"
+PLAN_B = "arn:aws:savingsplans::111111111111:savingsplan/bbbb"
+
+
+def entry(plan: str, usage_date: date, utilization: str, total: str = "10", net_savings: str = "1"):
+    total = Decimal(total)
+    used = total * Decimal(utilization) / 100
+    return {
+        "savings_plan_arn": plan,
+        "usage_date": usage_date,
+        "total_commitment": total,
+        "used_commitment": used,
+        "unused_commitment": total - used,
+        "utilization_percentage": Decimal(utilization),
+        "net_savings": Decimal(net_savings)
+    }
+
+
+SERIES = [
+    entry(PLAN_A, date(2026, 10, 1), "50"),
+    entry(PLAN_A, date(2026, 10, 2), "80"),
+    entry(PLAN_A, date(2026, 10, 3), "100"),
+    entry(PLAN_B, date(2026, 10, 1), "100", total="30", net_savings="4"),
+    entry(PLAN_B, date(2026, 10, 2), "90", total="30", net_savings="3")
+]
+
+
+def test_in_memory_aggregation_matches_the_rollup_query():
+    rows = {row["savings_plan_arn"]: row for row in _aggregate_in_memory(SERIES)}
+
+    # Values Postgres returns for avg() and percentile_cont(0.1) WITHIN GROUP over the same days
+    plan_a = rows[PLAN_A]
+    assert plan_a["days"] == 3
+    assert plan_a["mean_utilization"] == Decimal(230) / 3
+    assert plan_a["p10_utilization"] == Decimal("56")
+    assert plan_a["used_commitment"] == Decimal("23") and plan_a["total_commitment"] == Decimal("30")
+    assert rows[PLAN_B]["p10_utilization"] == Decimal("91")
+
+    # The ROLLUP row covers every day of every plan
+    overall = rows[None]
+    assert overall["days"] == 5
+    assert overall["mean_utilization"] == Decimal("84")
+    assert overall["p10_utilization"] == Decimal("62")
+    assert overall["unused_commitment"] == Decimal("10")
+    assert overall["net_savings"] == Decimal("10")
+
+
+def test_single_day_percentile():
+    [plan, overall] = sorted(_aggregate_in_memory(SERIES[:1]), key=lambda row: row["savings_plan_arn"] is None)
+    assert plan["p10_utilization"] == overall["p10_utilization"] == Decimal("50")
+
+
+class CapturingQuery(Query):
+    """Returns the statement instead of running it"""
+
+    def all(self):
+        return self.statement
+
+
+def test_aggregate_query_groups_by_rollup():
+    statement = PG_queries.aggregate_savings_plan_utilization(
+        Session(query_cls=CapturingQuery), "111111111111", date(2026, 10, 1), date(2026, 10, 31)
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "GROUP BY ROLLUP(savings_plan_utilization_daily.savings_plan_arn)" in sql
+    assert "percentile_cont(%(percentile_cont_1)s) WITHIN GROUP (ORDER BY savings_plan_utilization_daily.utilization_percentage)" in sql
+
+
+class FailingSession:
+    rolled_back = False
+
+    def query(self, *entities):
+        raise OperationalError("SELECT", {}, Exception("database unavailable"))
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_aggregate_utilization_falls_back_to_memory():
+    db = FailingSession()
+    summary = aggregate_utilization(db, "111111111111", date(2026, 10, 1), date(2026, 10, 4), SERIES)
+
+    assert db.rolled_back
+    assert [plan["Id"] for plan in summary["Plans"]] == ["aaaa", "bbbb"]
+    assert summary["Plans"][0] == {
+        "Id": "aaaa",
+        "Days": 3,
+        "Mean_utilization": "76.67",
+        "P10_utilization": "56.00",
+        "Utilization": "76.67",
+        "Unused_commitment": "7.00",
+        "Net_savings": "3.00"
+    }
+    assert summary["All_plans"]["Utilization"] == "88.89"
+    assert aggregate_utilization(None, "111111111111", date(2026, 10, 1), date(2026, 10, 4), [])["All_plans"] == {}
+
+
+class FakeSavingsPlansCostExplorer:
+    def __init__(self, series: list):
+        self.series = series
+        self.days = []
+
+    def get_savings_plans_utilization_details(self, **request):
+        day = date.fromisoformat(request["TimePeriod"]["Start"])
+        self.days.append(day)
+        entries = [item for item in self.series if item["usage_date"] == day]
+        # One plan per page
+        page = int(request.get("NextToken", "0"))
+        response = {"SavingsPlansUtilizationDetails": [
+            {
+                "SavingsPlanArn": item["savings_plan_arn"],
+                "Utilization": {
+                    "TotalCommitment": str(item["total_commitment"]),
+                    "UsedCommitment": str(item["used_commitment"]),
+                    "UnusedCommitment": str(item["unused_commitment"]),
+                    "UtilizationPercentage": str(item["utilization_percentage"])
+                },
+                "Savings": {"NetSavings": str(item["net_savings"])}
+            }
+            for item in entries[page:page + 1]
+        ]}
+        if page + 1 < len(entries):
+            response["NextToken"] = str(page + 1)
+        return response
+
+
+def test_get_utilization_series_without_a_database():
+    client = FakeSavingsPlansCostExplorer(SERIES)
+    start = date(2026, 9, 30)
+
+    series, stats = get_utilization_series(client, None, "111111111111", start, start + timedelta(days=4))
+
+    assert sorted(set(client.days)) == [start + timedelta(days=offset) for offset in range(4)]
+    assert series == sorted(SERIES, key=lambda item: (item["usage_date"], item["savings_plan_arn"]))
+    assert stats == {"days_cached": 0, "days_fetched": 4}
+
+
+def test_get_utilization_series_refetches_only_missing_and_recent_days(monkeypatch):
+    start, end = date(2026, 10, 1), date(2026, 10, 8)
+    cached = [
+        PG_queries.SavingsPlanUtilizationDaily(**entry(PLAN_A, start + timedelta(days=offset), "75"))
+        for offset in (0, 2, 5)
+    ] + [PG_queries.SavingsPlanUtilizationDaily(**{
+        **entry(PLAN_A, date(2026, 10, 2), "0"), "savings_plan_arn": PG_queries.SAVINGS_PLAN_EMPTY_DAY
+    })]
+    stored = []
+    monkeypatch.setattr(PG_queries, "get_savings_plan_utilization_days", lambda db, account_key, start, end: cached)
+    monkeypatch.setattr(PG_queries, "upsert_savings_plan_utilization_days", lambda db, account_key, days: stored.extend(days))
+    client = FakeSavingsPlansCostExplorer([entry(PLAN_A, date(2026, 10, 6), "60")])
+
+    series, stats = get_utilization_series(client, object(), "111111111111", start, end)
+
+    # Oct 4 is missing, Oct 5-7 are recent enough to be revised
+    assert sorted(set(client.days)) == [date(2026, 10, 4), date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 7)]
+    assert stats == {"days_cached": 3, "days_fetched": 4}
+    assert [(item["usage_date"].day, item["utilization_percentage"]) for item in series] == [(1, 75), (3, 75), (6, 60)]
+    # Days without utilization are stored as marker rows
+    assert sorted((item["usage_date"].day, item["savings_plan_arn"] == PG_queries.SAVINGS_PLAN_EMPTY_DAY) for item in stored) == [
+        (4, True), (5, True), (6, False), (7, True)
+    ]
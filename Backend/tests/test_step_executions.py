@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from app.db import PG_queries
+from app.db.PG import Phase, Step, StepExecution, StepStatus
+from app.db.schemas import StepExecutionCreate
+
+
+def execution(db, step_id: int, status: str, created_at: datetime = None):
+    row = PG_queries.create_step_execution(db, StepExecutionCreate(step_id=step_id, status=status, result_data={}, logs=[]))
+    if created_at:
+        row.created_at = created_at
+        db.commit()
+    return row
+
+
+def test_update_running_step_execution_only_updates_in_progress_rows(db, step):
+    running = execution(db, step.id, StepStatus.IN_PROGRESS)
+
+    assert PG_queries.update_running_step_execution(db, running.id, StepStatus.COMPLETED, result_data={"success": True})
+    # A finished execution is never overwritten, e.g. by a late partial result
+    assert not PG_queries.update_running_step_execution(db, running.id, StepStatus.IN_PROGRESS, result_data={"partial": True})
+
+    db.refresh(running)
+    assert running.status == StepStatus.COMPLETED and running.result_data == {"success": True}
+    db.refresh(step)
+    assert step.status == StepStatus.COMPLETED and step.completed_at is not None
+    assert db.get(Phase, step.phase_id).status == StepStatus.COMPLETED
+
+
+def test_cancelling_restores_the_previous_step_status(db, step):
+    execution(db, step.id, StepStatus.FAILED, created_at=datetime.now() - timedelta(hours=1))
+    running = execution(db, step.id, StepStatus.IN_PROGRESS)
+    db.refresh(step)
+    assert step.status == StepStatus.IN_PROGRESS
+
+    assert PG_queries.update_running_step_execution(db, running.id, StepStatus.CANCELLED, logs=["Cancelled by request"])
+
+    db.refresh(step)
+    assert step.status == StepStatus.FAILED
+    assert db.get(Phase, step.phase_id).status == StepStatus.FAILED
+    assert PG_queries.get_latest_step_execution(db, step.id).status == StepStatus.FAILED
+
+
+def test_cancelling_the_only_execution_leaves_the_step_pending(db, step):
+    running = execution(db, step.id, StepStatus.IN_PROGRESS)
+    PG_queries.update_running_step_execution(db, running.id, StepStatus.CANCELLED)
+
+    db.refresh(step)
+    assert step.status == StepStatus.PENDING
+    assert PG_queries.get_latest_step_execution(db, step.id) is None
+
+
+def test_cancelling_keeps_the_step_in_progress_while_another_execution_runs(db, step):
+    first = execution(db, step.id, StepStatus.IN_PROGRESS)
+    execution(db, step.id, StepStatus.IN_PROGRESS)
+    PG_queries.update_running_step_execution(db, first.id, StepStatus.CANCELLED)
+
+    db.refresh(step)
+    assert step.status == StepStatus.IN_PROGRESS
+
+
+def test_stale_executions_are_failed_and_fresh_ones_kept(db, step):
+    stale = execution(db, step.id, StepStatus.IN_PROGRESS)
+    fresh = execution(db, step.id, StepStatus.IN_PROGRESS)
+    an_hour_ago = datetime.now() - timedelta(hours=1)
+    db.query(StepExecution).filter(StepExecution.id.in_([stale.id, fresh.id])).update(
+        {StepExecution.created_at: an_hour_ago, StepExecution.updated_at: an_hour_ago}, synchronize_session=False
+    )
+    db.commit()
+
+    # The heartbeat of the process running fresh
+    assert PG_queries.touch_step_executions(db, [fresh.id]) == 1
+    assert PG_queries.fail_interrupted_step_executions(db, datetime.now() - timedelta(seconds=30)) == 1
+
+    db.refresh(stale)
+    db.refresh(fresh)
+    assert stale.status == StepStatus.FAILED and stale.logs == ["Interrupted: the API process running the job stopped"]
+    assert fresh.status == StepStatus.IN_PROGRESS
+    db.refresh(step)
+    assert step.status == StepStatus.FAILED
+
+
+def test_touch_ignores_finished_executions(db, step):
+    done = execution(db, step.id, StepStatus.COMPLETED)
+    assert PG_queries.touch_step_executions(db, [done.id]) == 0
+    assert PG_queries.touch_step_executions(db, []) == 0
+
+
+def test_phase_status_follows_its_steps(db, step):
+    other = db.get(Step, 102)
+    PG_queries.update_step_status(db, step.id, StepStatus.IN_PROGRESS)
+    assert db.get(Phase, step.phase_id).status == StepStatus.IN_PROGRESS
+    PG_queries.update_step_status(db, step.id, StepStatus.COMPLETED)
+    phase = db.get(Phase, step.phase_id)
+    assert other.status == StepStatus.COMPLETED
+    assert phase.status == StepStatus.COMPLETED and phase.progress == 100
@@ -0,0 +1,176 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app.db import PG_queries
+from app.db.PG import StepExecution, StepStatus
+from app.services import step_jobs
+from app.services.executors import InstrumentedExecutor
+from app.services.step_jobs import StepJobNotCancellable, cancel_step_job, job_state, submit_step_job
+
+
+@pytest.fixture
+def jobs(session_factory, monkeypatch):
+    """step_jobs on the test database, with a one-worker job executor of its own"""
+    executor = InstrumentedExecutor("test-step-jobs", 1)
+    monkeypatch.setattr(step_jobs, "SessionLocal", session_factory)
+    monkeypatch.setattr(step_jobs, "job_executor", executor)
+    yield step_jobs
+    executor.shutdown(wait=True)
+
+
+def registered(step, events=True):
+    return {"id": step.id, "log": "Checking...", "events": events}
+
+
+def finished(db, execution_id: int):
+    db.expire_all()
+    return db.get(StepExecution, execution_id)
+
+
+class BlockingCheck:
+    """
+    A check that waits until released. With events it emits one before waiting and,
+    unless next_event is False, another one after
+    """
+
+    def __init__(self, events=True, next_event=True):
+        self.events = events
+        self.next_event = next_event
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = {"success": True, "message": "done"}
+
+    def __call__(self, db, on_event):
+        if self.events:
+            on_event({"type": "progress", "service": "s3", "listed": 1, "done": 0})
+        self.started.set()
+        self.release.wait(5)
+        if self.events and self.next_event:
+            on_event({"type": "checkpoint"})
+        return self.result
+
+
+def test_job_records_its_result(jobs, db, step):
+    check = BlockingCheck()
+    execution = submit_step_job(db, registered(step), check)
+    assert check.started.wait(5)
+    assert job_state(execution.id) == "running"
+    assert finished(db, execution.id).result_data["partial"] is True
+
+    check.release.set()
+    jobs.job_executor.shutdown(wait=True)
+
+    row = finished(db, execution.id)
+    assert row.status == StepStatus.COMPLETED and row.result_data == {"success": True, "message": "done"}
+    assert row.logs[-2:] == ["Checking...", "Analysis complete: done"]
+    assert job_state(execution.id) is None
+    db.refresh(step)
+    assert step.status == StepStatus.COMPLETED
+
+
+def test_failing_and_erroring_checks_are_recorded_failed(jobs, db, step):
+    def raising(db, on_event):
+        raise RuntimeError("boom")
+
+    errored = submit_step_job(db, registered(step), lambda db, on_event: {"error": "AccessDenied"})
+    raised = submit_step_job(db, registered(step), raising)
+    jobs.job_executor.shutdown(wait=True)
+
+    assert finished(db, errored.id).status == StepStatus.FAILED
+    row = finished(db, raised.id)
+    assert row.status == StepStatus.FAILED and row.result_data["error"] == "boom"
+
+
+def test_cancel_stops_a_running_check_at_its_next_event(jobs, db, step):
+    PG_queries.update_step_status(db, step.id, StepStatus.COMPLETED)
+    check = BlockingCheck()
+    execution = submit_step_job(db, registered(step), check)
+    assert check.started.wait(5)
+
+    assert cancel_step_job(db, execution.id) is True
+    assert job_state(execution.id) == "cancelling"
+    check.release.set()
+    jobs.job_executor.shutdown(wait=True)
+
+    row = finished(db, execution.id)
+    assert row.status == StepStatus.CANCELLED and row.logs == ["Cancelled by request"]
+    db.refresh(step)
+    # No earlier finished execution: back to pending
+    assert step.status == StepStatus.PENDING
+
+
+def test_cancel_of_a_queued_job(jobs, db, step):
+    check = BlockingCheck()
+    running = submit_step_job(db, registered(step), check)
+    assert check.started.wait(5)
+    queued = submit_step_job(db, registered(step), BlockingCheck())
+    assert job_state(queued.id) == "queued"
+
+    assert cancel_step_job(db, queued.id)
+    check.release.set()
+    jobs.job_executor.shutdown(wait=True)
+
+    assert finished(db, queued.id).status == StepStatus.CANCELLED
+    assert finished(db, running.id).status == StepStatus.COMPLETED
+
+
+def test_result_is_kept_when_the_check_finishes_after_cancel(jobs, db, step):
+    check = BlockingCheck(next_event=False)
+    execution = submit_step_job(db, registered(step), check)
+    assert check.started.wait(5)
+
+    assert cancel_step_job(db, execution.id)
+    check.release.set()
+    jobs.job_executor.shutdown(wait=True)
+
+    row = finished(db, execution.id)
+    assert row.status == StepStatus.COMPLETED
+    assert row.logs[-1] == "Cancel requested after the check had finished, result kept"
+
+
+def test_checks_without_events_are_not_cancellable(jobs, db, step):
+    check = BlockingCheck(events=False)
+    execution = submit_step_job(db, registered(step, events=False), check)
+    assert check.started.wait(5)
+
+    with pytest.raises(StepJobNotCancellable):
+        cancel_step_job(db, execution.id)
+    check.release.set()
+    jobs.job_executor.shutdown(wait=True)
+
+    assert finished(db, execution.id).status == StepStatus.COMPLETED
+    assert cancel_step_job(db, execution.id) is False
+
+
+def test_jobs_of_other_processes(jobs, db, step):
+    other = PG_queries.create_step_execution(db, PG_queries.StepExecutionCreate(step_id=step.id, status=StepStatus.IN_PROGRESS))
+
+    # Refreshed by its process's heartbeat
+    with pytest.raises(StepJobNotCancellable):
+        cancel_step_job(db, other.id)
+
+    lost = datetime.now() - timedelta(hours=1)
+    db.query(StepExecution).filter(StepExecution.id == other.id).update(
+        {StepExecution.created_at: lost, StepExecution.updated_at: lost}, synchronize_session=False
+    )
+    db.commit()
+    assert cancel_step_job(db, other.id)
+    assert finished(db, other.id).status == StepStatus.CANCELLED
+
+
+def test_heartbeat_keeps_local_jobs_and_fails_lost_ones(jobs, db, step):
+    check = BlockingCheck()
+    local = submit_step_job(db, registered(step), check)
+    assert check.started.wait(5)
+    lost = PG_queries.create_step_execution(db, PG_queries.StepExecutionCreate(step_id=step.id, status=StepStatus.IN_PROGRESS))
+    an_hour_ago = datetime.now() - timedelta(hours=1)
+    db.query(StepExecution).filter(StepExecution.id.in_([local.id, lost.id])).update(
+        {StepExecution.created_at: an_hour_ago, StepExecution.updated_at: an_hour_ago}, synchronize_session=False
+    )
+    db.commit()
+
+    jobs._heartbeat()
+
+    assert finished(db, local.id).status == StepStatus.IN_PROGRESS
+    assert finished(db, lost.id).status == StepStatus.FAILED
+    check.release.set()
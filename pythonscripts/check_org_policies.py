@@ -1,8 +1,13 @@
 import boto3
 import json
-import re
+import os
+import sys
 from botocore.exceptions import ClientError
 
+# Share the backend's org reference matcher, so the script and the API match alike
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend'))
+from app.services.org_matcher import OrgReferenceMatcher
+
 def check_policies_for_org_references():
     """
     Check policy documents for Organization/OU references in IAM, S3, and KMS.
@@ -24,6 +29,9 @@ def check_policies_for_org_references():
         r'org-'  # Common prefix for organization IDs
     ]
     
+    # Compiled once into a single alternation, so each document is scanned in one pass
+    org_matcher = OrgReferenceMatcher(org_patterns)
+    
     # Check IAM policies - both AWS managed and customer managed
     try:
         iam_client = session.client('iam')
@@ -44,7 +52,7 @@ def check_policies_for_org_references():
                     policy_doc = json.dumps(policy_version['PolicyVersion']['Document'])
                     
                     # Check if policy contains org references
-                    if any(re.search(pattern, policy_doc, re.IGNORECASE) for pattern in org_patterns):
+                    if org_matcher.matches(policy_doc):
                         print(f"- Found org reference in customer IAM policy: {policy['PolicyName']}")
                         results['iam_policies_with_org_refs'].append({
                             'name': policy['PolicyName'],
@@ -71,7 +79,7 @@ def check_policies_for_org_references():
                         policy_doc = json.dumps(policy_version['PolicyVersion']['Document'])
                         
                         # Check if policy contains org references
-                        if any(re.search(pattern, policy_doc, re.IGNORECASE) for pattern in org_patterns):
+                        if org_matcher.matches(policy_doc):
                             print(f"- Found org reference in AWS managed IAM policy: {policy['PolicyName']}")
                             results['iam_policies_with_org_refs'].append({
                                 'name': policy['PolicyName'],
@@ -103,7 +111,7 @@ def check_policies_for_org_references():
                 policy_doc = policy['Policy']
                 
                 # Check if policy contains org references
-                if any(re.search(pattern, policy_doc, re.IGNORECASE) for pattern in org_patterns):
+                if org_matcher.matches(policy_doc):
                     print(f"- Found org reference in S3 bucket policy: {bucket_name}")
                     results['s3_policies_with_org_refs'].append({
                         'bucket': bucket_name
@@ -123,7 +131,7 @@ def check_policies_for_org_references():
             print(policy_doc)
             
             # Check if policy contains org references
-            if any(re.search(pattern, policy_doc, re.IGNORECASE) for pattern in org_patterns):
+            if org_matcher.matches(policy_doc):
                 print(f"- Found org reference in specific S3 bucket policy: {specific_bucket}")
                 if not any(b['bucket'] == specific_bucket for b in results['s3_policies_with_org_refs']):
                     results['s3_policies_with_org_refs'].append({
@@ -141,21 +149,28 @@ def check_policies_for_org_references():
         kms_client = session.client('kms')
         
         print("\nChecking KMS key policies for organization references...")
+        
+        # Index aliases once instead of calling list_aliases for every matching key
+        key_aliases = {}
+        for page in kms_client.get_paginator('list_aliases').paginate():
+            for alias in page['Aliases']:
+                if alias.get('TargetKeyId'):
+                    key_aliases.setdefault(alias['TargetKeyId'], []).append(alias['AliasName'])
+        
         paginator = kms_client.get_paginator('list_keys')
         
         key_count = 0
         for page in paginator.paginate():
             for key in page['Keys']:
                 key_count += 1
+                key_id = key['KeyId']
+                aliases = key_aliases.get(key_id, [])
+                
+                # Skip AWS managed keys, they all carry an alias/aws/ alias
+                if any(alias.startswith('alias/aws/') for alias in aliases):
+                    continue
+                
                 try:
-                    # Get key details
-                    key_info = kms_client.describe_key(KeyId=key['KeyId'])
-                    key_id = key['KeyId']
-                    
-                    # Skip AWS managed keys
-                    if key_info['KeyMetadata'].get('KeyManager') == 'AWS':
-                        continue
-                    
                     # Get key policy
                     key_policy = kms_client.get_key_policy(
                         KeyId=key_id,
@@ -165,16 +180,9 @@ def check_policies_for_org_references():
                     policy_doc = key_policy['Policy']
                     
                     # Check if policy contains org references
-                    if any(re.search(pattern, policy_doc, re.IGNORECASE) for pattern in org_patterns):
-                        # Try to get alias
-                        key_alias = "Unknown"
-                        try:
-                            aliases = kms_client.list_aliases(KeyId=key_id)
-                            if aliases['Aliases']:
-                                key_alias = aliases['Aliases'][0]['AliasName']
-                        except:
-                            pass
-                            
+                    if org_matcher.matches(policy_doc):
+                        key_alias = aliases[0] if aliases else "Unknown"
+                        
                         print(f"- Found org reference in KMS key policy: {key_alias} ({key_id})")
                         results['kms_policies_with_org_refs'].append({
                             'key_id': key_id,